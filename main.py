@@ -1,6 +1,7 @@
 # main.py
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
@@ -59,4 +60,6 @@ def load_file_to_window(window, file_path):
         window.status_bar.showMessage("❌ 打开文件失败", 3000)
 
 if __name__ == "__main__":
+    # 打包后的程序中，分页预计算的子进程需要此调用才能正常启动
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================
+# benchmark_parse.py - Markdown解析性能基准
+# ============================================
+
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from bs4 import BeautifulSoup
+
+from src.core.blocks import available_html_backends, html_to_blocks
+from src.core.markdown_processor import MarkdownProcessor
+
+
+def build_document(block_count: int = 1000) -> str:
+    """生成包含指定数量内容块的测试文档"""
+    samples = [
+        "## 小节 {i}",
+        "这是第 {i} 段正文，包含 **加粗**、*斜体* 和 `行内代码`，用于测试解析性能。",
+        "- [x] 已完成任务 {i}\n- [ ] 未完成任务 {i}\n- 普通列表项",
+        "![图片{i}](images/pic{i}.png)",
+        "```python\ndef func_{i}():\n    return {i}\n```",
+        "> 引用内容 {i}",
+        "| 列A | 列B |\n| --- | --- |\n| {i} | {i} |",
+    ]
+    blocks = [samples[i % len(samples)].format(i=i) for i in range(block_count)]
+    return "\n\n".join(blocks) + "\n"
+
+
+def legacy_postprocess(html: str) -> str:
+    """旧版后处理的主要开销：两次 BeautifulSoup 往返 + 两次全文正则"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for img in soup.find_all('img'):
+        img['data-protected'] = 'true'
+    html = str(soup)
+
+    html = re.sub(r'<li>(.*?)</li>', r'<li>\1</li>', html, flags=re.DOTALL)
+    html = re.sub(r'<p>(.*?)</p>', r'<p>\1</p>', html, flags=re.DOTALL)
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for li in soup.find_all('li'):
+        li.get('class')
+    return str(soup)
+
+
+def measure(func, repeat: int = 5) -> float:
+    """返回多次运行中的最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    block_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    text = build_document(block_count)
+    processor = MarkdownProcessor()
+
+    print(f"📄 测试文档: {block_count} 个内容块, {len(text)} 字符")
+
+    html = processor.parse(text)
+    parse_ms = measure(lambda: processor.parse(text))
+    legacy_ms = measure(lambda: legacy_postprocess(html))
+
+    print(f"  ✓ 完整解析（treeprocessor 后处理）: {parse_ms:.1f} ms")
+    print(f"  ✓ 旧版 BeautifulSoup 后处理额外开销: {legacy_ms:.1f} ms")
+    print(f"  ✓ 预计每次解析节省: {legacy_ms / (parse_ms + legacy_ms) * 100:.0f}%")
+
+    # 顶层块解析后端对比（结果必须与 BeautifulSoup 后端完全一致）
+    expected = html_to_blocks(html, 'bs4')
+    for backend in available_html_backends():
+        backend_ms = measure(lambda: html_to_blocks(html, backend))
+        same = html_to_blocks(html, backend) == expected
+        print(f"  ✓ 顶层块解析（{backend}）: {backend_ms:.1f} ms, 与 bs4 结果{'一致' if same else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# ============================================
+# src/core/blocks.py
+# ============================================
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import logging
+from bs4 import BeautifulSoup, NavigableString, Tag, Comment
+
+@dataclass
+class MarkdownBlock:
+    """顶层内容块（MarkdownProcessor 与 SmartPaginator 之间传递的结构化结果）"""
+    type: str  # 'heading', 'paragraph', 'paragraph_with_images', 'image', 'list', 'code', 'blockquote', 'table', 'hr', 'text', 'pagebreak', 'unknown'
+    html: str  # HTML片段
+    text: str  # 纯文本内容
+    level: int = 0  # 标题级别
+    image_count: int = 0  # 包含的图片数量
+    list_items: int = 0  # 列表的直接子项数量
+    code_lines: int = 0  # 代码行数
+    table_rows: int = 0  # 表格行数（含表头行）
+    table_headers: int = 0  # 表头单元格数量
+    line_start: int = 0  # 源文本起始行（从1开始，0表示未知）
+    line_end: int = 0  # 源文本结束行
+    image_sizes: Tuple[Tuple[int, int], ...] = ()  # 各图片的原始尺寸（宽, 高），未知为 (0, 0)
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+CONTAINER_TAGS = ('div', 'section', 'article', 'main')
+# 分页标记的 class 和 data 属性都含有该字符串；HTML 中没有它时无需逐个节点检查
+PAGEBREAK_HINT = 'pagebreak'
+
+# 解析后端：lxml（可选依赖，解析在 C 层完成）、BeautifulSoup + html.parser
+HTML_BACKENDS = ('lxml', 'bs4')
+# 未指定时使用 bs4。lxml 能直接解析的文档快 4~7 倍，但 libxml2 会调整部分文档的结构
+# （项目内 27 篇 Markdown 中有 6 篇），这些文档须再用 bs4 解析一遍，反而慢约 20%~35%，
+# 整体只快约 18%，因此需要通过 set_html_backend('lxml') 显式启用
+DEFAULT_HTML_BACKEND = 'bs4'
+
+HtmlToBlocks = Callable[[str], List[MarkdownBlock]]
+_backends: Dict[str, Optional[HtmlToBlocks]] = {}
+_active_backend: Optional[str] = None
+
+
+def _load_backend(name: str) -> Optional[HtmlToBlocks]:
+    """加载解析后端，依赖未安装时返回 None"""
+    if name not in _backends:
+        if name == 'lxml':
+            try:
+                from src.core.lxml_blocks import lxml_html_to_blocks
+            except ImportError:
+                lxml_html_to_blocks = None
+            _backends[name] = lxml_html_to_blocks
+        else:
+            _backends[name] = bs4_html_to_blocks
+    return _backends[name]
+
+
+def available_html_backends() -> List[str]:
+    """当前环境可用的解析后端"""
+    return [name for name in HTML_BACKENDS if _load_backend(name) is not None]
+
+
+def get_html_backend() -> str:
+    """当前使用的解析后端（未指定时为 DEFAULT_HTML_BACKEND）"""
+    global _active_backend
+    if _active_backend is None:
+        _active_backend = DEFAULT_HTML_BACKEND
+    return _active_backend
+
+
+def set_html_backend(name: Optional[str]) -> str:
+    """
+    指定解析后端；None 表示使用默认后端。后端不可用时退回默认后端
+
+    Returns:
+        实际使用的后端名称
+    """
+    global _active_backend
+    if name is not None and name not in HTML_BACKENDS:
+        raise ValueError(f"未知的HTML解析后端: {name}")
+    if name is not None and _load_backend(name) is None:
+        logging.warning(f"HTML解析后端 {name} 不可用，使用默认后端")
+        name = None
+    _active_backend = name
+    return get_html_backend()
+
+
+def html_to_blocks(html: str, backend: Optional[str] = None) -> List[MarkdownBlock]:
+    """
+    将HTML解析为顶层内容块列表
+
+    容器元素（div/section 等）和内部带分页标记的元素会被展开为其子元素。
+    各后端的结果完全一致（包括块的 HTML 片段），backend 为空时使用当前后端
+    """
+    if not html or not html.strip():
+        return []
+
+    parse = _load_backend(backend or get_html_backend())
+    if parse is None:
+        raise ValueError(f"HTML解析后端 {backend} 不可用")
+    return parse(html)
+
+
+def bs4_html_to_blocks(html: str) -> List[MarkdownBlock]:
+    """BeautifulSoup + html.parser 后端（无额外依赖）"""
+    soup = BeautifulSoup(html, 'html.parser')
+    check_markers = PAGEBREAK_HINT in html
+    blocks = []
+
+    for node in soup.children:
+        if isinstance(node, Comment):
+            continue
+        if isinstance(node, NavigableString):
+            text = str(node).strip()
+            if text:
+                blocks.append(MarkdownBlock(type='text', html=str(node), text=text))
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        if check_markers and is_pagebreak_marker(node):
+            blocks.append(MarkdownBlock(type='pagebreak', html=str(node), text=''))
+            continue
+
+        blocks.extend(_node_to_blocks(node, check_markers))
+
+    return blocks
+
+
+def _node_to_blocks(node, check_markers: bool = True) -> List[MarkdownBlock]:
+    """递归处理节点"""
+    if isinstance(node, NavigableString):
+        text = str(node).strip()
+        if text:
+            return [MarkdownBlock(type='text', html=text, text=text)]
+        return []
+
+    if not isinstance(node, Tag):
+        return []
+
+    if check_markers:
+        # 强制分页标记
+        if is_pagebreak_marker(node):
+            return [MarkdownBlock(type='pagebreak', html=str(node), text='')]
+        # 内部包含分页标记时展开处理
+        if node.find(is_pagebreak_marker) is not None:
+            return _children_to_blocks(node, check_markers)
+
+    tag_name = node.name.lower()
+
+    if tag_name in HEADING_TAGS:
+        text = node.get_text(strip=True)
+        if not text:
+            return []
+        return [MarkdownBlock(type='heading', html=str(node), text=text, level=int(tag_name[1]))]
+
+    if tag_name == 'p':
+        text = node.get_text(strip=True)
+        images = node.find_all('img')
+        block_type = 'paragraph_with_images' if images else 'paragraph'
+        return [MarkdownBlock(type=block_type, html=str(node), text=text, image_count=len(images),
+                              image_sizes=image_sizes(images))]
+
+    if tag_name == 'img':
+        return [MarkdownBlock(type='image', html=str(node), text=node.get('alt', '图片'), image_count=1,
+                              image_sizes=image_sizes([node]))]
+
+    if tag_name in ('ul', 'ol'):
+        images = node.find_all('img')
+        return [MarkdownBlock(
+            type='list',
+            html=str(node),
+            text=node.get_text(strip=True),
+            image_count=len(images),
+            list_items=len(node.find_all('li', recursive=False)),
+            image_sizes=image_sizes(images)
+        )]
+
+    if tag_name == 'pre':
+        code_elem = node.find('code')
+        code_text = code_elem.get_text() if code_elem else node.get_text()
+        return [MarkdownBlock(
+            type='code',
+            html=str(node),
+            text=code_text,
+            code_lines=max(1, len(code_text.splitlines()))
+        )]
+
+    if tag_name == 'blockquote':
+        images = node.find_all('img')
+        return [MarkdownBlock(
+            type='blockquote',
+            html=str(node),
+            text=node.get_text(strip=True),
+            image_count=len(images),
+            image_sizes=image_sizes(images)
+        )]
+
+    if tag_name == 'table':
+        return [MarkdownBlock(
+            type='table',
+            html=str(node),
+            text=node.get_text(strip=True),
+            table_rows=len(node.find_all('tr')),
+            table_headers=len(node.find_all('th'))
+        )]
+
+    if tag_name == 'hr':
+        return [MarkdownBlock(type='hr', html=str(node), text='')]
+
+    if tag_name in CONTAINER_TAGS:
+        return _children_to_blocks(node, check_markers)
+
+    # 其他元素
+    text = node.get_text(strip=True)
+    if not text:
+        return []
+    if node.find(True) is not None:
+        return _children_to_blocks(node, check_markers)
+    return [MarkdownBlock(type='unknown', html=str(node), text=text)]
+
+
+def _children_to_blocks(node: Tag, check_markers: bool = True) -> List[MarkdownBlock]:
+    """展开容器节点的子节点"""
+    blocks = []
+    for child in node.children:
+        blocks.extend(_node_to_blocks(child, check_markers))
+    return blocks
+
+
+def image_sizes(images) -> Tuple[Tuple[int, int], ...]:
+    """读取 img 元素上由 MarkdownProcessor 写入的 data-width / data-height"""
+    sizes = []
+    for img in images:
+        try:
+            sizes.append((int(img.get('data-width', 0)), int(img.get('data-height', 0))))
+        except (TypeError, ValueError):
+            sizes.append((0, 0))
+    return tuple(sizes)
+
+
+def is_pagebreak_marker(element) -> bool:
+    """
+    检查元素是否是分页标记
+    """
+    if not isinstance(element, Tag):
+        return False
+
+    # 1) class 名称中包含 pagebreak-marker
+    classes = element.get('class', [])
+    if isinstance(classes, list):
+        if 'pagebreak-marker' in classes:
+            return True
+
+    # 2) data 属性标记
+    if element.get('data-pagebreak') == 'true':
+        return True
+
+    return False
@@ -0,0 +1,79 @@
+# ============================================
+# src/core/highlight_cache.py
+# ============================================
+import types
+from markdown.extensions import codehilite, fenced_code
+from src.utils.cache import LRUCache, MISSING
+
+# Pygments 高亮结果缓存，所有文档共享
+HIGHLIGHT_CACHE_SIZE = 2048
+HIGHLIGHT_CACHE = LRUCache(HIGHLIGHT_CACHE_SIZE)
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    """
+    带缓存的 CodeHilite
+
+    按 (代码文本, 语言, pygments 样式, css_class 及其余选项) 缓存高亮结果，
+    编辑正文时未改动的代码块不再重新经过 Pygments 词法分析和格式化
+    """
+    
+    def hilite(self, shebang: bool = True) -> str:
+        key = (
+            self.src,
+            self.lang,
+            self.options.get('style'),
+            self.options.get('cssclass'),
+            shebang,
+            self.guess_lang,
+            self.use_pygments,
+            self.lang_prefix,
+            repr(self.pygments_formatter),
+            repr(sorted((name, repr(value)) for name, value in self.options.items())),
+        )
+        cached = HIGHLIGHT_CACHE.get(key)
+        if cached is not MISSING:
+            # 与未缓存时一致：hilite 会规范化 src 并补全猜测出的语言
+            html, self.src, self.lang = cached
+            return html
+        
+        html = super().hilite(shebang)
+        HIGHLIGHT_CACHE.put(key, (html, self.src, self.lang))
+        return html
+
+
+def _with_cached_hilite(func):
+    """
+    复制 func，其中的全局名 CodeHilite 解析为 CachedCodeHilite
+
+    fenced_code 和 codehilite 都在运行时按模块内的全局名查找 CodeHilite，
+    复制出的函数只用于下面的子类，两个模块本身保持不变
+    """
+    namespace = dict(func.__globals__, CodeHilite=CachedCodeHilite)
+    clone = types.FunctionType(func.__code__, namespace, func.__name__, func.__defaults__, func.__closure__)
+    clone.__kwdefaults__ = func.__kwdefaults__
+    clone.__qualname__ = func.__qualname__
+    clone.__doc__ = func.__doc__
+    return clone
+
+class CachedFencedBlockPreprocessor(fenced_code.FencedBlockPreprocessor):
+    """使用 CachedCodeHilite 的 fenced_code 预处理器"""
+    run = _with_cached_hilite(fenced_code.FencedBlockPreprocessor.run)
+
+class CachedHiliteTreeprocessor(codehilite.HiliteTreeprocessor):
+    """使用 CachedCodeHilite 的 codehilite 树处理器"""
+    run = _with_cached_hilite(codehilite.HiliteTreeprocessor.run)
+
+def install_cached_hilite(md):
+    """
+    把 md 中 fenced_code 和 codehilite 注册的处理器换成带缓存的子类
+
+    只影响这一个 Markdown 实例；须在两个扩展加载之后调用，未加载的扩展跳过。
+    优先级与两个扩展注册时相同
+    """
+    if 'fenced_code_block' in md.preprocessors:
+        config = md.preprocessors['fenced_code_block'].config
+        md.preprocessors.register(CachedFencedBlockPreprocessor(md, config), 'fenced_code_block', 25)
+    if 'hilite' in md.treeprocessors:
+        hiliter = CachedHiliteTreeprocessor(md)
+        hiliter.config = md.treeprocessors['hilite'].config
+        md.treeprocessors.register(hiliter, 'hilite', 30)
@@ -1,14 +1,90 @@
 # ============================================
 # src/core/html_generator.py
 # ============================================
+import os
+import threading
 from pathlib import Path
-from typing import Optional
-from src.utils.style_manager import StyleManager
+from typing import Dict, Optional, Tuple
+from src.utils.cache import LRUCache, MISSING
+from src.utils.style_manager import StyleManager, ThemeTokens
+from src.utils.template import CompiledTemplate
+
+
+class TemplateStore:
+    """
+    模板文件缓存：每个文件只读取、编译一次，文件修改时间或大小变化后自动重新加载
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._templates: Dict[str, Tuple[Tuple[int, int], CompiledTemplate]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename: str) -> Tuple[CompiledTemplate, Tuple[int, int]]:
+        """
+        Returns:
+            (编译后的模板, 文件版本)；文件版本为 (修改时间, 大小)，可用作缓存键的一部分
+        """
+        path = self.directory / filename
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template file not found: {path}") from None
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._templates.get(filename)
+            if cached is not None and cached[0] == version:
+                return cached[1], version
+        template = CompiledTemplate(path.read_text(encoding='utf-8'))
+        with self._lock:
+            self._templates[filename] = (version, template)
+        return template, version
+
+
+# 页面骨架：除正文和页码外的部分按 (主题, 字号, 字体, 尺寸) 预先代入
+DOCUMENT_TEMPLATE = CompiledTemplate("""
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>小红书卡片 - {{title}}</title>
+    <style>
+        {{theme_css}}
+        {{page_css}}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="card">
+            <div class="content" id="content">
+                {{content}}
+            </div>
+            {{page_info}}
+        </div>
+    </div>
+    <script>{{js}}</script>
+</body>
+</html>
+""")
+
+_template_stores: Dict[Path, TemplateStore] = {}
+# 已代入样式和脚本的页面骨架（各 HTMLGenerator 实例共享，预览和导出切换参数时直接复用）
+_document_cache = LRUCache(max_entries=32)
+
+
+def get_template_store(directory: Path) -> TemplateStore:
+    store = _template_stores.get(directory)
+    if store is None:
+        store = _template_stores.setdefault(directory, TemplateStore(directory))
+    return store
+
 
 class HTMLGenerator:
     def __init__(self, font_size: int = 18, page_size: str = "medium", theme: str = "xiaohongshu"):
         self.resource_path = Path(__file__).parent.parent.parent / "resources"  # 调整为正确路径
         self.templates_path = self.resource_path / "templates"
+        self._templates = get_template_store(self.templates_path)
         self.base_font_size = font_size
         self.font_size = font_size
         
@@ -48,25 +124,15 @@ class HTMLGenerator:
     def generate(self, content: str, page_num: int = 0, total_pages: int = 0) -> str:
         """
         生成完整的 HTML 页面
+
+        样式和脚本已代入的页面骨架按 (主题, 字号, 字体, 尺寸, 模板文件版本) 缓存，
+        每次调用只填入正文和页码
         
         Args:
             content: HTML内容
             page_num: 当前页码（0表示不显示）
             total_pages: 总页数
         """
-        theme = self.style_manager.get_theme()
-        is_dark = self.current_theme in ["dark_mode", "midnight", "douyin"]
-        
-        # 生成主题CSS
-        theme_css = self.style_manager.generate_css(self.current_theme, self.base_font_size, getattr(self, 'font_family', None))
-        
-        # 加载并处理页面CSS
-        page_css = self._load_template('page.css')
-        page_css = self._render_css_template(page_css, is_dark, theme)
-        
-        # 加载JS
-        js = self._load_template('scripts.js')
-        
         # 生成页码信息
         page_info = ""
         if page_num > 0 and total_pages > 1:
@@ -77,60 +143,50 @@ class HTMLGenerator:
                 <span class="page-total">{total_pages}</span>
             </div>
             """
-        
-        html = f"""
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>小红书卡片 - {self.style_manager.get_theme().name}</title>
-    <style>
-        {theme_css}
-        {page_css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="card">
-            <div class="content" id="content">
-                {content}
-            </div>
-            {page_info}
-        </div>
-    </div>
-    <script>{js}</script>
-</body>
-</html>
-"""
-        return html
+
+        return self._document_template().render({'content': content, 'page_info': page_info})
+
+    def _document_template(self) -> CompiledTemplate:
+        """当前参数下只剩 content / page_info 两个占位符的页面骨架"""
+        page_css, css_version = self._templates.get('page.css')
+        js, js_version = self._templates.get('scripts.js')
+        font_family = getattr(self, 'font_family', None)
+        key = (self.current_theme, self.style_manager.current_theme, self.base_font_size, font_family,
+               self.page_width, self.page_height, css_version, js_version)
+        document = _document_cache.get(key)
+        if document is MISSING:
+            tokens = self.style_manager.theme_tokens(self.current_theme)
+            document = DOCUMENT_TEMPLATE.bind({
+                'title': tokens.theme.name,
+                'theme_css': self.style_manager.generate_css(self.current_theme, self.base_font_size, font_family),
+                'page_css': self._render_css_template(page_css, tokens),
+                'js': js.render({}),
+            })
+            _document_cache.put(key, document)
+        return document
     
     def _load_template(self, filename: str) -> str:
-        """加载模板文件"""
-        path = self.templates_path / filename
-        if not path.exists():
-            raise FileNotFoundError(f"Template file not found: {path}")
-        return path.read_text(encoding='utf-8')
+        """加载模板文件（原文）"""
+        template, _ = self._templates.get(filename)
+        return template.render({})
     
-    def _render_css_template(self, css: str, is_dark: bool, theme) -> str:
-        """渲染CSS模板，替换占位符"""
+    def _render_css_template(self, css: CompiledTemplate, tokens: ThemeTokens) -> str:
+        """渲染CSS模板，替换占位符（深浅色和半透明颜色取自主题编译好的取值表）"""
         replacements = {
-            '{{page_width}}': str(self.page_width),
-            '{{page_height}}': str(self.page_height),
-            '{{card_background}}': 'rgba(255, 255, 255, 0.98)' if not is_dark else 'rgba(20, 20, 35, 0.98)',
-            '{{shadow_color1}}': self.style_manager.add_alpha(theme.primary_color, 0.15),
-            '{{shadow_color2}}': self.style_manager.add_alpha('#000000', 0.1),
-            '{{page_info_bg}}': self.style_manager.add_alpha(theme.primary_color, 0.1),
-            '{{page_info_border}}': self.style_manager.add_alpha(theme.primary_color, 0.2),
-            '{{separator_color}}': self.style_manager.add_alpha(theme.text_color, 0.4),
-            '{{total_color}}': self.style_manager.add_alpha(theme.text_color, 0.6),
-            '{{deco_color1}}': self.style_manager.add_alpha(theme.primary_color, 0.1),
-            '{{deco_color2}}': self.style_manager.add_alpha(theme.secondary_color, 0.1),
-            '{{img_shadow}}': self.style_manager.add_alpha('#000000', 0.1)
+            'page_width': str(self.page_width),
+            'page_height': str(self.page_height),
+            'card_background': 'rgba(255, 255, 255, 0.98)' if not tokens.is_dark else 'rgba(20, 20, 35, 0.98)',
+            'shadow_color1': tokens.rgba('primary', 0.15),
+            'shadow_color2': tokens.rgba('black', 0.1),
+            'page_info_bg': tokens.rgba('primary', 0.1),
+            'page_info_border': tokens.rgba('primary', 0.2),
+            'separator_color': tokens.rgba('text', 0.4),
+            'total_color': tokens.rgba('text', 0.6),
+            'deco_color1': tokens.rgba('primary', 0.1),
+            'deco_color2': tokens.rgba('secondary', 0.1),
+            'img_shadow': tokens.rgba('black', 0.1)
         }
-        for key, value in replacements.items():
-            css = css.replace(key, value)
-        return css
+        return css.render(replacements)
     
     def get_page_css(self) -> str:
         """已弃用：现在使用外部模板"""
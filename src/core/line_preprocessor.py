@@ -0,0 +1,155 @@
+# ============================================
+# src/core/line_preprocessor.py
+# ============================================
+import re
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Union
+from markdown.util import Registry
+
+# 标题行：1-6 个 # 后接空白和标题文本
+HEADING_LINE_RE = re.compile(r'^(#{1,6})\s+(.+)$')
+# 标题文本末尾的装饰性符号（非字母数字、非空白的 Unicode 字符）
+TRAILING_DECORATION_RE = re.compile(r'([^\w\s])+$')
+# HTML 注释形式的分页标记（支持大小写和空格变化）
+PAGEBREAK_RE = re.compile(r'<!--\s*pagebreak\s*-->', re.IGNORECASE)
+PAGEBREAK_HTML = '\n\n<div class="pagebreak-marker" data-pagebreak="true"></div>\n\n'
+TASKLIST_ITEM_PREFIXES = ('- [ ] ', '- [x] ', '* [ ] ', '* [x] ')
+
+
+class LineTransform:
+    """
+    行变换基类
+
+    简单的逐行变换只需重写 transform_line；需要跨行状态或前瞻的变换
+    重写 process，以生成器的方式消费上游的行并产出新的行
+    """
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            result = self.transform_line(line)
+            if result is None:
+                continue
+            if '\n' in result:
+                yield from result.split('\n')
+            else:
+                yield result
+
+    def transform_line(self, line: str) -> Optional[str]:
+        """返回变换后的行；返回 None 删除该行，结果中的换行符会拆分为多行"""
+        return line
+
+
+class CallableLineTransform(LineTransform):
+    """将普通函数包装为行变换"""
+
+    def __init__(self, func: Callable[[str], Optional[str]]):
+        self.func = func
+
+    def transform_line(self, line: str) -> Optional[str]:
+        return self.func(line)
+
+
+class HeadingDecorationTransform(LineTransform):
+    """移除标题末尾的装饰性符号，但保留内容中的符号"""
+
+    def transform_line(self, line: str) -> str:
+        if not line.startswith('#'):
+            return line
+        match = HEADING_LINE_RE.match(line)
+        if not match:
+            return line
+        clean_text = TRAILING_DECORATION_RE.sub('', match.group(2).strip())
+        return f"{match.group(1)} {clean_text}"
+
+
+class HeadingNewlineTransform(LineTransform):
+    """移除标题后的空行，标题行末尾补一个空格"""
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        pending = None  # 等待确认后续是否有空行的标题行
+        had_blank = False
+        for line in lines:
+            if pending is not None:
+                if line == '':
+                    had_blank = True
+                    continue
+                yield pending + ' ' if had_blank else pending
+                pending = None
+            if line.startswith('#') and HEADING_LINE_RE.match(line):
+                pending = line
+                had_blank = False
+            else:
+                yield line
+        if pending is not None:
+            yield pending + ' ' if had_blank else pending
+
+
+class PagebreakTransform(LineTransform):
+    """将 <!-- pagebreak --> 替换为分页标记 div（不会被 Markdown 解析器改变）"""
+
+    def transform_line(self, line: str) -> str:
+        if '<!--' not in line:
+            return line
+        return PAGEBREAK_RE.sub(PAGEBREAK_HTML, line)
+
+
+class TaskListTransform(LineTransform):
+    """任务列表后接普通文本时插入空行，保证 Markdown 正常渲染"""
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        in_list = False
+        for line in lines:
+            stripped = line.strip()
+            # 任务列表标记保留在文本中，由 TaskListTreeprocessor 转换为复选框
+            if stripped.startswith(TASKLIST_ITEM_PREFIXES):
+                in_list = True
+            elif in_list and stripped and not stripped.startswith(('-', '*')):
+                yield ''
+                in_list = False
+            yield line
+
+
+class LinePreprocessor:
+    """
+    Markdown 转换前的行级预处理管线
+
+    所有行变换串联为生成器链，全文只按行扫描一遍。
+    变换按优先级从高到低执行，可通过 register 注册自定义变换。
+    """
+
+    def __init__(self):
+        self.transforms: Registry = Registry()
+
+    @classmethod
+    def default(cls) -> 'LinePreprocessor':
+        """内置的标题清理、分页标记和任务列表处理"""
+        preprocessor = cls()
+        preprocessor.register(HeadingDecorationTransform(), 'heading_decorations', 40)
+        preprocessor.register(HeadingNewlineTransform(), 'heading_newlines', 30)
+        preprocessor.register(PagebreakTransform(), 'pagebreak', 20)
+        preprocessor.register(TaskListTransform(), 'tasklist', 10)
+        return preprocessor
+
+    def register(self, transform: Union[LineTransform, Callable[[str], Optional[str]]], name: str, priority: float):
+        """注册行变换，普通函数会被包装为 CallableLineTransform"""
+        if not isinstance(transform, LineTransform):
+            transform = CallableLineTransform(transform)
+        self.transforms.register(transform, name, priority)
+
+    def deregister(self, name: str, strict: bool = True):
+        self.transforms.deregister(name, strict)
+
+    def signature(self) -> Tuple[str, ...]:
+        """已注册变换的类型与顺序，用于计算结果缓存的键"""
+        names = []
+        for transform in self.transforms:
+            name = f"{type(transform).__module__}.{type(transform).__qualname__}"
+            if isinstance(transform, CallableLineTransform):
+                name += f":{getattr(transform.func, '__module__', '')}.{getattr(transform.func, '__qualname__', repr(transform.func))}"
+            names.append(name)
+        return tuple(names)
+
+    def run(self, text: str) -> str:
+        lines: Iterable[str] = text.split('\n')
+        for transform in self.transforms:
+            lines = transform.process(lines)
+        return '\n'.join(lines)
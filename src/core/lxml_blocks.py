@@ -0,0 +1,271 @@
+# ============================================
+# src/core/lxml_blocks.py - 基于 lxml 的顶层块解析（可选后端）
+# ============================================
+import re
+from typing import List, Optional
+from lxml import etree
+from lxml.html import fragments_fromstring
+from src.core.blocks import (MarkdownBlock, HEADING_TAGS, CONTAINER_TAGS, PAGEBREAK_HINT, image_sizes,
+                             bs4_html_to_blocks)
+
+# 与 BeautifulSoup 的 html.parser 输出保持一致：自闭合标签、不转义内容的标签、多值属性
+VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer'
+))
+RAW_TEXT_TAGS = frozenset(('script', 'style'))
+MULTI_VALUED_ATTRS = {
+    '*': ('class', 'accesskey', 'dropzone'),
+    'a': ('rel', 'rev'),
+    'link': ('rel', 'rev'),
+    'td': ('headers',),
+    'th': ('headers',),
+    'form': ('accept-charset',),
+    'object': ('archive',),
+    'area': ('rel',),
+    'icon': ('sizes',),
+    'iframe': ('sandbox',),
+    'output': ('for',),
+}
+
+_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+_TAG_RE = re.compile(r'<(/?[A-Za-z][^\s/>]*)')
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+
+
+def lxml_html_to_blocks(html: str) -> List[MarkdownBlock]:
+    """
+    将HTML解析为顶层内容块列表，结果与 BeautifulSoup 后端一致
+
+    解析在 libxml2 中完成；块的 HTML 片段按 BeautifulSoup 的序列化规则
+    （属性排序、自闭合标签写法、最小转义）重新生成。libxml2 会按 HTML 规范
+    调整结构（补全 html/head/body、段落内出现块级元素时提前闭合、补全省略的
+    结束标签等），解析出的标签顺序与源码不一致时改用 BeautifulSoup 后端。
+    唯一已知差异：无值的布尔属性（如 <input checked>）序列化为 checked="checked"
+    """
+    try:
+        nodes = fragments_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return bs4_html_to_blocks(html)
+    if _tag_sequence(nodes) != _source_tag_sequence(html):
+        return bs4_html_to_blocks(html)
+
+    check_markers = PAGEBREAK_HINT in html
+    blocks = []
+
+    def add_text(text: Optional[str]):
+        if text and text.strip():
+            blocks.append(MarkdownBlock(type='text', html=text, text=text.strip()))
+
+    for node in nodes:
+        if isinstance(node, str):
+            add_text(node)
+            continue
+        if isinstance(node.tag, str):
+            if check_markers and _is_pagebreak_marker(node):
+                blocks.append(MarkdownBlock(type='pagebreak', html=serialize(node), text=''))
+            else:
+                blocks.extend(_node_to_blocks(node, check_markers))
+        add_text(node.tail)
+
+    return blocks
+
+
+def _source_tag_sequence(html: str) -> List[str]:
+    """源码中开始/结束标签的顺序（忽略注释和自闭合标签的结束标签）"""
+    source = _COMMENT_RE.sub('', html) if '<!--' in html else html
+    return [
+        name for name in (token.lower() for token in _TAG_RE.findall(source))
+        if not (name[0] == '/' and name[1:] in VOID_TAGS)
+    ]
+
+
+def _tag_sequence(nodes) -> List[str]:
+    """解析结果中开始/结束标签的顺序，与 _source_tag_sequence 对应"""
+    sequence = []
+    for node in nodes:
+        if isinstance(node, str) or not isinstance(node.tag, str):
+            continue
+        for event, element in etree.iterwalk(node, events=('start', 'end')):
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            if event == 'start':
+                sequence.append(tag)
+            elif tag not in VOID_TAGS:
+                sequence.append('/' + tag)
+    return sequence
+
+
+def _node_to_blocks(node, check_markers: bool) -> List[MarkdownBlock]:
+    """递归处理元素节点（与 blocks._node_to_blocks 的规则一一对应）"""
+    if check_markers:
+        if _is_pagebreak_marker(node):
+            return [MarkdownBlock(type='pagebreak', html=serialize(node), text='')]
+        # 内部包含分页标记时展开处理
+        if any(_is_pagebreak_marker(child) for child in node.iterdescendants(etree.Element)):
+            return _children_to_blocks(node, check_markers)
+
+    tag_name = node.tag
+
+    if tag_name in HEADING_TAGS:
+        text = _get_text(node)
+        if not text:
+            return []
+        return [MarkdownBlock(type='heading', html=serialize(node), text=text, level=int(tag_name[1]))]
+
+    if tag_name == 'p':
+        images = list(node.iter('img'))
+        block_type = 'paragraph_with_images' if images else 'paragraph'
+        return [MarkdownBlock(type=block_type, html=serialize(node), text=_get_text(node),
+                              image_count=len(images), image_sizes=image_sizes(images))]
+
+    if tag_name == 'img':
+        return [MarkdownBlock(type='image', html=serialize(node), text=node.get('alt', '图片'), image_count=1,
+                              image_sizes=image_sizes([node]))]
+
+    if tag_name in ('ul', 'ol'):
+        images = list(node.iter('img'))
+        return [MarkdownBlock(
+            type='list',
+            html=serialize(node),
+            text=_get_text(node),
+            image_count=len(images),
+            list_items=sum(1 for child in node if child.tag == 'li'),
+            image_sizes=image_sizes(images)
+        )]
+
+    if tag_name == 'pre':
+        code_elem = next(node.iterdescendants('code'), None)
+        code_text = _get_text(code_elem if code_elem is not None else node, strip=False)
+        return [MarkdownBlock(
+            type='code',
+            html=serialize(node),
+            text=code_text,
+            code_lines=max(1, len(code_text.splitlines()))
+        )]
+
+    if tag_name == 'blockquote':
+        images = list(node.iter('img'))
+        return [MarkdownBlock(
+            type='blockquote',
+            html=serialize(node),
+            text=_get_text(node),
+            image_count=len(images),
+            image_sizes=image_sizes(images)
+        )]
+
+    if tag_name == 'table':
+        return [MarkdownBlock(
+            type='table',
+            html=serialize(node),
+            text=_get_text(node),
+            table_rows=sum(1 for _ in node.iter('tr')),
+            table_headers=sum(1 for _ in node.iter('th'))
+        )]
+
+    if tag_name == 'hr':
+        return [MarkdownBlock(type='hr', html=serialize(node), text='')]
+
+    if tag_name in CONTAINER_TAGS:
+        return _children_to_blocks(node, check_markers)
+
+    # 其他元素
+    text = _get_text(node)
+    if not text:
+        return []
+    if next(node.iterdescendants(etree.Element), None) is not None:
+        return _children_to_blocks(node, check_markers)
+    return [MarkdownBlock(type='unknown', html=serialize(node), text=text)]
+
+
+def _children_to_blocks(node, check_markers: bool) -> List[MarkdownBlock]:
+    """展开容器节点的子节点（文本、注释和子元素按文档顺序处理）"""
+    blocks = []
+
+    def add_text(text: Optional[str]):
+        text = text.strip() if text else ''
+        if text:
+            blocks.append(MarkdownBlock(type='text', html=text, text=text))
+
+    add_text(node.text)
+    for child in node:
+        if isinstance(child.tag, str):
+            blocks.extend(_node_to_blocks(child, check_markers))
+        elif child.tag is etree.Comment:
+            # BeautifulSoup 中注释也是字符串节点，按文本处理
+            add_text(child.text)
+        add_text(child.tail)
+    return blocks
+
+
+def _is_pagebreak_marker(element) -> bool:
+    """检查元素是否是分页标记（规则同 blocks.is_pagebreak_marker）"""
+    if 'pagebreak-marker' in (element.get('class') or '').split():
+        return True
+    return element.get('data-pagebreak') == 'true'
+
+
+def _get_text(node, strip: bool = True) -> str:
+    """与 BeautifulSoup 的 get_text 一致：不含注释；strip 时每段文本单独去空白后拼接"""
+    if not strip:
+        return ''.join(node.itertext())
+    return ''.join(text for text in (piece.strip() for piece in node.itertext()) if text)
+
+
+def serialize(node) -> str:
+    """按 BeautifulSoup（formatter='minimal'）的规则序列化元素，不含尾随文本"""
+    parts = []
+    _serialize_into(node, parts)
+    return ''.join(parts)
+
+
+def _serialize_into(node, parts: List[str], raw_text: bool = False):
+    tag = node.tag
+    if not isinstance(tag, str):
+        if tag is etree.Comment:
+            parts.append(f'<!--{node.text or ""}-->')
+        elif tag is etree.ProcessingInstruction:
+            parts.append(f'<?{node.target} {node.text or ""}>')
+        return
+
+    parts.append('<' + tag)
+    if node.attrib:
+        multi_valued = MULTI_VALUED_ATTRS['*'] + MULTI_VALUED_ATTRS.get(tag, ())
+        for key, value in sorted(node.attrib.items()):
+            if key in multi_valued:
+                value = ' '.join(value.split())
+            parts.append(' ' + key + '=' + _quote_attribute(value))
+
+    if tag in VOID_TAGS:
+        parts.append('/>')
+        return
+    parts.append('>')
+
+    raw_text = raw_text or tag in RAW_TEXT_TAGS
+    escape = _raw if raw_text else _escape
+    if node.text:
+        parts.append(escape(node.text))
+    for child in node:
+        _serialize_into(child, parts, raw_text)
+        if child.tail:
+            parts.append(escape(child.tail))
+    parts.append(f'</{tag}>')
+
+
+def _raw(text: str) -> str:
+    return text
+
+
+def _escape(text: str) -> str:
+    return text.translate(_ESCAPE_TABLE)
+
+
+def _quote_attribute(value: str) -> str:
+    value = value.translate(_ESCAPE_TABLE)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
@@ -2,80 +2,258 @@
 # src/core/markdown_processor.py
 # ============================================
 import markdown
-from markdown.extensions import fenced_code, tables
+import xml.etree.ElementTree as etree
+import html as html_lib
 import re
 import os
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import replace
 from pathlib import Path
-from typing import List
-from bs4 import BeautifulSoup
+from urllib.parse import unquote, urlparse
+from typing import Callable, Iterator, List, Tuple, Optional, Union
+from markdown.extensions.toc import unique
+from src.core.blocks import MarkdownBlock, html_to_blocks
+from src.core.line_preprocessor import LinePreprocessor, LineTransform
+from src.utils.cache import RenderCache, content_key, MISSING
+from src.utils.image_size import file_version, get_image_size
 import logging
 
 class TaskListExtension(markdown.Extension):
-    """自定义任务列表扩展"""
+    """自定义任务列表扩展（列表后的空行由 LinePreprocessor 的 TaskListTransform 处理）"""
     
     def extendMarkdown(self, md):
-        # 提高优先级到 100，确保在列表处理之前执行
-        md.preprocessors.register(TaskListPreprocessor(md), 'tasklist', 100)
-        md.postprocessors.register(TaskListPostprocessor(md), 'tasklist', 25)
+        # 在行内解析（优先级 20）之前处理，此时列表项文本仍是原始 Markdown
+        md.treeprocessors.register(TaskListTreeprocessor(md), 'tasklist', 25)
 
-class TaskListPreprocessor(markdown.preprocessors.Preprocessor):
-    """预处理任务列表语法"""
+class TaskListTreeprocessor(markdown.treeprocessors.Treeprocessor):
+    """将以 [ ] / [x] 开头的列表项转换为带复选框的任务项"""
     
-    def run(self, lines):
-        new_lines = []
-        in_list = False
-        
-        for line in lines:
-            stripped = line.strip()
-            
-            # 识别任务列表项
-            if stripped.startswith('- [ ] ') or stripped.startswith('- [x] ') or \
-               stripped.startswith('* [ ] ') or stripped.startswith('* [x] '):
-                # 将任务列表标记转换为 HTML 注释，避免被 Markdown 再次处理
-                if stripped.startswith('- [x] ') or stripped.startswith('* [x] '):
-                    new_line = line.replace('[x] ', '<!--tasklist-checked--> ', 1)
+    def run(self, root):
+        for li in root.iter('li'):
+            # 紧凑列表的文本直接在 li 中，松散列表则在第一个 p 中
+            holder = li
+            if not li.text or not li.text.strip():
+                if len(li) and li[0].tag == 'p':
+                    holder = li[0]
                 else:
-                    new_line = line.replace('[ ] ', '<!--tasklist-unchecked--> ', 1)
-                
-                new_lines.append(new_line)
-                in_list = True
+                    continue
+            
+            text = holder.text or ''
+            if text.startswith('[x] '):
+                checked = True
+            elif text.startswith('[ ] '):
+                checked = False
             else:
-                # 如果从任务列表切换到普通文本，插入一个空行保证 Markdown 正常渲染
-                if in_list and stripped and not stripped.startswith(('-', '*')):
-                    new_lines.append('')
-                    in_list = False
-                
-                new_lines.append(line)
-        
-        return new_lines
+                continue
+            
+            checkbox = etree.Element('input')
+            checkbox.set('type', 'checkbox')
+            checkbox.set('class', 'task-list-checkbox')
+            if checked:
+                checkbox.set('checked', 'checked')
+            checkbox.set('disabled', 'disabled')
+            checkbox.tail = ' ' + text[4:].lstrip()
+            
+            holder.text = None
+            holder.insert(0, checkbox)
+            li.set('class', 'task-list-item')
 
-class TaskListPostprocessor(markdown.postprocessors.Postprocessor):
-    """后处理：将占位注释替换为真正的复选框"""
+class LocalImageExtension(markdown.Extension):
+    """修复本地图片路径，确保能在 QWebEngineView 中显示"""
     
-    def run(self, text):
-        # 将任务列表标记转换为带有 checkbox 的 li
-        # 替换已选中的任务
-        text = re.sub(
-            r'<li><!--tasklist-checked-->\s*(.*?)</li>',
-            r'<li class="task-list-item"><input type="checkbox" class="task-list-checkbox" checked disabled> \1</li>',
-            text,
-            flags=re.DOTALL
-        )
+    def extendMarkdown(self, md):
+        # 在行内解析（优先级 20）之后处理，此时图片元素和行内 HTML 都已生成
+        md.treeprocessors.register(LocalImageTreeprocessor(md), 'local_images', 15)
+
+class LocalImageTreeprocessor(markdown.treeprocessors.Treeprocessor):
+    """处理 Markdown 图片语法生成的 img 元素，以及原始 HTML 中的 img 标签"""
+    
+    IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+    IMG_ATTR_RE = re.compile(r'([^\s=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+    
+    def __init__(self, md=None):
+        super().__init__(md)
+        # 本次转换引用的本地图片及其版本：输出中的尺寸和 URL 版本取决于这些文件
+        self.images: List[Tuple[str, Optional[Tuple[int, int]]]] = []
+    
+    def run(self, root):
+        self.images = []
+        for img in root.iter('img'):
+            src = img.get('src', '')
+            if not src:
+                continue
+            self._track(src)
+            img.set('src', fix_image_src(src))
+            if not img.get('style'):
+                img.set('style', DEFAULT_IMAGE_STYLE)
+            img.set('data-protected', 'true')
+            # 本地图片的实际尺寸，供分页器计算渲染高度
+            size = probe_image_size(src)
+            if size:
+                img.set('data-width', str(size[0]))
+                img.set('data-height', str(size[1]))
         
-        # 替换未选中的任务
-        text = re.sub(
-            r'<li><!--tasklist-unchecked-->\s*(.*?)</li>',
-            r'<li class="task-list-item"><input type="checkbox" class="task-list-checkbox" disabled> \1</li>',
-            text,
-            flags=re.DOTALL
-        )
+        # 原始 HTML 片段以字符串形式暂存在 htmlStash 中
+        stash = self.md.htmlStash.rawHtmlBlocks
+        for index, block in enumerate(stash):
+            if isinstance(block, str) and '<img' in block.lower():
+                stash[index] = self.IMG_TAG_RE.sub(self._fix_img_tag, block)
+    
+    def _fix_img_tag(self, match) -> str:
+        """改写单个 img 标签"""
+        attrs = {}
+        for name, value in self.IMG_ATTR_RE.findall(match.group(0)[4:].rstrip('/>')):
+            if value[:1] in ('"', "'"):
+                value = value[1:-1]
+            attrs[name.lower()] = value
+        
+        src = attrs.get('src', '')
+        if not src:
+            return match.group(0)
+        raw_src = html_lib.unescape(src)
+        self._track(raw_src)
+        attrs['src'] = html_lib.escape(fix_image_src(raw_src))
+        if not attrs.get('style'):
+            attrs['style'] = DEFAULT_IMAGE_STYLE
+        attrs['data-protected'] = 'true'
+        size = probe_image_size(raw_src)
+        if size:
+            attrs['data-width'] = str(size[0])
+            attrs['data-height'] = str(size[1])
         
-        return text
+        rendered = ' '.join(f'{name}="{value}"' if value else name for name, value in attrs.items())
+        return f'<img {rendered}>'
+    
+    def _track(self, src: str):
+        try:
+            path = local_image_path(src)
+        except Exception:
+            return
+        if path:
+            # 在读取尺寸、生成 URL 之前记录版本，期间文件变化时缓存只会多失效一次
+            self.images.append((path, file_version(path)))
+
+class HighlightCacheExtension(markdown.Extension):
+    """
+    让本实例的 fenced_code 和 codehilite 使用带缓存的 CachedCodeHilite
+
+    须排在这两个扩展之后，替换它们注册的处理器；不修改模块全局的 CodeHilite，
+    同一进程中的其它 Markdown 实例不受影响
+    """
+    
+    def extendMarkdown(self, md):
+        # 仅在文档用到代码块时加载（会导入 Pygments）
+        from src.core.highlight_cache import install_cached_hilite
+        install_cached_hilite(md)
+
+def fix_image_src(src: str) -> str:
+    """将图片地址转换为 QWebEngineView 可加载的 URL（兼容任意盘符）"""
+    # 已是可用的 URL / data URI 直接返回
+    if src.startswith(('http://', 'https://', 'data:', 'file:')):
+        return src
+    # Windows 绝对路径：任意盘符，如 E:\ 或 E:/ 开头
+    if WINDOWS_PATH_RE.match(src):
+        return 'file:///' + src.replace('\\', '/')
+    # 相对路径 -> 绝对路径
+    try:
+        return 'file:///' + os.path.abspath(src).replace('\\', '/')
+    except Exception:
+        return src
+
+def local_image_path(src: str) -> Optional[str]:
+    """图片地址对应的本地文件路径；网络图片和 data URI 返回 None"""
+    if src.startswith(('http://', 'https://', 'data:')):
+        return None
+    if src.startswith('file:'):
+        path = unquote(urlparse(src).path)
+        # file:///C:/xxx 解析后为 /C:/xxx
+        if re.match(r'^/[A-Za-z]:', path):
+            path = path[1:]
+        return path
+    if WINDOWS_PATH_RE.match(src):
+        return src
+    return os.path.abspath(src)
+
+def probe_image_size(src: str) -> Optional[Tuple[int, int]]:
+    """读取本地图片的尺寸（只读文件头，按路径和修改时间缓存）"""
+    try:
+        path = local_image_path(src)
+    except Exception:
+        return None
+    if not path:
+        return None
+    size = get_image_size(path)
+    # Markdown 中的路径可能经过 URL 编码（如空格写作 %20）
+    if size is None and '%' in path:
+        size = get_image_size(unquote(path))
+    return size
+
+# 转换结果引用的本地图片：((路径, (修改时间, 大小) 或 None), ...)
+ImageVersions = Tuple[Tuple[str, Optional[Tuple[int, int]]], ...]
+
+def images_current(versions: ImageVersions) -> bool:
+    """缓存结果引用的本地图片是否都未变化"""
+    return all(file_version(path) == version for path, version in versions)
+
+DEFAULT_IMAGE_STYLE = 'max-width: 90%; max-height: 50vh; height: auto; display: block; margin: 0 auto;'
+WINDOWS_PATH_RE = re.compile(r'^[A-Za-z]:[\\/]')
 
 class MarkdownProcessor:
-    def __init__(self):
+    # 增量模式下块级 HTML 缓存的最大条目数
+    BLOCK_CACHE_SIZE = 4096
+    # 按扩展组合缓存的 Markdown 实例的最大数量
+    MARKDOWN_INSTANCE_CACHE_SIZE = 16
+    # 解析输出格式或算法变化时递增，使旧的结果缓存（含磁盘缓存）失效
+    CACHE_VERSION = 4
+
+    # 块切分用的预编译正则
+    _FENCE_RE = re.compile(r'^(`{3,}|~{3,})')
+    _ATX_HEADING_RE = re.compile(r'^#{1,6}')
+    _LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[*+-]|\d+[.)])[ \t]')
+    _HTML_BLOCK_START_RE = re.compile(r'^ {0,3}<([A-Za-z][\w-]*)')
+    # 需要全文上下文的语法
+    _REFERENCE_DEF_RE = re.compile(r'^ {0,3}(?:\[(?!\^)[^\]\n]+\]:|\*\[[^\]\n]+\]:).*$', re.MULTILINE)
+    _TOC_MARKER = '[TOC]'
+    _FOOTNOTE_MARKER = '[^'
+    _HEADING_ID_RE = re.compile(r'<(h[1-6]) id="([^"]*)"')
+    _HTML_VOID_TAGS = frozenset({'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                                 'link', 'meta', 'source', 'track', 'wbr'})
+
+    # 扩展的触发条件：(子串, 正则)，文档中出现任一子串或匹配正则时才加载该扩展。
+    # 检测可以多报但不能漏报，否则会改变输出；未列出的扩展总是加载
+    EXTENSION_TRIGGERS = {
+        'toc': (('#', '[TOC]'), re.compile(r'^[ \t>]*(?:=+|-+)[ \t]*$|<h[1-6]', re.MULTILINE | re.IGNORECASE)),
+        'abbr': (('*[',), None),
+        'attr_list': (('{',), None),
+        'def_list': ((), re.compile(r'^[ \t>]*:[ \t]', re.MULTILINE)),
+        'admonition': (('!!!',), None),
+        'codehilite': (('```', '~~~'), re.compile(r'^[ >]*(?: {4}|\t)', re.MULTILINE)),
+        'fenced_code': (('```', '~~~'), None),
+        'footnotes': (('[^',), None),
+        'md_in_html': (('markdown',), None),
+        'sane_lists': ((), re.compile(r'^[ \t>]*(?:[*+-]|\d+[.)])[ \t]', re.MULTILINE)),
+        'smarty': (("'", '"', '--', '...'), None),
+        'tables': (('|',), None),
+        'wikilinks': (('[[',), None),
+    }
+    # meta 扩展只处理文档开头的元数据（首行为 key: value 或 ---）
+    _META_FIRST_LINE_RE = re.compile(r'^[ \t]*(?:[A-Za-z0-9_-]+:|-{3})')
+
+    def __init__(self, incremental: bool = False, cache: Optional[RenderCache] = None):
+        # 增量模式：按顶层块缓存 HTML，只重新转换发生变化的块
+        self.incremental = incremental
+        # 整篇文档的结果缓存（可与分页器共享），撤销/重做、重新打开文件时直接命中
+        self.cache = cache
+        self._block_cache: "OrderedDict[str, Tuple[str, List[Tuple[str, str]], List[MarkdownBlock], ImageVersions]]" = OrderedDict()
+        # 按扩展组合缓存的 Markdown 实例
+        self._md_instances: "OrderedDict[Tuple[str, ...], markdown.Markdown]" = OrderedDict()
+        # Markdown 转换前的行级预处理（标题清理、分页标记、任务列表）
+        self.line_preprocessor = LinePreprocessor.default()
         self.extensions: List[str] = [
             TaskListExtension(),
+            LocalImageExtension(),
             'meta',
             'toc',
             'abbr',
@@ -84,6 +262,7 @@ class MarkdownProcessor:
             'admonition',
             'codehilite',
             'fenced_code',
+            HighlightCacheExtension(),  # 须在 codehilite 和 fenced_code 之后
             'footnotes',
             'md_in_html',
             'sane_lists',
@@ -106,19 +285,19 @@ class MarkdownProcessor:
     def parse(self, text: str) -> str:
         """解析 Markdown 文本为 HTML"""
         try:
-            text = self._remove_title_decorations(text)
-            text = self._remove_title_newlines(text)
-            text = self._process_pagebreaks_before_markdown(text)
-            
-            md = markdown.Markdown(
-                extensions=self.extensions,
-                extension_configs=self.extension_configs
-            )
-            html = md.convert(text)
+            key = self._cache_key('html', text)
+            html = self._cache_get(key)
+            if html is not MISSING:
+                return html
             
-            html = self._fix_local_image_paths(html)
-            html = self._add_tasklist_styles(html)
+            start = time.perf_counter()
+            images = []
+            if self.incremental and not self._needs_full_parse(text):
+                html = self._parse_incremental(text, images)
+            else:
+                html = self._convert(text, images)
             
+            self._cache_put(key, html, images, time.perf_counter() - start)
             return html
             
         except ValueError as ve:
@@ -131,183 +310,400 @@ class MarkdownProcessor:
             logging.error(f"Markdown 解析错误: {e}")
             return f"<p style='color: red;'>解析错误: {str(e)}</p>"
     
-    def _fix_local_image_paths(self, html: str) -> str:
-        """修复本地图片路径，确保能在 QWebEngineView 中显示（兼容任意盘符）"""
-        from bs4 import BeautifulSoup
-        import re
-        soup = BeautifulSoup(html, 'html.parser')
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
-            if not src:
-                continue
-            # 已是可用的 URL / data URI 直接跳过
-            if src.startswith(('http://', 'https://', 'data:', 'file:')):
-                img['data-protected'] = 'true'
-                if not img.get('style'):
-                    img['style'] = 'max-width: 90%; max-height: 50vh; height: auto; display: block; margin: 0 auto;'
-                continue
-            # Windows 绝对路径：任意盘符，如 E:\ 或 E:/ 开头
-            if re.match(r'^[A-Za-z]:[\\/]', src):
-                src = src.replace('\\', '/')
-                if not src.startswith('file:'):
-                    src = 'file:///' + src
+    def parse_blocks(self, text: str) -> List[MarkdownBlock]:
+        """
+        解析 Markdown 文本为结构化的顶层块列表，可直接交给 SmartPaginator 分页
+
+        增量模式下每个块带有源文本行号范围，且块的统计信息随块缓存复用；
+        退回完整解析时行号为 0
+        """
+        try:
+            # 非增量模式的块没有行号，与增量模式分开缓存
+            key = self._cache_key('blocks' if self.incremental else 'blocks-full', text)
+            result = self._cache_get(key)
+            if result is not MISSING:
+                return list(result)
+            
+            started = time.perf_counter()
+            images = []
+            if not (self.incremental and not self._needs_full_parse(text)):
+                result = html_to_blocks(self._convert(text, images))
             else:
-                # 相对路径 -> 绝对路径
-                try:
-                    abs_path = os.path.abspath(src).replace('\\', '/')
-                    src = 'file:///' + abs_path
-                except Exception:
-                    pass
-            # 应用修正
-            img['src'] = src
-            # 默认样式
-            if not img.get('style'):
-                img['style'] = 'max-width: 90%; max-height: 50vh; height: auto; display: block; margin: 0 auto;'
-            img['data-protected'] = 'true'
-        return str(soup)
+                result = list(self._iter_split_blocks(text, images))
+            
+            self._cache_put(key, list(result), images, time.perf_counter() - started)
+            return result
+            
+        except Exception as e:
+            logging.error(f"Markdown 解析错误: {e}")
+            return html_to_blocks(f"<p style='color: red;'>解析错误: {str(e)}</p>")
     
-    def _remove_title_decorations(self, text: str) -> str:
-        """移除标题末尾的装饰性符号，但保留内容中的符号"""
-        # 匹配 Markdown 标题行，支持 # 到 ######，以及标题后面的任意 Unicode 符号
-        # 但保留标题文本本身
-        def replacer(match):
-            # 提取标题前缀（# 符号）和标题文本
-            title_prefix = match.group(1)
-            title_text = match.group(2).strip()
-            # 移除标题文本末尾的装饰性符号，但保留中间的符号
-            # 使用正则表达式匹配标题文本末尾的一个或多个非字母数字Unicode字符
-            clean_text = re.sub(r'([^\w\s])+$', '', title_text)
-            # 重新组合标题
-            return f"{title_prefix} {clean_text}"
-        
-        # 对各级标题应用替换
-        for level in range(1, 7):
-            # 匹配以 level 个 # 开头，后接空格和标题文本的行
-            pattern = rf'^({'#' * level})\s+(.+)$'
-            text = re.sub(pattern, replacer, text, flags=re.MULTILINE)
-        
-        return text
+    def cached_blocks(self, text: str) -> Optional[List[MarkdownBlock]]:
+        """已缓存的块列表（与 parse_blocks 的结果相同），未缓存时返回 None"""
+        key = self._cache_key('blocks' if self.incremental else 'blocks-full', text)
+        result = self._cache_get(key)
+        return None if result is MISSING else list(result)
     
-    def _remove_title_newlines(self, text: str) -> str:
-        """移除标题后的换行符"""
-        # 对各级标题应用替换
-        for level in range(1, 7):
-            # 匹配标题行及其后的换行符
-            pattern = rf'^({"#" * level})\s+(.+?)(\n+)$'
-            # 替换为标题行加一个空格
-            replacement = r'\1 \2 '
-            text = re.sub(pattern, replacement, text, flags=re.MULTILINE)
-        return text
-        
-        return text
+    def iter_blocks(self, text: str) -> Iterator[MarkdownBlock]:
+        """
+        流式解析：逐个产出顶层块，可直接交给 SmartPaginator.iter_pages
+
+        无论是否为增量模式都按顶层块逐块转换，第一个块无需等待整篇文档
+        转换完成；脚注和 [TOC] 依赖全文结构，此时退回完整解析后再逐个产出。
+        配置了结果缓存时会收集全部块以便写入缓存，此时内存占用与文档长度成正比
+        """
+        try:
+            key = self._cache_key('blocks', text)
+            cached = self._cache_get(key)
+            if cached is not MISSING:
+                yield from cached
+                return
+            
+            started = time.perf_counter()
+            images = []
+            if self._needs_full_parse(text):
+                blocks = html_to_blocks(self._convert(text, images))
+                self._cache_put(key, list(blocks), images, time.perf_counter() - started)
+                yield from blocks
+                return
+            
+            collected = [] if key else None
+            for block in self._iter_split_blocks(text, images):
+                if collected is not None:
+                    collected.append(block)
+                yield block
+            self._cache_put(key, collected, images, time.perf_counter() - started)
+            
+        except Exception as e:
+            logging.error(f"Markdown 解析错误: {e}")
+            yield from html_to_blocks(f"<p style='color: red;'>解析错误: {str(e)}</p>")
     
+    def register_line_transform(self, transform: Union[LineTransform, Callable[[str], Optional[str]]], name: str, priority: float):
+        """
+        注册自定义行变换，与内置预处理在同一次逐行扫描中执行
 
+        内置变换的优先级：heading_decorations 40、heading_newlines 30、
+        pagebreak 20、tasklist 10，数值越大越先执行
+        """
+        self.line_preprocessor.register(transform, name, priority)
+        # 预处理结果改变，已缓存的块不再有效
+        self.clear_cache()
+    
+    def clear_cache(self):
+        """清空增量模式的块缓存"""
+        self._block_cache.clear()
+    
+    def config_fingerprint(self) -> str:
+        """影响解析输出的全部配置（扩展、扩展配置、行变换）的摘要"""
+        extensions = [
+            ext if isinstance(ext, str) else f"{type(ext).__module__}.{type(ext).__qualname__}"
+            for ext in self.extensions
+        ]
+        configs = sorted((name, sorted(config.items())) for name, config in self.extension_configs.items())
+        return content_key(self.CACHE_VERSION, extensions, configs, self.line_preprocessor.signature())
+    
+    def _cache_key(self, kind: str, text: str) -> Optional[str]:
+        """结果缓存的键；未配置缓存时返回 None"""
+        if self.cache is None:
+            return None
+        # 相对路径的图片按当前工作目录解析，目录不同时结果也不同
+        return content_key('markdown', kind, self.config_fingerprint(), os.getcwd(), text)
     
-    def _process_pagebreaks_before_markdown(self, text: str) -> str:
+    def _cache_get(self, key: Optional[str]):
         """
-        在 Markdown 解析之前处理分页标记
-        直接将 <!-- pagebreak --> 替换为特殊的 HTML div
+        读取结果缓存；引用的本地图片变化（尺寸、URL 中的版本随之变化）时视为未命中
         """
-        # 匹配 HTML 注释形式的分页标记（支持大小写和空格变化）
-        pattern = r'<!--\s*pagebreak\s*-->'
-        
-        # 直接替换为 HTML div（这个 div 不会被 Markdown 解析器改变）
-        replacement = '\n\n<div class="pagebreak-marker" data-pagebreak="true"></div>\n\n'
-        
-        # 执行替换
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        cached = self.cache.get(key) if key else MISSING
+        if cached is MISSING:
+            return MISSING
+        result, images = cached
+        return result if images_current(images) else MISSING
+    
+    def _cache_put(self, key: Optional[str], result, images: list, cost: float):
+        """写入结果缓存，连同转换时引用的本地图片版本"""
+        if key:
+            self.cache.put(key, (result, tuple(dict.fromkeys(images))), cost)
+    
+    def _get_markdown(self, text: str) -> markdown.Markdown:
+        """
+        获取适用于该文本的 Markdown 实例（每次转换前 reset）
+
+        只加载文档实际用到的扩展，相同的扩展组合复用同一个实例
+        """
+        extensions = self._detect_extensions(text)
+        key = tuple(ext if isinstance(ext, str) else type(ext).__qualname__ for ext in extensions)
+        md = self._md_instances.get(key)
+        if md is None:
+            md = markdown.Markdown(
+                extensions=extensions,
+                extension_configs=self.extension_configs
+            )
+            self._md_instances[key] = md
+            if len(self._md_instances) > self.MARKDOWN_INSTANCE_CACHE_SIZE:
+                self._md_instances.popitem(last=False)
+        else:
+            self._md_instances.move_to_end(key)
+            md.reset()
+        return md
+    
+    def _detect_extensions(self, text: str) -> list:
+        """快速扫描文本，筛选出可能用到的扩展（保持 self.extensions 中的顺序）"""
+        needed = set()
+        for name, (substrings, pattern) in self.EXTENSION_TRIGGERS.items():
+            if any(sub in text for sub in substrings) or (pattern is not None and pattern.search(text)):
+                needed.add(name)
+        if self._META_FIRST_LINE_RE.match(text):
+            needed.add('meta')
         
-        return text
+        extensions = []
+        for ext in self.extensions:
+            if isinstance(ext, HighlightCacheExtension):
+                if 'codehilite' in needed or 'fenced_code' in needed:
+                    extensions.append(ext)
+            elif not isinstance(ext, str) or ext in needed:
+                extensions.append(ext)
+            elif ext not in self.EXTENSION_TRIGGERS and ext != 'meta':
+                extensions.append(ext)
+        return extensions
     
-    def _add_tasklist_styles(self, html: str) -> str:
-        """为任务列表添加样式并清理HTML标题后的空白字符"""
-        soup = BeautifulSoup(html, 'html.parser')
+    def _convert(self, text: str, images: Optional[list] = None) -> str:
+        """
+        完整转换流程：预处理 -> Markdown（图片路径和任务列表在树处理阶段完成）
+
+        Args:
+            images: 给定时追加本次转换引用的本地图片及其版本
+        """
+        text = self.line_preprocessor.run(text)
+        md = self._get_markdown(text)
+        html = md.convert(text)
+        if images is not None and 'local_images' in md.treeprocessors:
+            images.extend(md.treeprocessors['local_images'].images)
+        return html
+    
+    # ----------------------
+    # 增量解析
+    # ----------------------
+    def _needs_full_parse(self, text: str) -> bool:
+        """
+        脚注编号和 [TOC] 目录依赖整篇文档的结构，无法逐块转换，
+        遇到时退回完整解析
+        """
+        return self._FOOTNOTE_MARKER in text or self._TOC_MARKER in text
+    
+    def _collect_reference_context(self, blocks: List[Tuple[str, int, int]]) -> str:
+        """
+        收集全文的引用链接定义和缩写定义
+
+        这些定义可以出现在文档任意位置，却会影响其它块的渲染，
+        因此附加到每个块的末尾参与转换，并计入块缓存的键。
+        围栏代码块和缩进代码块中形如定义的行只是代码，不收集
+        """
+        definitions = []
+        for source, _, _ in blocks:
+            if ']:' not in source or source.startswith(('    ', '\t')):
+                continue
+            lines = []
+            fence = None
+            for line in source.split('\n'):
+                if fence is not None:
+                    if line.rstrip(' ') == fence:
+                        fence = None
+                    continue
+                fence_match = self._FENCE_RE.match(line)
+                if fence_match:
+                    fence = fence_match.group(1)
+                    continue
+                lines.append(line)
+            definitions.extend(self._REFERENCE_DEF_RE.findall('\n'.join(lines)))
+        if not definitions:
+            return ''
+        return '\n\n' + '\n'.join(line.strip() for line in definitions)
+    
+    def _split_blocks(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        将 Markdown 源文本切分为顶层块
+
+        只在确定安全的位置切分：空行之后且下一行不是缩进续行、
+        不在围栏代码块或未闭合的 HTML 块内部；松散列表和连续的
+        引用块保持在同一个块中。ATX 标题总是独占一个块。
+
+        Returns:
+            (块源文本, 起始行号, 结束行号) 列表，行号从 1 开始
+        """
+        lines = text.split('\n')
+        blocks = []
+        current: List[str] = []
+        start = 0
+        fence = None          # 当前围栏代码块的标记
+        html_tag = None       # 当前未闭合的 HTML 块标签
+        html_depth = 0
+        in_comment = False
+        pending_blank = False
+        first_line = ''
+
+        def flush(end_index: int):
+            nonlocal current
+            if current:
+                blocks.append(('\n'.join(current), start + 1, end_index))
+            current = []
+
+        for index, line in enumerate(lines):
+            stripped = line.strip()
+
+            # 围栏代码块内部原样收集
+            if fence is not None:
+                current.append(line)
+                if line.rstrip(' ') == fence:
+                    fence = None
+                continue
+
+            # 未闭合的 HTML 块 / 注释内部原样收集
+            if html_depth > 0 or in_comment:
+                current.append(line)
+                html_depth, in_comment = self._update_html_state(line, html_tag, html_depth, in_comment)
+                continue
+
+            if not stripped:
+                if current:
+                    pending_blank = True
+                    current.append(line)
+                continue
+
+            is_heading = self._ATX_HEADING_RE.match(line) is not None
+            if current and (is_heading or self._ATX_HEADING_RE.match(first_line) or
+                            (pending_blank and self._is_block_start(line, first_line, current,
+                                                                    lines[index + 1] if index + 1 < len(lines) else ''))):
+                # 去掉块尾部的空行，使块的源文本与行号范围一致
+                while current and not current[-1].strip():
+                    current.pop()
+                flush(start + len(current))
+            if not current:
+                start = index
+                first_line = line
+            pending_blank = False
+            current.append(line)
+
+            fence_match = self._FENCE_RE.match(line)
+            if fence_match:
+                fence = fence_match.group(1)
+                continue
+
+            html_match = self._HTML_BLOCK_START_RE.match(line) if line is first_line else None
+            if html_match and html_match.group(1).lower() not in self._HTML_VOID_TAGS:
+                html_tag = html_match.group(1).lower()
+                html_depth, in_comment = self._update_html_state(line, html_tag, 0, False)
+            elif '<!--' in line:
+                html_depth, in_comment = self._update_html_state(line, None, 0, False)
+
+        while current and not current[-1].strip():
+            current.pop()
+        flush(start + len(current))
+        return blocks
+    
+    def _is_block_start(self, line: str, first_line: str, current: List[str], next_line: str) -> bool:
+        """判断空行之后的这一行能否开始一个新的顶层块"""
+        # 缩进行是上一块（列表项、代码块、提示框等）的续行
+        if line[0] in (' ', '\t'):
+            return False
+        # 定义列表的后续定义；相邻的定义列表会被合并为同一个 dl
+        if line.startswith(': '):
+            return False
+        if next_line.startswith(': ') and any(item.startswith(': ') for item in current):
+            return False
+        # 松散列表：列表项之间的空行不切分
+        if self._LIST_ITEM_RE.match(line) and self._LIST_ITEM_RE.match(first_line):
+            return False
+        # 连续的引用块会被合并为一个 blockquote
+        if line.startswith('>') and first_line.lstrip().startswith('>'):
+            return False
+        return True
+    
+    def _update_html_state(self, line: str, tag: Optional[str], depth: int, in_comment: bool) -> Tuple[int, bool]:
+        """更新 HTML 块的嵌套深度和注释状态"""
+        if in_comment or '<!--' in line:
+            opened = line.rfind('<!--')
+            closed = line.rfind('-->')
+            if opened >= 0:
+                in_comment = closed < opened
+            elif closed >= 0:
+                in_comment = False
+        if tag:
+            lowered = line.lower()
+            depth += len(re.findall(rf'<{tag}(?=[\s>/])', lowered))
+            depth -= lowered.count(f'</{tag}>')
+            depth = max(depth, 0)
+        return depth, in_comment
+    
+    def _parse_incremental(self, text: str, images: Optional[list] = None) -> str:
+        """
+        增量解析：逐块转换并按块源文本的哈希缓存结果，
+        编辑时只有发生变化的块需要重新转换
+        """
+        return '\n'.join(html for html, _, _, _ in self._iter_converted_blocks(text, images))
+    
+    def _iter_split_blocks(self, text: str, images: Optional[list] = None) -> Iterator[MarkdownBlock]:
+        """逐块转换并产出带源文本行号的结构化块"""
+        for _, blocks, start, end in self._iter_converted_blocks(text, images):
+            for block in blocks:
+                yield replace(block, line_start=start, line_end=end)
+    
+    def _iter_converted_blocks(self, text: str, images: Optional[list] = None) -> Iterator[Tuple[str, List[MarkdownBlock], int, int]]:
+        """
+        逐块转换源文本（images 给定时追加各块引用的本地图片及其版本）
+
+        Yields:
+            (块 HTML, 块内的结构化顶层元素, 起始行号, 结束行号)
+        """
+        source_blocks = self._split_blocks(text)
+        context = self._collect_reference_context(source_blocks)
+        used_ids = set()
         
-        for header in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            for sibling in list(header.next_siblings):
-                if isinstance(sibling, str) and sibling.strip() == '':
-                    sibling.replace_with('')
+        for source, start, end in source_blocks:
+            html, heading_ids, blocks, block_images = self._convert_block(source, context, start == 1)
+            if images is not None:
+                images.extend(block_images)
+            if not html:
+                continue
+            # 标题 id 需要在整篇文档范围内保持唯一（与 toc 扩展的规则一致）
+            for tag, heading_id in heading_ids:
+                if heading_id in used_ids:
+                    new_id = unique(heading_id, used_ids)
+                    old_attr = f'<{tag} id="{heading_id}"'
+                    new_attr = f'<{tag} id="{new_id}"'
+                    html = html.replace(old_attr, new_attr, 1)
+                    blocks = [
+                        replace(block, html=block.html.replace(old_attr, new_attr, 1))
+                        if block.type == 'heading' and old_attr in block.html else block
+                        for block in blocks
+                    ]
                 else:
-                    break
+                    used_ids.add(heading_id)
+            yield html, blocks, start, end
+    
+    def _convert_block(self, source: str, context: str, is_first: bool) -> Tuple[str, List[Tuple[str, str]], List[MarkdownBlock], ImageVersions]:
+        """
+        转换单个顶层块，命中缓存时直接返回
+
+        与结果缓存相同，相对路径的图片按当前工作目录解析；块引用的本地图片变化时重新转换
+        """
+        key = hashlib.blake2b(
+            f"{int(is_first)}\x00{os.getcwd()}\x00{context}\x00{source}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
         
-        if soup.find('input', {'type': 'checkbox', 'class': 'task-list-checkbox'}):
-            style_tag = soup.new_tag('style')
-            style_tag.string = """
-                .task-list {
-                    list-style-type: none;
-                    padding-left: 0;
-                }
-                
-                .task-list-item {
-                    list-style-type: none;
-                    position: relative;
-                    padding-left: 25px;
-                    margin-bottom: 8px;
-                }
-                
-                .task-list-checkbox {
-                    position: absolute;
-                    left: 0;
-                    top: 3px;
-                    margin-right: 10px;
-                }
-            """
-            if soup.head:
-                soup.head.append(style_tag)
-            else:
-                new_head = soup.new_tag('head')
-                new_head.append(style_tag)
-                soup.html.insert(0, new_head)
+        cached = self._block_cache.get(key)
+        if cached is not None and images_current(cached[3]):
+            self._block_cache.move_to_end(key)
+            return cached
         
-        return str(soup)
-    
-    def _add_tasklist_styles(self, html: str) -> str:
-        """为任务列表添加样式"""
-        if '<input type="checkbox" class="task-list-checkbox"' in html:
-            style = """
-            <style>
-                .task-list {
-                    list-style-type: none;
-                    padding-left: 0;
-                }
-                
-                .task-list-item {
-                    list-style-type: none;
-                    margin-left: 0;
-                    padding-left: 0;
-                    position: relative;
-                }
-                
-                .task-list-checkbox {
-                    margin-right: 8px;
-                    width: 16px;
-                    height: 16px;
-                    vertical-align: middle;
-                    position: relative;
-                    top: -1px;
-                    border: 1px solid var(--border-color, #ddd);
-                    border-radius: 3px;
-                    background: var(--bg-color, #fff);
-                    appearance: none;
-                }
-                
-                .task-list-checkbox:checked {
-                    background: var(--checkbox-bg, #ffeef0);
-                    border-color: var(--primary-color, #FF2442);
-                }
-                
-                .task-list-checkbox:checked::before {
-                    content: '✓';
-                    position: absolute;
-                    color: var(--primary-color, #FF2442);
-                    font-weight: bold;
-                    font-size: 12px;
-                    left: 2px;
-                    top: -2px;
-                }
-            </style>
-            """
-            # 将样式插入到HTML开头
-            html = style + html
+        # 元数据（meta 扩展）只能出现在文档开头，其余块前加空行避免被误识别
+        block_text = source + context if is_first else '\n' + source + context
+        images = []
+        html = self._convert(block_text, images).strip()
+        heading_ids = self._HEADING_ID_RE.findall(html)
         
-        return html
+        entry = (html, heading_ids, html_to_blocks(html), tuple(dict.fromkeys(images)))
+        self._block_cache[key] = entry
+        if len(self._block_cache) > self.BLOCK_CACHE_SIZE:
+            self._block_cache.popitem(last=False)
+        return entry
@@ -0,0 +1,181 @@
+# ============================================
+# src/ui/block_measurer.py - 浏览器实测块高度
+# ============================================
+from PyQt6.QtCore import QObject, QTimer, QUrl, pyqtSignal, pyqtSlot
+from PyQt6.QtWebEngineCore import QWebEnginePage
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Tuple
+import logging
+import threading
+from src.core.html_generator import HTMLGenerator
+from src.utils.cache import LRUCache, content_key
+
+# (块 HTML, 主题, 字体, 字号, 尺寸) -> 实测高度（像素）
+MEASURED_HEIGHTS = LRUCache(16384)
+
+# 每个块包在独立的容器里；flow-root 让子元素的外边距计入容器高度
+MEASURE_CSS = """
+<style>
+    .cc-measure {{ display: flow-root; }}
+    /* 离屏页面没有视口，按页面高度换算图片的 max-height: 50vh */
+    img {{ max-height: {max_image_height}px !important; }}
+</style>
+"""
+
+# 图片全部加载完成后一次性返回所有块的高度，否则返回 null 等待重试
+MEASURE_SCRIPT = """
+(function() {
+    var images = document.images;
+    for (var i = 0; i < images.length; i++) {
+        if (!images[i].complete) return null;
+    }
+    var nodes = document.querySelectorAll('#content > .cc-measure');
+    var heights = [];
+    for (var j = 0; j < nodes.length; j++) {
+        heights.push(nodes[j].getBoundingClientRect().height);
+    }
+    return heights;
+})();
+"""
+
+
+def measure_signature(theme: str, font_family: Optional[str], font_size: int, page_size: str) -> Tuple:
+    """影响块渲染高度的全部设置"""
+    return theme, font_family or '', font_size, page_size
+
+
+def height_key(block_html: str, signature: Tuple) -> str:
+    return content_key('block-height', signature, block_html)
+
+
+@dataclass
+class MeasureJob:
+    """一次测量任务：由渲染线程创建，GUI 线程测量完成后设置 done"""
+    blocks_html: List[str]
+    theme: str
+    font_family: Optional[str]
+    font_size: int
+    page_size: str
+    heights: List[int] = field(default_factory=list)
+    cancelled: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def signature(self) -> Tuple:
+        return measure_signature(self.theme, self.font_family, self.font_size, self.page_size)
+
+
+class BlockHeightMeasurer(QObject):
+    """
+    用离屏 QWebEnginePage 按真实主题 CSS 和页面宽度排版所有块，
+    通过一次 runJavaScript 取回每个块的 getBoundingClientRect().height
+
+    对象位于 GUI 线程；submit 可在任意线程调用，任务按顺序逐个处理。
+    setHtml 的内容有 2MB 上限，块较多时分批加载
+    """
+
+    _submitted = pyqtSignal(object)  # MeasureJob
+
+    MAX_BATCH_CHARS = 1_500_000
+    MAX_RETRIES = 40  # 等待图片加载的最大重试次数
+    RETRY_INTERVAL = 50  # 毫秒
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._page: Optional[QWebEnginePage] = None
+        self._jobs: Deque[MeasureJob] = deque()
+        self._job: Optional[MeasureJob] = None
+        self._batch: List[str] = []
+        self._offset = 0
+        self._retries = 0
+        self._submitted.connect(self._enqueue)
+
+    def submit(self, job: MeasureJob):
+        """提交测量任务（跨线程时自动排队到 GUI 线程）"""
+        self._submitted.emit(job)
+
+    @pyqtSlot(object)
+    def _enqueue(self, job: MeasureJob):
+        self._jobs.append(job)
+        if self._job is None:
+            self._start_next_job()
+
+    def _ensure_page(self) -> QWebEnginePage:
+        if self._page is None:
+            self._page = QWebEnginePage(self)
+            self._page.loadFinished.connect(self._on_load_finished)
+        return self._page
+
+    def _start_next_job(self):
+        self._job = None
+        while self._jobs:
+            job = self._jobs.popleft()
+            if not job.cancelled:
+                self._job = job
+                self._offset = 0
+                self._load_next_batch()
+                return
+
+    def _load_next_batch(self):
+        job = self._job
+        if job.cancelled or self._offset >= len(job.blocks_html):
+            self._finish_job()
+            return
+
+        # 按 HTML 长度切分批次（至少一个块）
+        batch, size = [], 0
+        for block_html in job.blocks_html[self._offset:]:
+            if batch and size + len(block_html) > self.MAX_BATCH_CHARS:
+                break
+            batch.append(block_html)
+            size += len(block_html)
+        self._batch = batch
+        self._retries = 0
+
+        generator = HTMLGenerator(font_size=job.font_size, page_size=job.page_size, theme=job.theme)
+        if job.font_family:
+            generator.set_font_family(job.font_family)
+        content = '\n'.join(f'<div class="cc-measure">{block_html}</div>' for block_html in batch)
+        html = generator.generate(content)
+        extra_css = MEASURE_CSS.format(max_image_height=generator.page_height // 2)
+        html = html.replace('</head>', extra_css + '</head>', 1)
+        self._ensure_page().setHtml(html, QUrl("file:///"))
+
+    def _on_load_finished(self, ok: bool):
+        if self._job is None:
+            return
+        if not ok:
+            logging.warning("块高度测量页面加载失败")
+            self._finish_job()
+            return
+        self._collect()
+
+    def _collect(self):
+        self._page.runJavaScript(MEASURE_SCRIPT, self._on_heights)
+
+    def _on_heights(self, heights):
+        job = self._job
+        if job is None:
+            return
+        if heights is None and not job.cancelled and self._retries < self.MAX_RETRIES:
+            self._retries += 1
+            QTimer.singleShot(self.RETRY_INTERVAL, self._collect)
+            return
+        if not heights or len(heights) != len(self._batch):
+            logging.warning("块高度测量结果不完整，使用估算高度")
+            self._finish_job()
+            return
+
+        signature = job.signature
+        for block_html, height in zip(self._batch, heights):
+            height = int(round(height))
+            job.heights.append(height)
+            MEASURED_HEIGHTS.put(height_key(block_html, signature), height)
+        self._offset += len(self._batch)
+        self._load_next_batch()
+
+    def _finish_job(self):
+        if self._job is not None:
+            self._job.done.set()
+        self._start_next_job()
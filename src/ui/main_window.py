@@ -626,7 +626,7 @@ class MainWindow(QMainWindow):
         # 尺寸选择器（不显示标签）
         self.size_selector = QComboBox()
         self.size_selector.setToolTip("尺寸选择")
-        self.size_selector.setFixedWidth(80)
+        self.size_selector.setFixedWidth(110)
         self.size_selector.addItems(["720p", "1080p", "1440p"])
         self.size_selector.setCurrentIndex(1)  # 默认选择"1080p"
         self.size_selector.setStyleSheet(self.get_combobox_style())
@@ -706,7 +706,7 @@ class MainWindow(QMainWindow):
         # 字体大小选择器（不显示标签）
         self.font_size_selector = QComboBox()
         self.font_size_selector.setToolTip("字体大小选择")
-        self.font_size_selector.setFixedWidth(80)
+        self.font_size_selector.setFixedWidth(100)
         self.font_size_selector.addItems(["小", "标准", "大", "超大", "最大"])
         self.font_size_selector.setCurrentIndex(1)  # 默认选择"标准"
         self.font_size_selector.setStyleSheet(self.get_combobox_style())
@@ -1570,31 +1570,26 @@ class MainWindow(QMainWindow):
         
         if hasattr(self.preview, 'sizeChanged'):
             self.preview.sizeChanged.connect(self.on_size_changed)
+        if hasattr(self.preview, 'pageCountsChanged'):
+            self.preview.pageCountsChanged.connect(self.on_page_counts_changed)
     
     def on_text_changed(self):
         """文本改变时启动计时器"""
-        # 添加更新锁，防止并发
-        if hasattr(self, '_updating') and self._updating:
-            return
-        
+        # 渲染在后台线程进行，这里只负责防抖；过期的渲染请求由 RenderController 丢弃
         self.update_timer.stop()
         self.update_timer.start()
         self.update_char_count()
     
     def update_preview(self):
         """更新预览"""
-        self._updating = True  # 加锁
-        try:
-            self.update_timer.stop()
-            markdown_text = self.editor.get_text()
-            
-            # 添加图片检测日志
-            img_count = markdown_text.count('![')
-            print(f"检测到 {img_count} 个图片标记")
-            
-            self.preview.update_content(markdown_text)
-        finally:
-            self._updating = False  # 解锁
+        self.update_timer.stop()
+        markdown_text = self.editor.get_text()
+        
+        # 添加图片检测日志
+        img_count = markdown_text.count('![')
+        print(f"检测到 {img_count} 个图片标记")
+        
+        self.preview.update_content(markdown_text)
     
     def update_char_count(self):
         """更新字数统计"""
@@ -1659,7 +1654,8 @@ class MainWindow(QMainWindow):
         }
         
         font_size = font_sizes.get(index, 18)
-        font_size_name = self.font_size_selector.currentText()
+        # 选项文字可能带有预计页数，保存不带页数的名称
+        font_size_name = self.font_size_selector.itemData(index) or self.font_size_selector.currentText()
         
         # 更新预览组件的字体大小
         self.preview.change_font_size(font_size)
@@ -1687,6 +1683,28 @@ class MainWindow(QMainWindow):
         # 更新状态栏显示
         self.on_size_changed(size)
     
+    def on_page_counts_changed(self, counts):
+        """
+        在尺寸和字号选项后显示预计页数（当前字号下各尺寸、当前尺寸下各字号），
+        页数由后台预计算得到，尚未算出的选项只显示名称
+        """
+        sizes = ["small", "medium", "large"]
+        font_sizes = [14, 18, 22, 26, 30]
+        current_size = sizes[max(0, self.size_selector.currentIndex())]
+        current_font_size = font_sizes[max(0, self.font_size_selector.currentIndex())]
+        
+        def update_items(selector, options, variant):
+            for index, option in enumerate(options):
+                name = selector.itemData(index)
+                if name is None:
+                    name = selector.itemText(index)
+                    selector.setItemData(index, name)
+                count = counts.get(variant(option))
+                selector.setItemText(index, f"{name} ({count}页)" if count else name)
+        
+        update_items(self.size_selector, sizes, lambda size: (size, current_font_size))
+        update_items(self.font_size_selector, font_sizes, lambda font_size: (current_size, font_size))
+    
     def on_size_changed(self, size):
         """处理尺寸改变"""
         size_display = {
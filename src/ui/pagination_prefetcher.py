@@ -0,0 +1,266 @@
+# ============================================
+# src/ui/pagination_prefetcher.py - 后台预计算其他尺寸/字号的分页
+# ============================================
+from PyQt6.QtCore import QObject, QTimer, QCoreApplication, pyqtSignal, pyqtSlot
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import multiprocessing
+import os
+import time
+from src.core.blocks import MarkdownBlock
+from src.utils.cache import RenderCache, MISSING, content_key
+from src.utils.font_metrics import ExportedGlyphWidths, FontWidthMeter
+from src.utils.paginator import SmartPaginator
+from src.utils.paragraph_split import paragraph_source
+
+# 与工具栏的尺寸、字号选项一致
+PAGE_SIZES = ("small", "medium", "large")
+FONT_SIZES = (14, 18, 22, 26, 30)
+
+Variant = Tuple[str, int]  # (页面尺寸, 字号)
+# 主进程导出的字形宽度表：(测量器 key, 字符 -> 宽度, (宽字符估算宽度, 窄字符估算宽度))；
+# None 表示按字符类别估算
+MeterSpec = Optional[Tuple[tuple, Dict[str, float], Tuple[float, float]]]
+# 预计算任务：(字号, {页面尺寸: 缓存键}, 字形宽度表)
+PrefetchJob = Tuple[int, Dict[str, str], MeterSpec]
+
+
+def page_count_key(cache_key: str) -> str:
+    """分页结果页数的缓存键：查询页数时不必从磁盘读出整个页列表"""
+    return content_key('page-count', cache_key)
+
+
+def measured_chars(blocks: List[MarkdownBlock]) -> set:
+    """
+    分页时会测量宽度的全部字符
+
+    包括块的纯文本，以及拆分段落时使用的段落可见文本（含行内标记之间的空白等）
+    """
+    chars = set().union(*(block.text for block in blocks))
+    for block in blocks:
+        if block.type == 'paragraph':
+            chars.update(paragraph_source(block.html).text)
+    return chars
+
+
+def paginate_variants(blocks: List[MarkdownBlock], font_size: int, page_sizes: Sequence[str],
+                      engine: str, meter: MeterSpec) -> List[tuple]:
+    """
+    在子进程中按同一字号分页多个页面尺寸
+
+    Returns:
+        每个尺寸的 (页面尺寸, 页列表, 强制分页页码, 耗时秒)
+    """
+    results = []
+    for page_size in page_sizes:
+        started = time.perf_counter()
+        paginator = SmartPaginator(page_size, font_size, engine=engine)
+        if meter is not None:
+            key, widths, (wide_width, narrow_width) = meter
+            paginator.set_text_meter(FontWidthMeter(ExportedGlyphWidths(widths, wide_width, narrow_width), key))
+        pages = paginator.paginate(blocks)
+        results.append((page_size, pages, frozenset(paginator.forced_break_pages),
+                        time.perf_counter() - started))
+    return results
+
+
+class PaginationPrefetcher(QObject):
+    """
+    内容稳定后，在进程池中按所有 尺寸 × 字号 组合分页当前文档
+
+    结果按 SmartPaginator 的缓存键写入共享的 RenderCache，之后切换尺寸或字号时
+    渲染线程直接命中缓存；各组合的页数通过 countsChanged 通知，供选择器显示。
+    子进程没有字体数据库，使用真实字形宽度时由主进程导出文档中出现的全部字符的
+    宽度，测量器 key 相同，因此结果与主进程分页完全一致。
+
+    计算缓存键、查询缓存和导出宽度表都在辅助线程中进行，结果写入缓存在进程池的
+    回调线程中进行，GUI 线程只负责提交任务和更新页数
+    """
+
+    countsChanged = pyqtSignal(object)  # {(页面尺寸, 字号): 页数}
+    _planReady = pyqtSignal(object)  # (文档代号, 块, 分页引擎, 已缓存的页数, [预计算任务])
+    _variantsReady = pyqtSignal(object)  # (文档代号, {组合: 页数})
+
+    SETTLE_DELAY = 1500  # 毫秒：最后一次渲染完成后等待多久开始预计算
+    MAX_WORKERS = 4
+
+    def __init__(self, cache: RenderCache, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.cache = cache
+        self.page_counts: Dict[Variant, int] = {}
+        self.enabled = True
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._planner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pagination-prefetch')
+        self._futures: List[Future] = []
+        self._generation = 0
+        self._pending = None
+        self._document = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.SETTLE_DELAY)
+        self._timer.timeout.connect(self._start)
+        # 辅助线程和进程池的回调不在 GUI 线程中执行，经信号转到 GUI 线程
+        self._planReady.connect(self._on_plan_ready)
+        self._variantsReady.connect(self._on_variants_ready)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def schedule(self, markdown_text: str, blocks: List[MarkdownBlock], current: Variant, page_count: int,
+                 font_family: Optional[str], engine: str):
+        """
+        渲染完成后调用：记录当前组合的页数，内容稳定 SETTLE_DELAY 后开始预计算
+
+        Args:
+            blocks: 本次分页使用的块
+            current: 当前 (页面尺寸, 字号)
+        """
+        document = (markdown_text, font_family, engine)
+        if document == self._document:
+            # 同一文档只是切换了尺寸或字号：保留已算出的页数，进行中的任务继续
+            self.page_counts[current] = page_count
+            self.countsChanged.emit(dict(self.page_counts))
+            return
+
+        self.cancel()
+        self._document = document
+        self.page_counts = {current: page_count}
+        self._pending = (blocks, font_family, engine)
+        if self.enabled:
+            self._timer.start()
+        self.countsChanged.emit(dict(self.page_counts))
+
+    def cancel(self):
+        """取消尚未开始的预计算（已在子进程中运行的任务完成后仍会写入缓存）"""
+        self._generation += 1
+        self._timer.stop()
+        self._pending = None
+        self._document = None
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    def _start(self):
+        if self._pending is None:
+            return
+        blocks, font_family, engine = self._pending
+        self._pending = None
+        generation = self._generation
+        future = self._planner.submit(self._plan, blocks, font_family, engine, frozenset(self.page_counts))
+        future.add_done_callback(partial(self._on_plan_done, generation, blocks, engine))
+
+    def _plan(self, blocks: List[MarkdownBlock], font_family: Optional[str], engine: str,
+              known: frozenset) -> Tuple[Dict[Variant, int], List[PrefetchJob]]:
+        """
+        在辅助线程中计算各组合的缓存键：已缓存的组合只读取页数，其余按字号分组为预计算任务
+        """
+        counts = {}
+        jobs = []
+        chars = None
+        for font_size in FONT_SIZES:
+            keys = {}
+            meter_spec = None
+            for page_size in PAGE_SIZES:
+                if (page_size, font_size) in known:
+                    continue
+                paginator = SmartPaginator(page_size, font_size, self.cache, font_family, engine)
+                key = paginator.cache_key(blocks)
+                count = self._cached_page_count(key)
+                if count is not None:
+                    counts[(page_size, font_size)] = count
+                    continue
+                keys[page_size] = key
+                meter = paginator.text_meter
+                if isinstance(meter, FontWidthMeter) and meter_spec is None:
+                    if chars is None:
+                        chars = measured_chars(blocks)
+                    meter_spec = (meter.key, {ch: meter.table[ch] for ch in chars},
+                                  (paginator.char_width, paginator.char_width_en))
+            if keys:
+                jobs.append((font_size, keys, meter_spec))
+        return counts, jobs
+
+    def _cached_page_count(self, key: str) -> Optional[int]:
+        count = self.cache.get(page_count_key(key))
+        if count is not MISSING:
+            return count
+        # 由渲染线程分页的组合只有页列表
+        cached = self.cache.get(key)
+        if cached is MISSING:
+            return None
+        self.cache.put(page_count_key(key), len(cached[0]))
+        return len(cached[0])
+
+    def _on_plan_done(self, generation: int, blocks: List[MarkdownBlock], engine: str, future: Future):
+        try:
+            counts, jobs = future.result()
+        except Exception as e:
+            logging.warning(f"分页预计算失败: {e}")
+            return
+        self._planReady.emit((generation, blocks, engine, counts, jobs))
+
+    @pyqtSlot(object)
+    def _on_plan_ready(self, payload):
+        generation, blocks, engine, counts, jobs = payload
+        if generation != self._generation:
+            return
+        self.page_counts.update(counts)
+        for font_size, keys, meter_spec in jobs:
+            future = self._submit(blocks, font_size, tuple(keys), engine, meter_spec)
+            if future is None:
+                break
+            future.add_done_callback(partial(self._on_future_done, generation, font_size, keys))
+            self._futures.append(future)
+        self.countsChanged.emit(dict(self.page_counts))
+
+    def _submit(self, *args) -> Optional[Future]:
+        try:
+            if self._executor is None:
+                # spawn：不从持有 Qt 线程的 GUI 进程 fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=min(self.MAX_WORKERS, os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor.submit(paginate_variants, *args)
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            logging.warning(f"分页预计算不可用: {e}")
+            self.enabled = False
+            self.shutdown()
+            return None
+
+    def _on_future_done(self, generation: int, font_size: int, keys: Dict[str, str], future: Future):
+        if future.cancelled():
+            return
+        try:
+            results = future.result()
+        except Exception as e:
+            logging.warning(f"分页预计算失败: {e}")
+            return
+        # 在回调线程中写入缓存（含磁盘层）；缓存键由内容和配置决定，
+        # 文档已变化的结果同样有效，只是页数不再对应当前文档
+        counts = {}
+        for page_size, pages, forced, elapsed in results:
+            key = keys[page_size]
+            self.cache.put(key, (pages, forced), elapsed)
+            self.cache.put(page_count_key(key), len(pages), elapsed)
+            counts[(page_size, font_size)] = len(pages)
+        self._variantsReady.emit((generation, counts))
+
+    @pyqtSlot(object)
+    def _on_variants_ready(self, payload):
+        generation, counts = payload
+        if generation == self._generation:
+            self.page_counts.update(counts)
+            self.countsChanged.emit(dict(self.page_counts))
+
+    def shutdown(self):
+        self.cancel()
+        self._planner.shutdown(wait=False, cancel_futures=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
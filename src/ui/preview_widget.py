@@ -9,9 +9,11 @@ from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtCore import pyqtSignal, Qt, QSize, QEvent, QTimer, QUrl
 from PyQt6.QtGui import QWheelEvent, QFont
 from pathlib import Path
-from src.core.markdown_processor import MarkdownProcessor
 from src.core.html_generator import HTMLGenerator
 from src.utils.paginator import SmartPaginator
+from src.utils.cache import RenderCache
+from src.ui.render_worker import RenderController, RenderResult
+from src.ui.pagination_prefetcher import PaginationPrefetcher
 from src.utils.exporter import ImageExporter
 
 class CustomScrollArea(QScrollArea):
@@ -55,6 +57,7 @@ class CustomScrollArea(QScrollArea):
 class PreviewWidget(QWidget):
     pageChanged = pyqtSignal(int, int)  # 当前页，总页数
     sizeChanged = pyqtSignal(str)  # 尺寸改变信号
+    pageCountsChanged = pyqtSignal(object)  # {(页面尺寸, 字号): 页数}，含后台预计算的其他组合
     
     def __init__(self):
         super().__init__()
@@ -65,12 +68,20 @@ class PreviewWidget(QWidget):
         self.current_size = "medium"  # 当前页面尺寸
         self.preview_mode = "fit"  # 预览模式: fit(适应窗口) 或 actual(实际大小)
         self._is_exporting = False  # 添加导出状态标志
+        self.measured_pagination = False  # 是否按浏览器实测的块高度分页
         
-        # 初始化处理器
-        self.markdown_processor = MarkdownProcessor()
+        # 解析/分页结果缓存（内存 + 用户缓存目录），撤销、切换设置或重新打开文件时直接命中
+        self.render_cache = RenderCache.with_user_disk_cache()
+        
+        # 解析和分页在后台线程执行，只应用最新一次请求的结果
+        self.render_controller = RenderController(self.render_cache, self)
+        self.render_controller.renderFinished.connect(self.on_render_finished)
+        # 内容稳定后在进程池中预计算其他尺寸/字号的分页，切换时直接命中缓存
+        self.prefetcher = PaginationPrefetcher(self.render_cache, self)
+        self.prefetcher.countsChanged.connect(self.pageCountsChanged)
         self.html_generator = HTMLGenerator(page_size="medium")
         # 初始化分页器时传递默认字体大小
-        self.paginator = SmartPaginator(page_size="medium", font_size=18)
+        self.paginator = SmartPaginator(page_size="medium", font_size=18, cache=self.render_cache)
         
         # 初始化UI
         self.init_ui()
@@ -429,6 +440,8 @@ class PreviewWidget(QWidget):
             
             # 更新各组件的尺寸设置
             self.html_generator = HTMLGenerator(page_size=new_size)
+            if self.paginator.font_family:
+                self.html_generator.set_font_family(self.paginator.font_family)
             self.paginator.set_page_size(new_size)
             
             # 保持当前字体大小设置
@@ -443,19 +456,27 @@ class PreviewWidget(QWidget):
             self.sizeChanged.emit(new_size)
     
     def update_content(self, markdown_text: str):
-        """更新预览内容"""
+        """更新预览内容（在后台线程解析和分页，完成后由 on_render_finished 显示）"""
+        self.markdown_text = markdown_text
+        self.render_controller.request(
+            markdown_text,
+            self.paginator.page_size_name,
+            self.paginator.font_size,
+            self.paginator.font_family,
+            self.html_generator.current_theme,
+            self.measured_pagination,
+            self.paginator.engine
+        )
+    
+    def on_render_finished(self, result: RenderResult):
+        """应用后台渲染结果"""
+        if result.error:
+            self.show_error(f"Preview error: {result.error}")
+            return
+        
         try:
-            self.markdown_text = markdown_text
-            
-            # 处理 Markdown
-            html_content = self.markdown_processor.parse(markdown_text)
-            
-            # 使用智能分页器进行分页
-            self.current_pages = self.paginator.paginate(html_content)
-            
-            # 优化分页结果
-            self.current_pages = self.paginator.optimize_pages(self.current_pages)
-            
+            # 流式渲染时先收到只含首页的部分结果，随后收到完整结果
+            self.current_pages = result.pages
             self.total_pages = len(self.current_pages)
             self.current_page = 1
             
@@ -466,9 +487,26 @@ class PreviewWidget(QWidget):
             self.update_buttons()
             self.update_page_info()
             
+            if not result.partial:
+                self.schedule_prefetch(result)
+            
         except Exception as e:
             self.show_error(f"Preview error: {str(e)}")
     
+    def schedule_prefetch(self, result: RenderResult):
+        """为其他尺寸/字号预计算分页（实测模式的高度依赖浏览器排版，不做预计算）"""
+        if self.measured_pagination or result.blocks is None:
+            self.prefetcher.cancel()
+            return
+        self.prefetcher.schedule(
+            result.markdown_text,
+            result.blocks,
+            (self.paginator.page_size_name, self.paginator.font_size),
+            len(result.pages),
+            self.paginator.font_family,
+            self.paginator.engine
+        )
+    
     def display_current_page(self):
         """显示当前页"""
         # 如果正在导出，不更新显示
@@ -1125,8 +1163,33 @@ class PreviewWidget(QWidget):
     def change_theme(self, theme: str):
         """切换主题"""
         self.html_generator.set_theme(theme)
-        if self.current_pages:
+        if self.measured_pagination and self.markdown_text:
+            # 实测高度依赖主题 CSS，需要重新分页
+            self.update_content(self.markdown_text)
+        elif self.current_pages:
             self.display_current_page()
+
+    def set_measured_pagination(self, enabled: bool):
+        """
+        切换分页模式：实测模式用离屏页面按真实主题 CSS 排版所有块，
+        以实际高度分页；高度按块缓存，编辑后只需测量新增或改动的块
+        """
+        if enabled != self.measured_pagination:
+            self.measured_pagination = enabled
+            if self.markdown_text:
+                self.update_content(self.markdown_text)
+    
+    def set_pagination_engine(self, engine: str):
+        """
+        切换分页引擎：greedy 逐页填充后合并过短页；optimal 在整篇内容上
+        求留白、孤行寡行、标题落底等代价之和最小的分页方案
+
+        optimal 编辑后须整篇重新求解，长文档上慢于 greedy（见 SmartPaginator.ENGINES），不在界面中提供
+        """
+        if engine != self.paginator.engine:
+            self.paginator.set_engine(engine)
+            if self.markdown_text:
+                self.update_content(self.markdown_text)
     
     def change_font_size(self, font_size: int):
         """改变字体大小"""
@@ -1140,6 +1203,8 @@ class PreviewWidget(QWidget):
     def change_font_family(self, font_family: str):
         """改变字体"""
         self.html_generator.set_font_family(font_family)
+        # 分页按新字体的字形宽度计算换行
+        self.paginator.set_font_family(font_family)
         # 字体改变时需要重新计算分页
         if self.markdown_text:
             self.update_content(self.markdown_text)
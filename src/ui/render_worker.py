@@ -0,0 +1,226 @@
+# ============================================
+# src/ui/render_worker.py - 后台解析与分页
+# ============================================
+from PyQt6.QtCore import QObject, QThread, QCoreApplication, pyqtSignal, pyqtSlot
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+import logging
+import time
+from src.core.blocks import MarkdownBlock
+from src.core.markdown_processor import MarkdownProcessor
+from src.utils.paginator import Page, SmartPaginator
+from src.utils.cache import RenderCache, MISSING
+from src.utils.font_metrics import get_font_metrics_registry
+from src.ui.block_measurer import (BlockHeightMeasurer, MeasureJob, MEASURED_HEIGHTS,
+                                   height_key, measure_signature)
+
+
+@dataclass
+class RenderRequest:
+    """一次渲染请求（代号越大越新）"""
+    generation: int
+    markdown_text: str
+    page_size: str
+    font_size: int
+    font_family: Optional[str] = None
+    theme: str = "xiaohongshu"
+    measure: bool = False  # 是否使用浏览器实测的块高度分页
+    engine: str = "greedy"  # 分页引擎：greedy / optimal
+
+
+@dataclass
+class RenderResult:
+    """渲染结果"""
+    generation: int
+    markdown_text: str
+    pages: List[str] = field(default_factory=list)
+    error: str = ""
+    partial: bool = False  # 流式渲染中途先行发送的首页结果
+    blocks: Optional[List[MarkdownBlock]] = None  # 本次分页使用的块（供其他尺寸预计算分页）
+
+
+class RenderWorker(QObject):
+    """
+    在后台线程中执行 Markdown 解析和分页
+
+    处理器和分页器只在工作线程内使用；开始处理前以及每个阶段之间
+    检查请求是否已被更新的请求取代，过期请求直接丢弃
+    """
+
+    finished = pyqtSignal(object)  # RenderResult
+
+    # 超过该长度（字符）的文档使用流式解析和分页，首页先行显示（不做实测）
+    STREAMING_THRESHOLD = 200_000
+    # 等待 GUI 线程完成块高度实测的最长时间（秒），超时后使用估算高度
+    MEASURE_TIMEOUT = 10.0
+
+    def __init__(self, cache: Optional[RenderCache] = None, measurer: Optional[BlockHeightMeasurer] = None):
+        super().__init__()
+        self.markdown_processor = MarkdownProcessor(incremental=True, cache=cache)
+        self.paginator = SmartPaginator(cache=cache)
+        self.measurer = measurer
+        # 由 GUI 线程写入的最新代号（整数赋值是原子的）
+        self.latest_generation = 0
+
+    def _is_stale(self, request: RenderRequest) -> bool:
+        return request.generation < self.latest_generation
+
+    @pyqtSlot(object)
+    def render(self, request: RenderRequest):
+        if self._is_stale(request):
+            return
+
+        result = RenderResult(request.generation, request.markdown_text)
+        try:
+            self.paginator.set_page_size(request.page_size)
+            self.paginator.set_font_size(request.font_size)
+            self.paginator.set_font_family(request.font_family)
+            self.paginator.set_engine(request.engine)
+
+            # 块已缓存时直接整体分页：分页结果可能已由其他尺寸的预计算写入缓存
+            cached_blocks = self.markdown_processor.cached_blocks(request.markdown_text)
+            if len(request.markdown_text) >= self.STREAMING_THRESHOLD and cached_blocks is None:
+                blocks = []
+                pages = self._render_streaming(request, blocks)
+                if pages is None:
+                    return
+            else:
+                # 处理 Markdown（直接输出结构化块，分页时无需再解析HTML）
+                blocks = (cached_blocks if cached_blocks is not None
+                          else self.markdown_processor.parse_blocks(request.markdown_text))
+                if self._is_stale(request):
+                    return
+
+                heights = None
+                if request.measure and self.measurer is not None:
+                    heights = self._measure_heights(request, blocks)
+                    if self._is_stale(request):
+                        return
+                self.paginator.set_measured_heights(heights)
+
+                # 使用智能分页器进行分页（结果已合并过短的页）
+                pages = self.paginator.paginate(blocks)
+                if self._is_stale(request):
+                    return
+
+            result.pages = [page.html for page in pages]
+            result.blocks = blocks
+        except Exception as e:
+            logging.error(f"后台渲染失败: {e}")
+            result.error = str(e)
+
+        if not self._is_stale(request):
+            self.finished.emit(result)
+
+        # 本次分页新测量到的字形宽度写回磁盘
+        get_font_metrics_registry().save()
+
+    def _render_streaming(self, request: RenderRequest, collected: List[MarkdownBlock]) -> Optional[List[Page]]:
+        """
+        流式解析并分页：第一页完成后立即发送部分结果，
+        之后每页检查一次请求是否过期；过期时返回 None。解析出的块依次追加到 collected
+        """
+        self.paginator.set_measured_heights(None)
+        blocks = self.markdown_processor.iter_blocks(request.markdown_text)
+        pages = []
+        for page in self.paginator.iter_pages(self._collect_blocks(blocks, collected)):
+            if self._is_stale(request):
+                return None
+            pages.append(page)
+            if len(pages) == 1:
+                self.finished.emit(RenderResult(request.generation, request.markdown_text, [page.html], partial=True))
+        return pages
+
+    @staticmethod
+    def _collect_blocks(blocks: Iterator[MarkdownBlock], collected: List[MarkdownBlock]) -> Iterator[MarkdownBlock]:
+        for block in blocks:
+            collected.append(block)
+            yield block
+
+    def _measure_heights(self, request: RenderRequest, blocks) -> Optional[Dict[str, int]]:
+        """
+        获取所有块的实测高度：已缓存的直接使用，其余交给 GUI 线程的
+        BlockHeightMeasurer 一次性测量，等待期间请求过期则放弃
+        """
+        signature = measure_signature(request.theme, request.font_family, request.font_size, request.page_size)
+        heights: Dict[str, int] = {}
+        missing = []
+        for block in blocks:
+            if block.type == 'pagebreak' or block.html in heights:
+                continue
+            height = MEASURED_HEIGHTS.get(height_key(block.html, signature))
+            if height is MISSING:
+                missing.append(block.html)
+            else:
+                heights[block.html] = height
+
+        if missing:
+            missing = list(dict.fromkeys(missing))
+            job = MeasureJob(missing, request.theme, request.font_family, request.font_size, request.page_size)
+            self.measurer.submit(job)
+            deadline = time.monotonic() + self.MEASURE_TIMEOUT
+            while not job.done.wait(0.05):
+                if self._is_stale(request):
+                    job.cancelled = True
+                    return None
+                if time.monotonic() > deadline:
+                    job.cancelled = True
+                    logging.warning("块高度测量超时，未测量的块使用估算高度")
+                    break
+            heights.update(zip(missing, job.heights))
+        return heights
+
+
+class RenderController(QObject):
+    """
+    GUI 线程一侧的渲染调度
+
+    每个请求分配递增的代号并排队投递给工作线程；工作线程跳过
+    已过期的请求，GUI 线程只应用与最新代号一致的结果，
+    因此连续输入时不会丢失任何编辑，也不会显示旧内容
+    """
+
+    renderFinished = pyqtSignal(object)  # RenderResult
+    _requested = pyqtSignal(object)  # RenderRequest
+
+    def __init__(self, cache: Optional[RenderCache] = None, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.generation = 0
+
+        self._thread = QThread()
+        self._thread.setObjectName("RenderThread")
+        # 块高度实测需要 QWebEnginePage，只能在 GUI 线程中进行
+        self.measurer = BlockHeightMeasurer(self)
+        self.worker = RenderWorker(cache, self.measurer)
+        self.worker.moveToThread(self._thread)
+
+        # 跨线程信号自动使用队列连接
+        self._requested.connect(self.worker.render)
+        self.worker.finished.connect(self._on_worker_finished)
+        self._thread.start()
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def request(self, markdown_text: str, page_size: str, font_size: int, font_family: Optional[str] = None,
+                theme: str = "xiaohongshu", measure: bool = False, engine: str = "greedy") -> int:
+        """投递渲染请求，返回请求代号"""
+        self.generation += 1
+        self.worker.latest_generation = self.generation
+        self._requested.emit(RenderRequest(self.generation, markdown_text, page_size, font_size,
+                                           font_family, theme, measure, engine))
+        return self.generation
+
+    def _on_worker_finished(self, result: RenderResult):
+        if result.generation != self.generation:
+            return
+        self.renderFinished.emit(result)
+
+    def shutdown(self):
+        """停止工作线程"""
+        if self._thread.isRunning():
+            # 让排队中的请求全部失效
+            self.worker.latest_generation = self.generation + 1
+            self._thread.quit()
+            self._thread.wait()
@@ -0,0 +1,229 @@
+# ============================================
+# src/utils/cache.py - 内容寻址缓存
+# ============================================
+import os
+import sys
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+# 未命中时的返回值（缓存的值本身可能是 None 或空列表）
+MISSING = object()
+
+
+def content_key(*parts: Any) -> str:
+    """
+    根据输入内容和所有影响输出的配置计算缓存键
+
+    字符串按 UTF-8 编码，其余对象使用 repr，各部分之间以 \\x00 分隔
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if not isinstance(part, str):
+            part = repr(part)
+        digest.update(part.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def get_user_cache_dir(app_name: str = "CardCraft") -> Path:
+    """获取当前用户的缓存目录（Windows / macOS / Linux）"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+        return Path(base) / app_name / 'Cache'
+    if sys.platform == 'darwin':
+        return Path.home() / 'Library' / 'Caches' / app_name
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return Path(base) / app_name.lower()
+
+
+class LRUCache:
+    """有容量上限的内存 LRU 缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    磁盘缓存：每个键一个 pickle 文件
+
+    读取时刷新文件修改时间，总大小超过上限时按修改时间淘汰最旧的文件
+    """
+
+    FILE_SUFFIX = '.pkl'
+
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.FILE_SUFFIX}"
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path, None)
+            return value
+        except FileNotFoundError:
+            return default
+        except Exception as e:
+            # 文件损坏或格式不兼容时删除
+            logging.warning(f"读取磁盘缓存失败，已删除: {path.name} ({e})")
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return default
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再替换，避免并发读到不完整的文件
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"写入磁盘缓存失败: {e}")
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            for path in self._iter_files():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def _iter_files(self):
+        if not self.directory.is_dir():
+            return []
+        return list(self.directory.glob(f"*{self.FILE_SUFFIX}"))
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._iter_files():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self):
+        """删除最久未使用的文件，直到总大小降到上限的 80%"""
+        entries = []
+        for path in self._iter_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.8
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+
+class RenderCache:
+    """
+    解析/分页结果缓存：内存 LRU + 可选的磁盘层
+
+    只有计算耗时超过 DISK_MIN_COST 的结果才写入磁盘，
+    避免每次按键都为小文档写文件
+    """
+
+    DISK_MIN_COST = 0.05  # 秒
+
+    def __init__(self, max_entries: int = 64, disk_dir: Optional[Path] = None,
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(disk_dir, max_disk_bytes) if disk_dir else None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def with_user_disk_cache(cls, max_entries: int = 64) -> 'RenderCache':
+        """创建带磁盘层的缓存，目录位于用户缓存目录下"""
+        return cls(max_entries, get_user_cache_dir() / 'render')
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        value = self.memory.get(key)
+        if value is MISSING and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not MISSING:
+                self.memory.put(key, value)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, cost: float = 0.0):
+        """
+        Args:
+            cost: 计算该结果的耗时（秒），用于决定是否写入磁盘
+        """
+        self.memory.put(key, value)
+        if self.disk is not None and cost >= self.DISK_MIN_COST:
+            self.disk.put(key, value)
+
+    def clear(self, disk: bool = False):
+        self.memory.clear()
+        if disk and self.disk is not None:
+            self.disk.clear()
+
@@ -0,0 +1,185 @@
+# ============================================
+# src/utils/font_metrics.py - 基于字体度量的文本宽度
+# ============================================
+import logging
+import threading
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+from PyQt6.QtCore import qVersion
+from PyQt6.QtGui import QFont, QFontInfo, QFontMetricsF, QGuiApplication
+from src.utils.cache import DiskCache, MISSING, content_key, get_user_cache_dir
+
+# 宽度表格式变化时递增，使磁盘上的旧表失效
+GLYPH_TABLE_VERSION = 1
+
+# CSS 通用字体族对应的 Qt 样式提示
+GENERIC_FAMILY_HINTS = {
+    'sans-serif': QFont.StyleHint.SansSerif,
+    'serif': QFont.StyleHint.Serif,
+    'monospace': QFont.StyleHint.Monospace,
+    'cursive': QFont.StyleHint.Cursive,
+    'fantasy': QFont.StyleHint.Fantasy,
+    'system-ui': QFont.StyleHint.System,
+    '-apple-system': QFont.StyleHint.System,
+    'BlinkMacSystemFont': QFont.StyleHint.System,
+}
+
+
+def parse_font_families(font_family: str) -> List[str]:
+    """将 CSS font-family 字体栈拆分为字体名列表（去掉引号）"""
+    families = []
+    for name in font_family.split(','):
+        name = name.strip().strip('"\'').strip()
+        if name:
+            families.append(name)
+    return families
+
+
+def create_font(font_family: str, pixel_size: int) -> QFont:
+    """按 CSS 字体栈和像素字号创建 QFont"""
+    font = QFont()
+    families = parse_font_families(font_family)
+    named = [name for name in families if name not in GENERIC_FAMILY_HINTS]
+    if named:
+        font.setFamilies(named)
+    for name in families:
+        if name in GENERIC_FAMILY_HINTS:
+            font.setStyleHint(GENERIC_FAMILY_HINTS[name])
+            break
+    font.setPixelSize(max(1, pixel_size))
+    return font
+
+
+class GlyphWidthTable(dict):
+    """
+    单个 (字体, 字号) 的字形宽度表：字符 -> 前进宽度（像素）
+
+    未出现过的字符在首次查询时用 QFontMetricsF 测量并记录
+    """
+
+    def __init__(self, metrics: QFontMetricsF, widths: Optional[Dict[str, float]] = None):
+        super().__init__(widths or {})
+        self._metrics = metrics
+        self._fallback_width = metrics.height() * 0.5
+        self.dirty = False
+
+    def __missing__(self, ch: str) -> float:
+        try:
+            width = self._metrics.horizontalAdvance(ch)
+        except Exception:
+            # 无法转换为 UTF-16 的孤立代理项等
+            width = self._fallback_width
+        self[ch] = width
+        self.dirty = True
+        return width
+
+
+class ExportedGlyphWidths(dict):
+    """
+    导出到子进程的字形宽度表（子进程没有字体数据库，无法测量）
+
+    未导出的字符按字符类别估算宽度（与 TextWidthMeter 相同），不会因个别字符缺失而中断分页
+    """
+
+    def __init__(self, widths: Dict[str, float], wide_width: float, narrow_width: float):
+        super().__init__(widths)
+        self.wide_width = wide_width
+        self.narrow_width = narrow_width
+
+    def __missing__(self, ch: str) -> float:
+        return self.narrow_width if ch.isascii() else self.wide_width
+
+
+class FontWidthMeter:
+    """
+    按真实字形宽度估算文本宽度，接口与 TextWidthMeter 一致
+
+    逐字符查表在 C 层完成（map + sum / accumulate），只有首次出现的字符
+    需要调用 Qt 测量；段落总宽度另按文本缓存，编辑后重新分页时
+    未改动的段落直接命中
+    """
+
+    WIDTH_CACHE_SIZE = 8192
+
+    def __init__(self, table: GlyphWidthTable, key: Tuple):
+        self.table = table
+        self.key = key
+        self.width = lru_cache(maxsize=self.WIDTH_CACHE_SIZE)(self._measure)
+
+    def _measure(self, text: str) -> float:
+        """文本总宽度（像素）"""
+        return sum(map(self.table.__getitem__, text))
+
+    def prefix_widths(self, text: str) -> List[float]:
+        """累计宽度数组：result[i] 为 text[:i] 的宽度，长度为 len(text) + 1"""
+        return list(accumulate(map(self.table.__getitem__, text), initial=0))
+
+
+class FontMetricsRegistry:
+    """
+    字形宽度表的内存与磁盘缓存
+
+    每个 (实际字体, 字号) 一张表；新测量到字形的表由 save 写回磁盘，
+    下次启动时直接加载，避免重复调用 Qt 测量
+    """
+
+    def __init__(self, disk_dir=None, max_disk_bytes: int = 8 * 1024 * 1024):
+        self.disk = DiskCache(disk_dir, max_disk_bytes) if disk_dir else None
+        self._tables: Dict[str, GlyphWidthTable] = {}
+        self._meters: Dict[str, FontWidthMeter] = {}
+        self._lock = threading.Lock()
+
+    def get_meter(self, font_family: str, pixel_size: int) -> Optional[FontWidthMeter]:
+        """
+        获取字体的宽度测量器
+
+        没有 QGuiApplication（字体数据库不可用）时返回 None，
+        调用方应回退到按字符类别估算
+        """
+        if not font_family or QGuiApplication.instance() is None:
+            return None
+
+        font = create_font(font_family, pixel_size)
+        # 以实际匹配到的字体为键：安装新字体后匹配结果变化，旧表自然失效
+        resolved = QFontInfo(font).family()
+        key = (GLYPH_TABLE_VERSION, font_family, resolved, pixel_size, qVersion())
+        cache_key = content_key('glyph-widths', *key)
+
+        with self._lock:
+            table = self._tables.get(cache_key)
+            if table is None:
+                widths = self.disk.get(cache_key) if self.disk is not None else MISSING
+                if widths is MISSING or not isinstance(widths, dict):
+                    widths = None
+                table = GlyphWidthTable(QFontMetricsF(font), widths)
+                self._tables[cache_key] = table
+            meter = self._meters.get(cache_key)
+            if meter is None:
+                meter = FontWidthMeter(table, ('font',) + key)
+                self._meters[cache_key] = meter
+        return meter
+
+    def save(self):
+        """将有新增字形的宽度表写回磁盘"""
+        if self.disk is None:
+            return
+        with self._lock:
+            dirty = [(key, table) for key, table in self._tables.items() if table.dirty]
+        for key, table in dirty:
+            table.dirty = False
+            self.disk.put(key, dict(table))
+            logging.debug(f"已保存字形宽度表: {len(table)} 个字符")
+
+
+_default_registry: Optional[FontMetricsRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_font_metrics_registry() -> FontMetricsRegistry:
+    """进程内共享的字形宽度表缓存（磁盘目录位于用户缓存目录下）"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = FontMetricsRegistry(get_user_cache_dir() / 'fonts')
+        return _default_registry
@@ -0,0 +1,167 @@
+# ============================================
+# src/utils/image_size.py - 读取图片尺寸（只读取文件头）
+# ============================================
+import os
+import struct
+import logging
+from typing import BinaryIO, Optional, Tuple
+from urllib.parse import unquote
+from src.utils.cache import LRUCache, MISSING
+
+# (路径, 修改时间, 文件大小) -> (宽, 高) 或 None
+_SIZE_CACHE = LRUCache(1024)
+
+# JPEG 中携带图像尺寸的 SOF 标记（排除 DHT/JPG/DAC）
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# EXIF 方向为 5-8 时图片旋转 90°，浏览器显示时宽高互换
+_EXIF_ORIENTATION_TAG = 0x0112
+_JPEG_MAX_SCAN = 512 * 1024  # 最多扫描的字节数
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    """本地文件的版本（修改时间, 大小）；文件不存在时返回 None"""
+    # Markdown 中的路径可能经过 URL 编码（如空格写作 %20）
+    for candidate in ((path, unquote(path)) if '%' in path else (path,)):
+        try:
+            stat = os.stat(candidate)
+        except (OSError, ValueError):
+            continue
+        return stat.st_mtime_ns, stat.st_size
+    return None
+
+
+def get_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    读取本地 PNG / JPEG / GIF / WebP 图片的显示尺寸（宽, 高）
+
+    只读取文件头，结果按路径和修改时间缓存；无法识别时返回 None
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    cached = _SIZE_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    try:
+        with open(path, 'rb') as f:
+            size = _read_image_size(f)
+    except Exception as e:
+        logging.debug(f"读取图片尺寸失败: {path} ({e})")
+        size = None
+
+    _SIZE_CACHE.put(key, size)
+    return size
+
+
+def _read_image_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    head = f.read(32)
+    if len(head) < 10:
+        return None
+
+    # PNG：IHDR 块紧跟在签名之后
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        width, height = struct.unpack('>II', head[16:24])
+        return width, height
+
+    # GIF：逻辑屏幕尺寸
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', head[6:10])
+        return width, height
+
+    # WebP：RIFF 容器
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return _webp_size(head)
+
+    # JPEG：逐段扫描到 SOF
+    if head[:2] == b'\xff\xd8':
+        f.seek(2)
+        return _jpeg_size(f)
+
+    return None
+
+
+def _webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and head[20] == 0x2F:
+        b0, b1, b2, b3 = head[21:25]
+        width = 1 + (b0 | (b1 & 0x3F) << 8)
+        height = 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+        return width, height
+    if chunk == b'VP8X':
+        width = 1 + int.from_bytes(head[24:27], 'little')
+        height = 1 + int.from_bytes(head[27:30], 'little')
+        return width, height
+    return None
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    rotated = False
+    while f.tell() < _JPEG_MAX_SCAN:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':  # 填充字节
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0xD8 or 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue  # 无长度字段的标记
+        if code == 0xD9 or code == 0xDA:
+            return None  # 图像数据开始前没有找到 SOF
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if length < 2:
+            return None
+
+        if code in _JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return (height, width) if rotated else (width, height)
+
+        if code == 0xE1:  # APP1：EXIF 方向
+            data = f.read(length - 2)
+            rotated = rotated or _exif_rotated(data)
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def _exif_rotated(data: bytes) -> bool:
+    """EXIF 方向标记是否表示旋转 90°/270°"""
+    if not data.startswith(b'Exif\x00\x00') or len(data) < 14:
+        return False
+    tiff = data[6:]
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return False
+    try:
+        ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+        count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag = struct.unpack(endian + 'H', tiff[entry:entry + 2])[0]
+            if tag == _EXIF_ORIENTATION_TAG:
+                value = struct.unpack(endian + 'H', tiff[entry + 8:entry + 10])[0]
+                return value in (5, 6, 7, 8)
+    except struct.error:
+        return False
+    return False
@@ -0,0 +1,337 @@
+# ============================================
+# src/utils/page_breaker.py - 全局最优分页（Knuth-Plass 风格）
+# ============================================
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 拆分段落的回调：(段落元素, 可用高度) -> (前半部分, 后半部分) 或 None
+SplitFunc = Callable[[object, int], Optional[Tuple[object, object]]]
+
+
+@dataclass
+class BreakCosts:
+    """分页代价参数"""
+    underfill_weight: float = 100.0  # 非末页留白代价：(1 - 填充率)^2 * 权重
+    short_page_ratio: float = 0.35  # 填充率低于该值视为过短页
+    short_page_penalty: float = 80.0  # 过短页额外代价（末页同样计算）
+    heading_penalty: float = 1000.0  # 标题落在页面底部
+    split_penalty: float = 5.0  # 段落跨页拆分
+    widow_penalty: float = 50.0  # 拆分后前半或后半行数过少（孤行/寡行）
+    page_penalty: float = 500.0  # 每页固定代价：高于留白、孤行寡行等代价，页数不多于逐页贪心
+
+
+class OptimalPageBreaker:
+    """
+    在整段内容上求总代价最小的分页方案（动态规划）
+
+    每个断点向后只考虑能放进一页的元素（窗口由页高决定，用二分查找确定），
+    候选页的高度和留白代价由元素高度的前缀和直接算出，标题落在页底的代价预先
+    按页尾位置列出，每个候选只需常数次运算；断点的代价与回溯信息存放在按断点
+    编号索引的平行列表中，不为候选创建对象。拆分段落产生的延续断点每个位置
+    只保留代价最低的几个，因此运行时间与元素数量成线性关系。
+    强制分页标记由调用方切分为独立的段
+
+    求解时段落拆分按行数估算（前半部分按放得下的行数计，后半部分按剩余行数计，
+    末行接近排满的段落多计一行），求出方案后只沿选中的分页实际拆分段落。
+    实际拆分与估算不符（长单词、网址使断行位置大幅退让等）的段落
+    改为实际拆分后重新求解
+    """
+
+    MAX_CARRY_STATES = 4  # 每个位置保留的延续断点数
+    MAX_REFINEMENTS = 3  # 估算不符时重新求解的次数，仍不符时所有段落都实际拆分
+
+    def __init__(self, content_height: int, split_paragraph: SplitFunc,
+                 line_height: int, line_base: int, min_orphan_lines: int, min_widow_lines: int,
+                 costs: Optional[BreakCosts] = None, full_last_line: Optional[Callable[[object], bool]] = None):
+        """
+        Args:
+            full_last_line: 段落末行是否接近排满（拆分后后半部分可能比剩余行数多一行）；
+                未提供时估算一律多计一行
+        """
+        self.content_height = content_height
+        self.split_paragraph = split_paragraph
+        self.line_height = max(1, line_height)
+        self.line_base = line_base
+        self.min_orphan_lines = min_orphan_lines
+        self.min_widow_lines = min_widow_lines
+        self.costs = costs or BreakCosts()
+        self.full_last_line = full_last_line
+
+    def break_pages(self, elements: Sequence) -> List[Tuple[list, int]]:
+        """
+        Returns:
+            每页的 (元素列表, 高度)；elements 为空时返回空列表
+        """
+        if not elements:
+            return []
+        exact = set()
+        for _ in range(self.MAX_REFINEMENTS):
+            pages, mismatched = self._solve(elements, exact)
+            if not mismatched:
+                return pages
+            exact |= mismatched
+        return self._solve(elements, None)[0]
+
+    def _solve(self, elements: Sequence, exact: Optional[set]) -> Tuple[List[Tuple[list, int]], set]:
+        """
+        求解分页方案
+
+        exact 中的段落实际拆分，其余按行数估算（为 None 时全部实际拆分）。
+        拆分出的两部分记为 (高度, 行数, 元素)，估算时元素为 None
+
+        Returns:
+            (每页的 (元素列表, 高度), 实际拆分与估算不符的段落索引)
+        """
+        n = len(elements)
+        limit = self.content_height
+        line_base, line_height = self.line_base, self.line_height
+        min_orphan, min_widow = self.min_orphan_lines, self.min_widow_lines
+        full_last_line = self.full_last_line
+        heights = [element.height for element in elements]
+        # offsets[k] 为前 k 个元素的总高度，页高用差值计算，可放入的范围用二分查找
+        offsets = list(accumulate(heights, initial=0))
+        costs = self.costs
+        weight = costs.underfill_weight / (limit * limit)
+        short_height = limit * costs.short_page_ratio
+        short_penalty = costs.short_page_penalty
+        page_penalty = costs.page_penalty
+        split_penalty = costs.split_penalty
+        widow_penalty = costs.widow_penalty
+        # 页面在 elements[j - 1] 之后结束时的额外代价（标题落在页底）
+        end_penalty = [0.0] + [costs.heading_penalty if element.type == 'heading' else 0.0
+                               for element in elements]
+        splittable = [element.type == 'paragraph' and element.can_break and bool(element.text)
+                      for element in elements]
+
+        # 断点按编号存放：0..n 为各位置不带延续部分的断点，之后追加延续断点。
+        # cost 为到达该断点的最小总代价，prev / start / end / tail 记录产生它的上一页
+        # （上一断点的延续部分 + elements[start:end] + 拆分出的前半部分 tail），
+        # carry 为带到下一页的后半部分，position 为断点位置
+        inf = float('inf')
+        cost = [inf] * (n + 1)
+        prev = [-1] * (n + 1)
+        start = [0] * (n + 1)
+        end = [0] * (n + 1)
+        tail = [None] * (n + 1)
+        carry = [None] * (n + 1)
+        position = list(range(n + 1))
+        cost[0] = 0.0
+        carried: Dict[int, List[int]] = {}
+        max_carry = self.MAX_CARRY_STATES
+        pieces: List[Optional[tuple]] = [None] * n  # 整段的 (高度, 行数, 元素, 估算时后半部分多计的行数)
+
+        # 拆分结果只取决于能放下的行数，同一元素按 (位置, 行数) 复用
+        split_cache: Dict[Tuple[int, int], Optional[tuple]] = {}
+
+        def split(piece: tuple, available: float, index: Optional[int] = None):
+            """拆分段落 elements[index]（index 为 None 时拆分延续部分 piece）"""
+            lines = int((available - line_base) // line_height)
+            if lines < min_orphan:
+                # 剩余空间放不下最少行数，拆分只会产生超高页或孤行
+                return None
+            element = piece[2]
+            if element is None or (index is not None and exact is not None and index not in exact):
+                total = piece[1]
+                # 后半部分按剩余行数计，末行接近排满的段落和延续部分多计一行
+                rest = total - lines + (piece[3] if element is not None else 1)
+                if lines >= total or rest >= total:
+                    return None
+                return (line_base + lines * line_height, lines, None), (line_base + rest * line_height, rest, None)
+            if index is not None and (index, lines) in split_cache:
+                return split_cache[index, lines]
+            parts = self.split_paragraph(element, available)
+            if parts is not None:
+                part1, part2 = parts
+                parts = (part1.height, self._lines(part1), part1), (part2.height, self._lines(part2), part2)
+            if index is not None:
+                split_cache[index, lines] = parts
+            return parts
+
+        def page_cost(height: float, is_last: bool) -> float:
+            """以段落（或其片段）结尾的页面代价"""
+            result = page_penalty
+            if height < short_height:
+                result += short_penalty
+            if not is_last and height < limit:
+                result += weight * (limit - height) ** 2
+            return result
+
+        def split_cost(part1: tuple, part2: tuple) -> float:
+            """段落拆分的代价：孤行（前半行数过少）和寡行（后半行数过少）"""
+            result = split_penalty
+            if part1[1] < min_orphan:
+                result += widow_penalty
+            if part2[1] < min_widow:
+                result += widow_penalty
+            return result
+
+        def add_carry(index: int, state_cost: float, state: int, first: int, last: int, parts: tuple):
+            queue = carried.get(index)
+            if queue is None:
+                carried[index] = [len(cost)]
+            else:
+                queue.append(len(cost))
+            cost.append(state_cost)
+            prev.append(state)
+            start.append(first)
+            end.append(last)
+            tail.append(parts[0])
+            carry.append(parts[1])
+            position.append(index)
+
+        def relax(index: int, state_cost: float, state: int, first: int, last: int):
+            if state_cost < cost[index]:
+                cost[index], prev[index], start[index], end[index], tail[index] = state_cost, state, first, last, None
+
+        for i in range(n + 1):
+            queue = carried.pop(i, None)
+            if queue is None:
+                queue = []
+            elif len(queue) > 1:
+                # 延续断点按代价保留最优的几个
+                queue.sort(key=cost.__getitem__)
+                del queue[max_carry:]
+            # 不带延续部分的断点最后处理（延续部分单独成页时会更新它）
+            if i < n and cost[i] < inf:
+                queue.append(i)
+            for state in queue:
+                base = cost[state]
+                piece = carry[state]
+
+                carry_height = 0
+                if piece is not None:
+                    carry_height = piece[0]
+                    if carry_height > limit:
+                        # 延续部分本身超过一页：继续拆分，拆不开则单独成页
+                        parts = split(piece, limit)
+                        if parts:
+                            # 新断点在同一位置，插到当前断点之后立即处理
+                            queue.insert(queue.index(state) + 1, len(cost))
+                            add_carry(i, base + page_cost(parts[0][0], False) + split_cost(*parts),
+                                      state, i, i, parts)
+                            del carried[i]
+                        relax(i, base + page_cost(carry_height, i == n), state, i, i)
+                        continue
+                    # 只放延续部分
+                    relax(i, base + page_cost(carry_height, i == n), state, i, i)
+
+                # 能放进本页的元素为 elements[i:last]
+                origin = offsets[i] - carry_height
+                top = origin + limit
+                last = bisect_right(offsets, top, i, n + 1) - 1
+                # 过短的候选页只在没有更满的候选时才考虑（通常代价更高，跳过可减少状态数）
+                first = i + 1
+                page_base = base + page_penalty
+                if last > i:
+                    if offsets[last] - origin >= short_height:
+                        first = bisect_left(offsets, origin + short_height, first, last + 1)
+                    else:
+                        page_base += short_penalty
+
+                if last >= n:
+                    for j in range(first, n):
+                        gap = top - offsets[j]
+                        state_cost = page_base + weight * gap * gap + end_penalty[j]
+                        if state_cost < cost[j]:
+                            cost[j], prev[j], start[j], end[j], tail[j] = state_cost, state, i, j, None
+                    # 末页不计留白和页底标题
+                    if first <= n:
+                        relax(n, page_base, state, i, n)
+                    continue
+
+                # 候选页 elements[i:j]：留白代价由前缀和算出，只在更优时更新断点
+                for j in range(first, last + 1):
+                    gap = top - offsets[j]
+                    state_cost = page_base + weight * gap * gap + end_penalty[j]
+                    if state_cost < cost[j]:
+                        cost[j], prev[j], start[j], end[j], tail[j] = state_cost, state, i, j, None
+
+                # elements[last] 放不下：尝试拆分段落
+                if splittable[last]:
+                    height = offsets[last] - origin
+                    available = limit - height
+                    lines = int((available - line_base) // line_height)
+                    if lines >= min_orphan:
+                        whole = pieces[last]
+                        if whole is None:
+                            element = elements[last]
+                            full = full_last_line is None or full_last_line(element)
+                            whole = pieces[last] = (element.height, self._lines(element), element, int(full))
+                        parts = split(whole, available, last)
+                        if parts:
+                            part1, part2 = parts
+                            add_carry(last + 1, base + page_cost(height + part1[0], False) + split_cost(part1, part2),
+                                      state, i, last, parts)
+                            # 后半部分行数过少（寡行）时另试少放几行，把它们移到下一页，
+                            # 否则避免寡行只能整段移到下一页，页数随之增加
+                            shortage = min_widow - part2[1]
+                            if shortage > 0:
+                                parts = split(whole, available - shortage * line_height, last)
+                                if parts:
+                                    add_carry(last + 1,
+                                              base + page_cost(height + parts[0][0], False) + split_cost(*parts),
+                                              state, i, last, parts)
+
+                # 空页也放不下的元素单独成页
+                if last == i and piece is None:
+                    single = page_penalty + (short_penalty if heights[i] < short_height else 0)
+                    if i + 1 < n:
+                        single += weight * max(0, limit - heights[i]) ** 2 + end_penalty[i + 1]
+                    relax(i + 1, base + single, state, i, i + 1)
+
+        path = []
+        state = n
+        while state > 0:
+            path.append(state)
+            state = prev[state]
+        path.reverse()
+        return self._collect(path, elements, start, end, tail, carry, position)
+
+    def _collect(self, path: List[int], elements: Sequence, start: list, end: list,
+                 tail: list, carry: list, position: list) -> Tuple[List[Tuple[list, int]], set]:
+        """
+        按顺序生成每页的元素列表，估算的拆分在此实际进行
+
+        拆分按估算时的行数进行，前半部分不会超过估算高度；后半部分超过估算高度
+        或无法按该行数拆分的段落记为不符。后半部分整段放得下时不再拆分，下一页不带延续部分
+        """
+        pages = []
+        mismatched = set()
+        carried = None  # 上一页实际带过来的后半部分
+        carried_from = -1  # 它所属段落的索引
+        for state in path:
+            piece = tail[state]
+            split_carry = piece is not None and position[state] == end[state]
+            page_elements = []
+            if carried is not None and not split_carry:
+                page_elements.append(carried)
+            page_elements.extend(elements[start[state]:end[state]])
+            target, index = (carried, carried_from) if split_carry else (None, end[state])
+            carried = None
+            if piece is not None and piece[2] is not None:
+                page_elements.append(piece[2])
+                carried = carry[state][2]
+            elif piece is not None and (target is not None or not split_carry):
+                if target is None:
+                    target = elements[index]
+                available = self.line_base + piece[1] * self.line_height
+                parts = self.split_paragraph(target, available)
+                if parts is None:
+                    if target.height > available:
+                        mismatched.add(index)
+                    page_elements.append(target)
+                else:
+                    if parts[1].height > carry[state][0]:
+                        mismatched.add(index)
+                    page_elements.append(parts[0])
+                    carried = parts[1]
+            if piece is not None:
+                carried_from = index
+            if page_elements:
+                pages.append((page_elements, sum(element.height for element in page_elements)))
+        return pages, mismatched
+
+    def _lines(self, element) -> int:
+        return max(1, round((element.height - self.line_base) / self.line_height))
@@ -1,21 +1,162 @@
 # ============================================
 # src/utils/paginator.py - 优化完整版
 # ============================================
-from typing import List, Tuple, Optional, Dict
-from dataclasses import dataclass
-from bs4 import BeautifulSoup, NavigableString, Tag, Comment
-import re
+from typing import Iterable, Iterator, List, Tuple, Optional, Dict, Union
+from dataclasses import dataclass, field, asdict, replace
+from itertools import islice
+from bisect import bisect_left
+from operator import itemgetter
+from src.core.blocks import MarkdownBlock, html_to_blocks
+from src.utils.cache import RenderCache, content_key, MISSING
+from src.utils.text_width import TextWidthMeter
+from src.utils.font_metrics import get_font_metrics_registry
+from src.utils.page_breaker import BreakCosts, OptimalPageBreaker
+from src.utils.paragraph_split import ParagraphSource, find_split, paragraph_source
+import time
 
-@dataclass
 class PageElement:
-    """页面元素"""
-    type: str  # 'heading', 'paragraph', 'list', 'code', 'blockquote', 'table', 'hr', 'text', 'pagebreak'
-    content: str  # HTML内容
+    """
+    页面元素
+
+    使用 __slots__ 存储，每个实例不再分配 __dict__，大文档的元素和拆分片段更省内存；
+    content 可以延迟生成：拆分段落得到的片段只记录原段落及可见文本范围，HTML 在首次
+    访问时才从原段落截取，分页过程中被舍弃的候选片段不产生 HTML 字符串。
+    序列化时写入紧凑的元组
+    """
+    __slots__ = ('type', 'text', 'level', 'height', 'can_break', 'metadata', '_content', '_span')
+
+    # 'heading', 'paragraph', 'list', 'code', 'blockquote', 'table', 'hr', 'text', 'pagebreak'
+    type: str
     text: str  # 纯文本内容（用于计算高度）
-    level: int = 0  # 标题级别或嵌套深度
-    height: int = 0  # 估算高度（像素）
-    can_break: bool = True  # 是否允许在元素内部分页
-    metadata: dict = None  # 额外信息
+    level: int  # 标题级别或嵌套深度
+    height: int  # 估算高度（像素）
+    can_break: bool  # 是否允许在元素内部分页
+    metadata: Optional[dict]  # 额外信息
+
+    def __init__(self, type: str, content: Optional[str], text: str, level: int = 0, height: int = 0,
+                 can_break: bool = True, metadata: Optional[dict] = None):
+        self.type = type
+        self._content = content  # HTML内容；None 表示尚未从原段落截取的片段
+        self._span: Optional[Tuple[str, int, int]] = None  # 片段的 (原段落 HTML, 起, 止)
+        self.text = text
+        self.level = level
+        self.height = height
+        self.can_break = can_break
+        self.metadata = metadata
+
+    @classmethod
+    def paragraph_fragment(cls, source: ParagraphSource, start: int, end: int, height: int) -> 'PageElement':
+        """拆分段落得到的片段：原段落可见文本的 [start, end) 部分（HTML 在首次访问 content 时截取）"""
+        element = cls('paragraph', None, source.text[start:end], height=height)
+        # 只引用原段落的 HTML 字符串，解析结果按 HTML 缓存，不随片段常驻内存
+        element._span = (source.html, start, end)
+        return element
+
+    @property
+    def content(self) -> str:
+        """HTML内容"""
+        if self._content is None:
+            html, start, end = self._span
+            self._content = paragraph_source(html).fragment_html(start, end)
+        return self._content
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"PageElement(type={self.type!r}, content={self.content!r}, text={self.text!r}, "
+                f"level={self.level!r}, height={self.height!r}, can_break={self.can_break!r}, "
+                f"metadata={self.metadata!r})")
+
+    def _astuple(self) -> tuple:
+        return self.type, self.content, self.text, self.level, self.height, self.can_break, self.metadata
+
+    def __getstate__(self) -> tuple:
+        # 片段写入截取后的 HTML，不带原段落
+        return self.type, self.content, self.text, self.level, self.height, self.can_break, self.metadata
+
+    def __setstate__(self, state: tuple):
+        (self.type, self._content, self.text, self.level, self.height,
+         self.can_break, self.metadata) = state
+        self._span = None
+
+
+@dataclass
+class Page:
+    """
+    分页结果中的一页
+
+    保留页内元素及其高度，合并短页和调试时无需重新解析 HTML；
+    页面 HTML 在首次访问时才拼接
+    """
+    elements: List[PageElement] = field(default_factory=list)
+    height: int = 0  # 页内元素估算高度之和（像素）
+    forced_break: bool = False  # 是否由强制分页标记结束
+    _html: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def html(self) -> str:
+        if self._html is None:
+            self._html = '\n'.join(e.content for e in self.elements if e.type != 'pagebreak')
+        return self._html
+
+    def is_blank(self) -> bool:
+        # 直接检查元素，避免为判断空页而拼接整页 HTML
+        return all(e.type == 'pagebreak' or not e.content or e.content.isspace() for e in self.elements)
+
+    def merged_with(self, other: 'Page') -> 'Page':
+        """与下一页合并为一页"""
+        return Page(
+            elements=self.elements + other.elements,
+            height=self.height + other.height,
+            forced_break=other.forced_break
+        )
+
+    def __str__(self) -> str:
+        return self.html
+
+
+# 页起点：(下一个待处理元素的索引, 上一页拆分段落的剩余部分)
+PageStart = Tuple[int, Optional[PageElement]]
+
+
+def _common_prefix_length(a: list, b: list) -> int:
+    """两个列表公共前缀的长度（先按块比较切片，比较在 C 层完成）"""
+    limit = min(len(a), len(b))
+    n = 0
+    step = 256
+    while step:
+        while n + step <= limit and a[n:n + step] == b[n:n + step]:
+            n += step
+        step //= 16
+    return n
+
+
+def _start_key(start: PageStart) -> Tuple[int, object]:
+    index, carry = start
+    if carry is None:
+        return index, None
+    # 片段保留行内标记，须按原段落 HTML 和拆分位置比较（只改标记时可见文本不变）；
+    # 延续部分都到段落末尾，有 _span 时无需生成片段 HTML
+    return index, carry._span if carry._span is not None else carry.content
+
+
+@dataclass
+class PaginationLayout:
+    """上一次块列表分页的布局，作为增量重排的基准"""
+    fingerprint: str  # 分页参数摘要，变化时布局失效
+    keys: list  # 每个元素对应的块 HTML（实测模式下为 (HTML, 实测高度)）
+    elements: List[PageElement]
+    raw_pages: List[Page]  # 合并短页之前的页面
+    starts: List[PageStart]  # 每个原始页的起点
+    pages: List[Page]  # 合并短页之后的页面
+    sources: Optional[List[int]]  # 每页合并判断开始的原始页索引
+    ends: Optional[List[int]]  # 每页结束后的原始页索引
+
 
 class SmartPaginator:
     """智能分页器 - 支持多尺寸"""
@@ -71,16 +212,42 @@ class SmartPaginator:
     MIN_WIDOW_LINES = 2  # 寡行控制
     HEADING_KEEP_WITH = 120  # 标题后至少保留的内容高度
 
+    # 分页引擎：greedy 逐页贪心 + 合并短页；optimal 全局最优（动态规划）。
+    # optimal 在 1 万个块的文档上首次分页约为 greedy 的 2 倍耗时，块序列不变时沿用上次的结果，
+    # 但编辑后须整篇重新求解（不做增量重排），界面不提供该选项，只能通过 set_engine 显式启用
+    ENGINES = ("greedy", "optimal")
+    BREAK_COSTS = BreakCosts()  # optimal 引擎的代价参数
+    SPLIT_BACKOFF_CHARS = 8  # optimal 引擎估算拆分时断行位置向前退让的宽度（英文字符数，另加一个中文字符）
+
+    # 图片高度：尺寸未知时按固定高度估算，已知时按 max-width: 90% / max-height: 50vh 缩放
+    DEFAULT_IMAGE_HEIGHT = 300
+    IMAGE_MAX_WIDTH_RATIO = 0.9
+    IMAGE_MAX_HEIGHT_RATIO = 0.5
+
     # 字符宽度估算（像素）
     CHAR_WIDTH = 15  # 中文字符平均宽度（稍微调小）
     CHAR_WIDTH_EN = 8  # 英文字符平均宽度
 
-    def __init__(self, page_size: str = "medium", font_size: int = 18):
+    # 分页算法变化时递增，使旧的结果缓存（含磁盘缓存）失效
+    CACHE_VERSION = 7
+
+    def __init__(self, page_size: str = "medium", font_size: int = 18, cache: Optional[RenderCache] = None,
+                 font_family: Optional[str] = None, engine: str = "greedy"):
         """初始化分页器"""
         self.elements: List[PageElement] = []
+        self.engine = "greedy"
+        self.set_engine(engine)
+        # 分页结果缓存（可与 MarkdownProcessor 共享）
+        self.cache = cache
+        # 设置字体后按真实字形宽度换行，否则按字符类别估算
+        self.font_family = font_family
+        # 实测模式下由浏览器测得的块高度（块 HTML -> 像素）
+        self.measured_heights: Optional[Dict[str, int]] = None
         self.set_page_size(page_size)
         self.set_font_size(font_size)
         self.forced_break_pages = set()
+        # 上一次块列表分页的布局（增量重排用）
+        self._layout: Optional[PaginationLayout] = None
 
     def set_page_size(self, size: str):
         """设置页面尺寸"""
@@ -106,6 +273,7 @@ class SmartPaginator:
         # 调整字符宽度
         self.char_width = int(self.CHAR_WIDTH * ratio)
         self.char_width_en = int(self.CHAR_WIDTH_EN * ratio)
+        self._update_text_meter()
         
         # 调整元素高度
         self.element_heights = {
@@ -128,6 +296,38 @@ class SmartPaginator:
             'margin_bottom': int(18 * ratio),
         }
 
+    def set_font_family(self, font_family: Optional[str]):
+        """设置正文字体（CSS 字体栈），用于按真实字形宽度计算换行"""
+        if font_family != self.font_family:
+            self.font_family = font_family
+            self._update_text_meter()
+
+    def set_engine(self, engine: str):
+        """设置分页引擎（greedy / optimal）"""
+        if engine not in self.ENGINES:
+            raise ValueError(f"未知的分页引擎: {engine}")
+        self.engine = engine
+
+    def set_measured_heights(self, heights: Optional[Dict[str, int]]):
+        """设置实测的块高度；为 None 时恢复按规则估算"""
+        self.measured_heights = heights or None
+
+    def set_text_meter(self, meter):
+        """
+        直接指定文本宽度测量器（TextWidthMeter / FontWidthMeter 接口）
+
+        用于没有字体数据库的子进程：由主进程导出字形宽度表后在此设置，
+        测量器的 key 与主进程一致，分页结果和缓存键也就一致
+        """
+        self.text_meter = meter
+
+    def _update_text_meter(self):
+        """选择文本宽度测量方式：有字体且字体度量可用时使用字形宽度表"""
+        meter = None
+        if self.font_family:
+            meter = get_font_metrics_registry().get_meter(self.font_family, self.font_size)
+        self.text_meter = meter or TextWidthMeter(self.char_width, self.char_width_en)
+
     def get_page_info(self) -> Dict[str, int]:
         """获取当前页面信息"""
         return {
@@ -140,46 +340,278 @@ class SmartPaginator:
             "padding_sides": self.padding_sides
         }
 
-    def paginate(self, html_content: str) -> List[str]:
+    def paginate(self, content: Union[str, List[MarkdownBlock]]) -> List[Page]:
         """
         核心分页方法
 
         Args:
-            html_content: HTML内容
+            content: HTML内容，或 MarkdownProcessor.parse_blocks 输出的块列表
 
         Returns:
-            分页后的HTML内容列表
+            分页结果（已合并过短的页），每页的 HTML 由 Page.html 获取
+        """
+        key = self.cache_key(content)
+        cached = self.cache.get(key) if key else MISSING
+        if cached is not MISSING:
+            pages, forced_break_pages = cached
+            self.forced_break_pages = set(forced_break_pages)
+            return list(pages)
+
+        start = time.perf_counter()
+        pages = self._paginate(content)
+        if key:
+            self.cache.put(key, (list(pages), frozenset(self.forced_break_pages)), time.perf_counter() - start)
+        return pages
+
+    def config_fingerprint(self) -> str:
+        """影响分页结果的全部参数（页面尺寸、字体、高度与宽度常量）的摘要"""
+        return content_key(
+            self.CACHE_VERSION,
+            self.page_size_name,
+            sorted(self.PAGE_SIZES[self.page_size_name].items()),
+            self.font_size,
+            sorted(self.ELEMENT_HEIGHTS.items()),
+            sorted(self.element_heights.items()),
+            (self.char_width, self.char_width_en, self.CHAR_WIDTH, self.CHAR_WIDTH_EN),
+            self.text_meter.key,
+            (self.MIN_ORPHAN_LINES, self.MIN_WIDOW_LINES, self.HEADING_KEEP_WITH),
+            self.engine,
+            sorted(asdict(self.BREAK_COSTS).items()) if self.engine == "optimal" else None,
+            (self.DEFAULT_IMAGE_HEIGHT, self.IMAGE_MAX_WIDTH_RATIO, self.IMAGE_MAX_HEIGHT_RATIO),
+        )
+
+    def cache_key(self, content: Union[str, List[MarkdownBlock]]) -> Optional[str]:
+        """分页缓存的键；未配置缓存时返回 None"""
+        if self.cache is None:
+            return None
+        if isinstance(content, str):
+            return content_key('paginate-html', self.config_fingerprint(), content)
+        # 块的类型和统计信息都由 HTML 决定，按块拼接 HTML 即可唯一确定输入
+        parts = ['paginate-blocks', self.config_fingerprint(), '\x00'.join(block.html for block in content)]
+        if self.measured_heights:
+            parts.append([self.measured_heights.get(block.html) for block in content])
+        return content_key(*parts)
+
+    def _paginate(self, content: Union[str, List[MarkdownBlock]]) -> List[Page]:
+        """执行分页（不经过缓存）"""
+        if isinstance(content, list):
+            return self._paginate_blocks(content)
+        return list(self.iter_pages(content))
+
+    def iter_pages(self, content: Union[str, Iterable[MarkdownBlock]]) -> Iterator[Page]:
+        """
+        流式分页：逐页产出与 paginate 相同的结果
+
+        可直接消费 MarkdownProcessor.iter_blocks 的输出，第一页在整篇文档
+        处理完之前即可显示或导出；合并短页只需向后看一页，内存占用与文档长度无关
+
+        Args:
+            content: HTML内容，或结构化块的可迭代对象
         """
         # 重置状态
         self.forced_break_pages = set()
 
-        # 1. 解析HTML为元素列表
-        elements = self.parse_html_to_elements(html_content)
+        # 1. 转换为元素序列（块无需再解析HTML）
+        if isinstance(content, str):
+            elements = self.parse_html_to_elements(content)
+            if not elements:
+                if content:
+                    yield Page(_html=content)
+                return
+        else:
+            elements = (self._element_from_block(block) for block in content)
 
-        if not elements:
-            return [html_content] if html_content else []
+        # 2. 执行分页，并合并过短页（避免出现很多内容特别少的页面）
+        if self.engine == "optimal":
+            raw_pages = self._iter_optimal_raw_pages(elements)
+        else:
+            raw_pages = (page for _, page in self._iter_raw_pages(elements))
+        yield from self._iter_optimized_pages(raw_pages)
 
-        # 2. 执行分页
-        pages = []
-        current_page_elements = []
-        current_height = 0
+    def _paginate_blocks(self, blocks: List[MarkdownBlock]) -> List[Page]:
+        """
+        块列表分页，并保留布局供下次增量重排
+
+        与上次的块序列比较出公共前缀和公共后缀：前缀内的页面原样保留，
+        从第一个受影响的页面开始重新排版，一旦某页的起点与旧布局对齐，
+        之后的页面直接沿用旧布局（元素索引整体平移）；合并短页同样只重做
+        受影响的一段，重排开销只与改动的大小有关
+        """
+        fingerprint = self.config_fingerprint()
+        keys = [block.html for block in blocks]
+        if self.measured_heights:
+            keys = [(key, self.measured_heights.get(key)) for key in keys]
+        old = self._layout
+        if old is not None and old.fingerprint != fingerprint:
+            old = None
+
+        if self.engine == "optimal":
+            # 全局最优分页的结果取决于整段内容，不做增量重排；块序列不变时沿用上次的结果
+            if old is None or old.keys != keys:
+                elements = [self._element_from_block(block) for block in blocks]
+                self.forced_break_pages = set()
+                raw_pages = list(self._iter_optimal_raw_pages(elements))
+                pages, sources, ends = self._merge_short_pages(raw_pages)
+                # 指纹含分页引擎，该布局不会用于逐页贪心的增量重排，不记录页面起点
+                old = PaginationLayout(fingerprint, keys, elements, raw_pages, [], pages, sources, ends)
+                self._layout = old
+            self.forced_break_pages = {i for i, page in enumerate(old.raw_pages) if page.forced_break}
+            return list(old.pages)
+
+        if old is None:
+            elements = [self._element_from_block(block) for block in blocks]
+            raw_pages, starts = self._layout_raw_pages(elements, (0, None), 0)
+            pages, sources, ends = self._merge_short_pages(raw_pages)
+        else:
+            elements, raw_pages, starts, restart, aligned = self._relayout(old, blocks, keys)
+            pages, sources, ends = self._merge_short_pages(raw_pages, old, restart, aligned)
+
+        self.forced_break_pages = {i for i, page in enumerate(raw_pages) if page.forced_break}
+        self._layout = PaginationLayout(fingerprint, keys, elements, raw_pages, starts, pages, sources, ends)
+        return list(pages)
 
+    def _relayout(self, old: PaginationLayout, blocks: List[MarkdownBlock], keys: list):
+        """
+        基于旧布局增量重排
+
+        Returns:
+            (元素列表, 原始页列表, 各页起点, 第一个重排的页索引, 对齐位置)；
+            对齐位置为 (新布局中开始沿用旧页的索引, 对应的旧页索引)，未对齐时为 None
+        """
+        old_keys = old.keys
+        n_old, n_new = len(old_keys), len(keys)
+        prefix = _common_prefix_length(keys, old_keys)
+        limit = min(n_old, n_new) - prefix
+        suffix = _common_prefix_length(keys[:n_new - limit - 1:-1], old_keys[:n_old - limit - 1:-1]) if limit else 0
+
+        # 未改动的元素直接复用
+        elements = old.elements[:prefix]
+        elements.extend(self._element_from_block(block) for block in blocks[prefix:n_new - suffix])
+        elements.extend(old.elements[n_old - suffix:])
+        if prefix == n_old == n_new:
+            return elements, list(old.raw_pages), list(old.starts), len(old.raw_pages), None
+
+        # 第 k 页的内容取决于从其起点到下一页起点（含）的元素，
+        # 下一页起点仍在前缀之前的页不受影响
+        restart = max(0, bisect_left(old.starts, prefix, key=itemgetter(0)) - 1)
+
+        delta = n_new - n_old
+        raw_pages = old.raw_pages[:restart]
+        starts = old.starts[:restart]
+        for start, page in self._iter_raw_pages(elements, old.starts[restart], restart):
+            if start[0] >= n_new - suffix:
+                j = self._find_start(old.starts, (start[0] - delta, start[1]))
+                if j is not None:
+                    # 与旧布局对齐，其后的页面不变
+                    aligned = (len(raw_pages), j)
+                    raw_pages.extend(old.raw_pages[j:])
+                    starts.extend((index + delta, carry) for index, carry in old.starts[j:])
+                    return elements, raw_pages, starts, restart, aligned
+            raw_pages.append(page)
+            starts.append(start)
+        return elements, raw_pages, starts, restart, None
+
+    @staticmethod
+    def _find_start(starts: List[PageStart], start: PageStart) -> Optional[int]:
+        """在旧布局中查找起点相同的页"""
+        key = _start_key(start)
+        j = bisect_left(starts, start[0], key=itemgetter(0))
+        while j < len(starts) and starts[j][0] == start[0]:
+            if _start_key(starts[j]) == key:
+                return j
+            j += 1
+        return None
+
+    def _merge_short_pages(self, raw_pages: List[Page], old: Optional[PaginationLayout] = None,
+                           restart: int = 0, aligned: Optional[Tuple[int, int]] = None):
+        """
+        合并过短的页（_iter_merged_pages），沿用旧布局中不受影响的合并结果
+
+        Returns:
+            (页面列表, 每页合并判断开始的原始页索引, 每页结束后的原始页索引)；
+            未做合并判断（只有一页或全部为空页）时后两项为 None
+        """
+        if len(raw_pages) <= 1:
+            return list(raw_pages), None, None
+
+        pages, sources, ends = [], [], []
         i = 0
-        while i < len(elements):
-            element = elements[i]
+        if old is not None and old.sources is not None:
+            # 合并判断只看当前页和下一页，两页都在重排位置之前的结果可以沿用
+            keep = bisect_left(old.sources, restart - 1)
+            pages, sources, ends = old.pages[:keep], old.sources[:keep], old.ends[:keep]
+            i = ends[-1] if ends else 0
+
+        shift = None
+        if aligned is not None and old is not None and old.sources is not None:
+            shift = aligned[0] - aligned[1]
+
+        def reuse_from(i: int) -> bool:
+            """对齐之后的原始页与旧布局相同，从相同的判断位置起结果也相同"""
+            if shift is None or i < aligned[0]:
+                return False
+            m = bisect_left(old.sources, i - shift)
+            if m >= len(old.sources) or old.sources[m] != i - shift:
+                return False
+            pages.extend(old.pages[m:])
+            sources.extend(source + shift for source in old.sources[m:])
+            ends.extend(end + shift for end in old.ends[m:])
+            return True
+
+        if not reuse_from(i):
+            for source, end, page in self._iter_merged_pages(islice(raw_pages, i, None), i):
+                sources.append(source)
+                pages.append(page)
+                ends.append(end)
+                if reuse_from(end):
+                    break
+
+        # 全部为空页时保持原样
+        if not pages:
+            return list(raw_pages), None, None
+        return pages, sources, ends
+
+    def _layout_raw_pages(self, elements: List[PageElement], start: PageStart,
+                          page_index: int) -> Tuple[List[Page], List[PageStart]]:
+        raw_pages, starts = [], []
+        for page_start, page in self._iter_raw_pages(elements, start, page_index):
+            raw_pages.append(page)
+            starts.append(page_start)
+        return raw_pages, starts
+
+    def _iter_raw_pages(self, elements: Iterable[PageElement], start: PageStart = (0, None),
+                        page_index: int = 0) -> Iterator[Tuple[PageStart, Page]]:
+        """
+        贪心分页，逐页产出 (页起点, Page)
 
+        页起点为 (下一个待处理元素的索引, 上一页拆分段落的剩余部分)，
+        从任一页起点开始排版得到的后续页面完全相同，增量重排以此为续排位置。
+        传入列表时从起点索引处开始；强制分页产生的页在产出之前加入 forced_break_pages
+        """
+        index, carry = start
+        if isinstance(elements, list):
+            elements = islice(elements, index, None)
+        current_page_elements = []
+        current_height = 0
+        page_start = start
+        if carry is not None:
+            # 续排时延续上一页拆分出的段落剩余部分
+            current_page_elements = [carry]
+            current_height = carry.height
+
+        element = next(elements, None)
+        while element is not None:
             # 处理强制分页标记
             if element.type == 'pagebreak':
-                if current_page_elements:
-                    pages.append(self._elements_to_html(current_page_elements))
-                    current_page_elements = []
-                    current_height = 0
-                    self.forced_break_pages.add(len(pages) - 1)
-                else:
-                    # 当前页为空，插入一个空页以表示强制分页
-                    pages.append('')
-                    self.forced_break_pages.add(len(pages) - 1)
-                i += 1
+                # 当前页为空时产出一个空页以表示强制分页
+                self.forced_break_pages.add(page_index)
+                yield page_start, Page(current_page_elements, current_height, forced_break=True)
+                page_index += 1
+                current_page_elements = []
+                current_height = 0
+                index += 1
+                page_start = (index, None)
+                element = next(elements, None)
                 continue
 
             # 如果当前元素能放下
@@ -191,15 +623,18 @@ class SmartPaginator:
                     if remaining_height < self.HEADING_KEEP_WITH:
                         # 如果当前页已经有内容，则换页
                         if current_page_elements:
-                            pages.append(self._elements_to_html(current_page_elements))
+                            yield page_start, Page(current_page_elements, current_height)
+                            page_index += 1
                             current_page_elements = []
                             current_height = 0
-                            # 不前进i，下一轮再尝试放element
+                            page_start = (index, None)
+                            # 不前进，下一轮再尝试放element
                             continue
-                
+
                 current_page_elements.append(element)
                 current_height += element.height
-                i += 1
+                index += 1
+                element = next(elements, None)
                 continue
 
             # 放不下，尝试分割（仅对段落支持）
@@ -213,137 +648,219 @@ class SmartPaginator:
                     if split_result:
                         part1, part2 = split_result
                         current_page_elements.append(part1)
-                        pages.append(self._elements_to_html(current_page_elements))
+                        yield page_start, Page(current_page_elements, current_height + part1.height)
+                        page_index += 1
                         current_page_elements = [part2]
                         current_height = part2.height
-                        i += 1
+                        index += 1
+                        page_start = (index, part2)
+                        element = next(elements, None)
                         continue
 
             # 如果无法分割或分割失败，则换页
             if current_page_elements:
-                pages.append(self._elements_to_html(current_page_elements))
+                yield page_start, Page(current_page_elements, current_height)
+                page_index += 1
                 current_page_elements = []
                 current_height = 0
-                # 不前进i，下一轮再尝试放element
+                page_start = (index, None)
+                # 不前进，下一轮再尝试放element
                 continue
             else:
                 # 如果当前页为空也放不下，就强制放进去（避免死循环）
-                current_page_elements.append(element)
-                pages.append(self._elements_to_html(current_page_elements))
-                current_page_elements = []
-                current_height = 0
-                i += 1
+                yield page_start, Page([element], element.height)
+                page_index += 1
+                index += 1
+                page_start = (index, None)
+                element = next(elements, None)
 
         # 3. 收尾：最后一页
         if current_page_elements:
-            pages.append(self._elements_to_html(current_page_elements))
+            yield page_start, Page(current_page_elements, current_height)
 
-        # 4. 合并过短页（避免出现很多内容特别少的页面）
-        pages = self.optimize_pages(pages)
+    def _iter_optimal_raw_pages(self, elements: Iterable[PageElement]) -> Iterator[Page]:
+        """
+        全局最优分页：按强制分页标记切分为独立的段，逐段求代价最小的分页方案
 
-        return pages
+        每段结束即产出该段的页面，可用于流式分页；强制分页的页加入 forced_break_pages
+        """
+        h = self.element_heights
+        merge_threshold = 0.3 if self.page_size_name == "small" else 0.35
+        breaker = OptimalPageBreaker(
+            self.content_height,
+            self._try_split_paragraph,
+            line_height=h['p_line'],
+            line_base=h['p_base'] + h['margin_bottom'],
+            min_orphan_lines=self.MIN_ORPHAN_LINES,
+            min_widow_lines=self.MIN_WIDOW_LINES,
+            costs=replace(self.BREAK_COSTS, short_page_ratio=merge_threshold),
+            full_last_line=self._full_last_line
+        )
 
-    def _elements_to_html(self, elements: List[PageElement]) -> str:
-        """将元素列表转换回HTML字符串"""
-        html_parts = []
+        page_index = 0
+        segment = []
         for element in elements:
             if element.type != 'pagebreak':
-                html_parts.append(element.content)
-        return '\n'.join(html_parts)
+                segment.append(element)
+                continue
+            # 强制分页前的段为空时产出一个空页以表示强制分页
+            pages = breaker.break_pages(segment) or [([], 0)]
+            for k, (page_elements, height) in enumerate(pages):
+                forced = k == len(pages) - 1
+                if forced:
+                    self.forced_break_pages.add(page_index)
+                yield Page(page_elements, height, forced_break=forced)
+                page_index += 1
+            segment = []
+
+        for page_elements, height in breaker.break_pages(segment):
+            yield Page(page_elements, height)
+
+    def _iter_optimized_pages(self, raw_pages: Iterator[Page]) -> Iterator[Page]:
+        """optimize_pages 的流式版本：只向后看一页"""
+        blank_pages = []
+
+        def remember_blank(pages: Iterator[Page]) -> Iterator[Page]:
+            for page in pages:
+                if not emitted and page.is_blank():
+                    blank_pages.append(page)
+                yield page
+
+        emitted = False
+        for _, _, page in self._iter_merged_pages(remember_blank(raw_pages)):
+            emitted = True
+            yield page
+
+        # 全部为空页时保持原样
+        if not emitted:
+            yield from blank_pages
+
+    def _iter_merged_pages(self, raw_pages: Iterable[Page], index: int = 0) -> Iterator[Tuple[int, int, Page]]:
+        """
+        合并过短的页：跳过空页，过短的页与下一页合并（条件见 _can_merge）
+
+        只向后看一页，逐页产出 (合并判断开始的原始页索引, 结束后的原始页索引, 页面)；
+        index 为 raw_pages 第一页的原始页索引
+        """
+        pages = iter(raw_pages)
+        current_page = next(pages, None)
+        while current_page is not None:
+            next_page = next(pages, None)
+            if current_page.is_blank():
+                current_page = next_page
+                index += 1
+            elif next_page is not None and self._can_merge(current_page, next_page):
+                yield index, index + 2, current_page.merged_with(next_page)
+                current_page = next(pages, None)
+                index += 2
+            else:
+                yield index, index + 1, current_page
+                current_page = next_page
+                index += 1
+
+    def _can_merge(self, current_page: Page, next_page: Page) -> bool:
+        """过短的页与下一页合并后不超过最大高度时合并（不合并强制分页的页面）"""
+        # 根据页面尺寸调整合并阈值
+        merge_threshold = 0.3 if self.page_size_name == "small" else 0.35
+        if current_page.height >= self.content_height * merge_threshold:
+            return False
+        if next_page.forced_break or next_page.is_blank():
+            return False
+        return current_page.height + next_page.height <= self.content_height * 0.95  # 留5%余量
 
     def _try_split_paragraph(self, element: PageElement, available_height: int) -> Optional[Tuple[PageElement, PageElement]]:
         """
         尝试分割段落
 
+        在可见文本的累计宽度数组上二分查找前半部分能容纳的最远断行位置，
+        两部分都从原段落 HTML 中截取，保留行内标记
+
         Args:
-            element: 要分割的段落元素
+            element: 要分割的段落元素（或此前拆分出的片段）
             available_height: 当前页剩余高度
 
         Returns:
             分割后的两个元素，如果无法分割则返回None
         """
+        h = self.element_heights
         # 如果剩余空间太小，不分割
-        if available_height < self.element_heights['p_base'] + 2 * self.element_heights['p_line']:
+        if available_height < h['p_base'] + 2 * h['p_line']:
             return None
-
-        text = element.text
-        if not text:
+        if not element.text:
             return None
 
-        # 估算可以放入的字符数
-        chars_per_line = self.content_width // self.char_width
-        min_lines = 2
-        max_lines = max(min_lines, (available_height - self.element_heights['p_base'] - self.element_heights['margin_bottom']) // self.element_heights['p_line'])
-        if max_lines < min_lines:
+        if element._span is not None:
+            html, start, end = element._span
+            source = paragraph_source(html)
+        else:
+            source = paragraph_source(element.content)
+            start, end = source.content_range()
+        if start >= end:
             return None
 
-        max_chars = chars_per_line * max_lines
-        if max_chars <= 0 or max_chars >= len(text):
+        # 前半部分高度 p_base + 行数 * p_line + margin_bottom 不超过剩余高度
+        max_lines = (available_height - h['p_base'] - h['margin_bottom']) // h['p_line']
+        max_width = max_lines * self.content_width
+        text = source.text
+        prefix = self._head_prefix_widths(text, start, end, max_width)
+        split = find_split(text, prefix, start, end, max_width)
+        if split is None:
+            return None
+        cut, resume = split
+        if resume >= end:
             return None
 
-        # 在空白处切分（尽量不拆词）
-        split_index = max_chars
-        # 尝试往前找到一个空格或标点
-        match = re.search(r'[\s，。；；、,.!?)]', text[:max_chars][::-1])
-        if match:
-            split_index = max_chars - match.start()
-
-        part1_text = text[:split_index].rstrip()
-        part2_text = text[split_index:].lstrip()
-
-        # 重新估算高度
-        def para_height(t: str) -> int:
-            if not t:
-                return self.element_heights['p_base'] + self.element_heights['margin_bottom']
-            total_width = 0
-            for ch in t:
-                total_width += self.char_width if ord(ch) > 127 else self.char_width_en
-            lines = max(1, int(total_width / self.content_width) + 1)
-            return self.element_heights['p_base'] + lines * self.element_heights['p_line'] + self.element_heights['margin_bottom']
-
-        part1 = PageElement(
-            type='paragraph',
-            content=f"<p>{part1_text}</p>",
-            text=part1_text,
-            height=para_height(part1_text),
-            can_break=True
+        part1 = PageElement.paragraph_fragment(
+            source, start, cut, self._paragraph_height_for_width(prefix[cut - start])
         )
-        part2 = PageElement(
-            type='paragraph',
-            content=f"<p>{part2_text}</p>",
-            text=part2_text,
-            height=para_height(part2_text),
-            can_break=True
+        part2 = PageElement.paragraph_fragment(
+            source, resume, end, self._paragraph_height_for_width(self.text_meter.width(text[resume:end]))
         )
         return part1, part2
 
+    def _full_last_line(self, element: PageElement) -> bool:
+        """
+        段落末行的剩余宽度是否小于拆分时断行位置可能向前退让的宽度（约一个单词）
+
+        此时拆分后的后半部分可能比剩余行数多一行，optimal 引擎估算拆分时多计一行
+        """
+        remaining = self.content_width - self.text_meter.width(element.text) % self.content_width
+        return remaining < self.SPLIT_BACKOFF_CHARS * self.char_width_en + self.char_width
+
+    def _head_prefix_widths(self, text: str, start: int, end: int, max_width: float) -> list:
+        """
+        text[start:end] 开头部分的累计宽度数组，覆盖到宽度达到 max_width 处（或到 end）
+
+        先按窄字符宽度估计放得下的字符数，不够时加倍，长段落不必计算整段
+        """
+        chunk = int(max_width / max(1, self.char_width_en)) + 16
+        while True:
+            stop = min(end, start + chunk)
+            prefix = self.text_meter.prefix_widths(text[start:stop])
+            if stop >= end or prefix[-1] >= max_width:
+                return prefix
+            chunk *= 2
+
     # ----------------------
     # 高度估算辅助方法
     # ----------------------
-    def _calculate_text_height(self, text: str) -> int:
-        """计算纯文本高度"""
-        if not text:
-            return self.element_heights['p_base'] + self.element_heights['margin_bottom']
+    def _empty_paragraph_height(self) -> int:
+        return self.element_heights['p_base'] + self.element_heights['margin_bottom']
 
-        total_width = 0
-        for ch in text:
-            total_width += self.char_width if ord(ch) > 127 else self.char_width_en
+    def _paragraph_height_for_width(self, total_width: int) -> int:
+        """按文本总宽度计算段落高度（中英文混排）"""
         lines = max(1, int(total_width / self.content_width) + 1)
-
         return self.element_heights['p_base'] + lines * self.element_heights['p_line'] + self.element_heights['margin_bottom']
 
+    def _calculate_text_height(self, text: str) -> int:
+        """计算纯文本高度"""
+        return self._calculate_paragraph_height(text)
+
     def _calculate_paragraph_height(self, text: str) -> int:
         """计算段落高度"""
         if not text:
-            return self.element_heights['p_base'] + self.element_heights['margin_bottom']
-
-        # 更精确的计算（中英文混排）
-        total_width = 0
-        for ch in text:
-            total_width += self.char_width if ord(ch) > 127 else self.char_width_en
-        lines = max(1, int(total_width / self.content_width) + 1)
-
-        return self.element_heights['p_base'] + lines * self.element_heights['p_line'] + self.element_heights['margin_bottom']
+            return self._empty_paragraph_height()
+        return self._paragraph_height_for_width(self.text_meter.width(text))
 
     def _calculate_blockquote_height(self, text: str) -> int:
         """计算引用块高度"""
@@ -357,371 +874,123 @@ class SmartPaginator:
 
         return self.element_heights['blockquote'] + lines * self.element_heights['blockquote_line'] + self.element_heights['margin_bottom']
 
+    def _calculate_images_height(self, block: MarkdownBlock) -> int:
+        """计算块内全部图片的渲染高度"""
+        sizes = block.image_sizes[:block.image_count]
+        height = sum(self._calculate_image_height(width, img_height) for width, img_height in sizes)
+        return height + (block.image_count - len(sizes)) * self.DEFAULT_IMAGE_HEIGHT
+
+    def _calculate_image_height(self, width: int, height: int) -> int:
+        """
+        按原始尺寸计算单张图片的渲染高度
+
+        等比缩放：宽度不超过内容宽度的 90%，高度不超过视口（页面）高度的 50%，不放大
+        """
+        if width <= 0 or height <= 0:
+            return self.DEFAULT_IMAGE_HEIGHT
+        scale = min(
+            1.0,
+            self.content_width * self.IMAGE_MAX_WIDTH_RATIO / width,
+            self.page_height * self.IMAGE_MAX_HEIGHT_RATIO / height
+        )
+        return int(round(height * scale))
+
     def parse_html_to_elements(self, html: str) -> List[PageElement]:
         """
         将HTML解析为页面元素列表
         """
-        if not html or not html.strip():
-            return []
+        return self.elements_from_blocks(html_to_blocks(html))
+
+    def elements_from_blocks(self, blocks: List[MarkdownBlock]) -> List[PageElement]:
+        """
+        将 MarkdownProcessor 输出的结构化块转换为页面元素列表（无需重新解析HTML）
+        """
+        return [self._element_from_block(block) for block in blocks]
 
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(html, 'html.parser')
+    def _element_from_block(self, block: MarkdownBlock) -> PageElement:
+        """根据块类型和统计信息估算高度"""
+        h = self.element_heights
+        block_type = block.type
+        text = block.text
+        can_break = True
 
-        # 收集所有元素
-        elements = []
+        if block_type == 'pagebreak':
+            height = h['hr']
+            can_break = False
 
-        # 如果soup本身就是一个标签，处理它
-        if isinstance(soup, Tag):
-            nodes = list(soup.children)
-        else:
-            nodes = list(soup.children)
+        elif block_type == 'heading':
+            height = h[f'h{block.level}'] + h['margin_bottom']
+            can_break = False
 
-        # 遍历顶层节点
-        for node in nodes:
-            if isinstance(node, Comment):
-                continue
-            if isinstance(node, NavigableString):
-                text = str(node).strip()
-                if text:
-                    height = self._calculate_text_height(text)
-                    elements.append(PageElement(
-                        type='text',
-                        content=str(node),
-                        text=text,
-                        height=height,
-                        can_break=True
-                    ))
-                continue
-            if not isinstance(node, Tag):
-                continue
+        elif block_type == 'paragraph':
+            # 空段落给最小基础高度，避免被完全忽略
+            height = self._calculate_paragraph_height(text) if text else h['p_base']
 
-            # 处理分页标记
-            if self._is_pagebreak_marker(node):
-                elements.append(PageElement(
-                    type='pagebreak',
-                    content=str(node),
-                    text='',
-                    height=self.element_heights['hr'],
-                    can_break=False
-                ))
-                continue
+        elif block_type == 'paragraph_with_images':
+            # 图文段落 / 纯图片段落
+            text_height = self._calculate_paragraph_height(text) if text else h['margin_bottom']
+            height = text_height + self._calculate_images_height(block)
+            can_break = False
 
-            # 分发处理
-            child_elements = self._process_node(node)
-            elements.extend(child_elements)
+        elif block_type == 'image':
+            height = self._calculate_images_height(block) + h['margin_bottom']
+            can_break = False
 
-        return elements
+        elif block_type == 'list':
+            height = block.list_items * h['li'] + self._calculate_images_height(block) + h['margin_bottom']
 
-    def _process_node(self, node) -> List[PageElement]:
-        """递归处理节点"""
-        elements = []
+        elif block_type == 'code':
+            height = h['code_block'] + block.code_lines * h['code_line'] + h['margin_bottom']
+            can_break = block.code_lines > 10
 
-        if isinstance(node, NavigableString):
-            text = str(node).strip()
+        elif block_type == 'blockquote':
             if text:
-                height = self._calculate_text_height(text)
-                elements.append(PageElement(
-                    type='text',
-                    content=text,
-                    text=text,
-                    height=height,
-                    can_break=True
-                ))
-            return elements
-
-        if not isinstance(node, Tag):
-            return elements
-
-        # 强制分页标记
-        if self._is_pagebreak_marker(node):
-            elements.append(PageElement(
-                type='pagebreak',
-                content=str(node),
-                text='',
-                height=self.element_heights['hr'],
-                can_break=False
-            ))
-            return elements
-
-        tag_name = node.name.lower()
-
-        # 先检查内部是否有分页标记
-        has_pagebreak = any(self._is_pagebreak_marker(child) for child in node.find_all() if isinstance(child, Tag))
-
-        if has_pagebreak:
-            # 递归处理包含分页标记的段落
-            for child in node.children:
-                elements.extend(self._process_node(child))
-        else:
-            # 处理具体的元素类型
-            if tag_name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                # 标题
-                text = node.get_text(strip=True)
-                if text:
-                    level = int(tag_name[1])
-                    height = self.element_heights[tag_name] + self.element_heights['margin_bottom']
-                    elements.append(PageElement(
-                        type='heading',
-                        content=str(node),
-                        text=text,
-                        level=level,
-                        height=height,
-                        can_break=False
-                    ))
-
-            elif tag_name == 'p':
-                # 普通段落
-                text = node.get_text(strip=True)
-                imgs = node.find_all('img')
-                if text:
-                    if imgs:
-                        # 包含图片的段落（图文）
-                        text_height = self._calculate_paragraph_height(text)
-                        img_height = len(imgs) * 300
-                        total_height = text_height + img_height
-                        elements.append(PageElement(
-                            type='paragraph_with_images',
-                            content=str(node),
-                            text=text,
-                            height=total_height,
-                            can_break=False
-                        ))
-                    else:
-                        # 纯文本段落
-                        height = self._calculate_paragraph_height(text)
-                        elements.append(PageElement(
-                            type='paragraph',
-                            content=str(node),
-                            text=text,
-                            height=height,
-                            can_break=True
-                        ))
-                else:
-                    # 没有文本内容
-                    if imgs:
-                        # 纯图片段落（如 <p><img/></p>）
-                        total_height = len(imgs) * 300 + self.element_heights['margin_bottom']
-                        elements.append(PageElement(
-                            type='paragraph_with_images',
-                            content=str(node),
-                            text='',
-                            height=total_height,
-                            can_break=False
-                        ))
-                    else:
-                        # 空段落，给最小基础高度，避免被完全忽略
-                        height = self.element_heights['p_base']
-                        elements.append(PageElement(
-                            type='paragraph',
-                            content=str(node),
-                            text='',
-                            height=height,
-                            can_break=True
-                        ))
-
-            elif tag_name == 'img':
-                # 图片
-                alt = node.get('alt', '图片')
-                elements.append(PageElement(
-                    type='image',
-                    content=str(node),
-                    text=alt,
-                    height=300 + self.element_heights['margin_bottom'],
-                    can_break=False
-                ))
-
-            elif tag_name in ['ul', 'ol']:
-                # 列表
-                items = node.find_all('li', recursive=False)
-                imgs = node.find_all('img')
-                list_height = len(items) * self.element_heights['li']
-                img_height = len(imgs) * 300
-                total_height = list_height + img_height + self.element_heights['margin_bottom']
-                elements.append(PageElement(
-                    type='list',
-                    content=str(node),
-                    text=node.get_text(strip=True),
-                    height=total_height,
-                    can_break=True
-                ))
-
-            elif tag_name == 'pre':
-                # 代码块
-                code_elem = node.find('code')
-                code_text = code_elem.get_text() if code_elem else node.get_text()
-                lines = max(1, len(code_text.splitlines()))
-                height = (self.element_heights['code_block'] +
-                          lines * self.element_heights['code_line'] +
-                          self.element_heights['margin_bottom'])
-                elements.append(PageElement(
-                    type='code',
-                    content=str(node),
-                    text=code_text,
-                    height=height,
-                    can_break=lines > 10
-                ))
-
-            elif tag_name == 'blockquote':
-                # 引用块
-                text = node.get_text(strip=True)
-                imgs = node.find_all('img')
-                if text:
-                    text_height = self._calculate_blockquote_height(text)
-                    img_height = len(imgs) * 300
-                    total_height = text_height + img_height
-                    elements.append(PageElement(
-                        type='blockquote',
-                        content=str(node),
-                        text=text,
-                        height=total_height,
-                        can_break=True
-                    ))
-                else:
-                    if imgs:
-                        total_height = len(imgs) * 300 + self.element_heights['margin_bottom']
-                        elements.append(PageElement(
-                            type='blockquote',
-                            content=str(node),
-                            text='',
-                            height=total_height,
-                            can_break=False
-                        ))
-                    else:
-                        # 空引用块，给基础高度
-                        height = self.element_heights['blockquote'] + self.element_heights['margin_bottom']
-                        elements.append(PageElement(
-                            type='blockquote',
-                            content=str(node),
-                            text='',
-                            height=height,
-                            can_break=True
-                        ))
-
-            elif tag_name == 'table':
-                # 表格
-                rows = node.find_all('tr')
-                if rows:
-                    headers = node.find_all('th')
-                    text = node.get_text(strip=True)
-
-                    height = (len(headers) * self.element_heights['table_header'] +
-                              (len(rows) - len(headers)) * self.element_heights['table_row'] +
-                              self.element_heights['margin_bottom'])
-
-                    elements.append(PageElement(
-                        type='table',
-                        content=str(node),
-                        text=text,
-                        height=height,
-                        can_break=True
-                    ))
-                else:
-                    elements.append(PageElement(
-                        type='table',
-                        content=str(node),
-                        text='',
-                        height=self.element_heights['table_row'] + self.element_heights['margin_bottom'],
-                        can_break=True
-                    ))
-
-            elif tag_name == 'hr':
-                # 分隔线
-                elements.append(PageElement(
-                    type='hr',
-                    content=str(node),
-                    text='',
-                    height=self.element_heights['hr'],
-                    can_break=False
-                ))
-
-            elif tag_name in ['div', 'section', 'article', 'main']:
-                # 容器：递归处理子元素
-                for child in node.children:
-                    child_elements = self._process_node(child)
-                    elements.extend(child_elements)
-
+                height = self._calculate_blockquote_height(text) + self._calculate_images_height(block)
+            elif block.image_count:
+                height = self._calculate_images_height(block) + h['margin_bottom']
+                can_break = False
             else:
-                # 其他元素
-                text = node.get_text(strip=True)
-                if text:
-                    # 如果包含子标签，递归处理子节点
-                    if node.find_all():
-                        for child in node.children:
-                            child_elements = self._process_node(child)
-                            elements.extend(child_elements)
-                    else:
-                        # 纯文本内容
-                        elements.append(PageElement(
-                            type='unknown',
-                            content=str(node),
-                            text=text,
-                            height=self._calculate_text_height(text),
-                            can_break=True
-                        ))
-
-        return elements
-
-    def _is_pagebreak_marker(self, element: Tag) -> bool:
-        """
-        检查元素是否是分页标记
-        """
-        if not isinstance(element, Tag):
-            return False
-
-        # 1) class 名称中包含 pagebreak-marker
-        classes = element.get('class', [])
-        if isinstance(classes, list):
-            if 'pagebreak-marker' in classes:
-                return True
+                # 空引用块，给基础高度
+                height = h['blockquote'] + h['margin_bottom']
+
+        elif block_type == 'table':
+            if block.table_rows:
+                height = (block.table_headers * h['table_header'] +
+                          (block.table_rows - block.table_headers) * h['table_row'] +
+                          h['margin_bottom'])
+            else:
+                height = h['table_row'] + h['margin_bottom']
 
-        # 2) data 属性标记
-        if element.get('data-pagebreak') == 'true':
-            return True
+        elif block_type == 'hr':
+            height = h['hr']
+            can_break = False
 
-        return False
+        else:
+            # 纯文本及其他元素
+            height = self._calculate_text_height(text)
+
+        # 实测模式：优先使用浏览器排版得到的高度
+        if self.measured_heights:
+            height = self.measured_heights.get(block.html, height)
+
+        return PageElement(
+            type=block_type,
+            content=block.html,
+            text=text,
+            level=block.level,
+            height=height,
+            can_break=can_break
+        )
 
-    def optimize_pages(self, pages: List[str]) -> List[str]:
+    def optimize_pages(self, pages: List[Page]) -> List[Page]:
         """
         优化分页结果，合并过短的页面
+
+        直接使用每页记录的高度，只需遍历一遍页面（paginate 的结果已经过优化）
         """
         if len(pages) <= 1:
             return pages
-
-        optimized = []
-        i = 0
-
-        # 根据页面尺寸调整合并阈值
-        merge_threshold = 0.3 if self.page_size_name == "small" else 0.35
-
-        while i < len(pages):
-            current_page = pages[i]
-            if not current_page or not current_page.strip():
-                i += 1
-                continue
-
-            # 估算当前页面高度
-            current_elements = self.parse_html_to_elements(current_page)
-            current_height = sum(e.height for e in current_elements)
-
-            # 如果页面过短，尝试与下一页合并
-            if current_height < self.content_height * merge_threshold and i < len(pages) - 1:
-                next_page_index = i + 1
-                # 不合并强制分页的页面
-                if next_page_index not in self.forced_break_pages:
-                    next_page = pages[next_page_index]
-                    if next_page and next_page.strip():
-                        next_elements = self.parse_html_to_elements(next_page)
-                        next_height = sum(e.height for e in next_elements)
-
-                        # 如果合并后不超过最大高度，则合并
-                        if current_height + next_height <= self.content_height * 0.95:  # 留5%余量
-                            optimized.append(current_page + '\n' + next_page)
-                            i += 2
-                            continue
-
-            optimized.append(current_page)
-            i += 1
-
+        optimized = [page for _, _, page in self._iter_merged_pages(pages)]
         return optimized if optimized else pages
 
     def debug_pagination(self, html_content: str) -> List[dict]:
@@ -732,8 +1001,8 @@ class SmartPaginator:
         pages_info = []
 
         for i, page in enumerate(pages, start=1):
-            page_elements = self.parse_html_to_elements(page)
-            total_height = sum(e.height for e in page_elements)
+            page_elements = [e for e in page.elements if e.type != 'pagebreak']
+            total_height = page.height
 
             pages_info.append({
                 'page_index': i,
@@ -741,7 +1010,7 @@ class SmartPaginator:
                 'total_height': total_height,
                 'max_height': self.content_height,
                 'fill_rate': f"{(total_height / self.content_height * 100):.1f}%",
-                'is_forced_break': (i-1) in self.forced_break_pages,
+                'is_forced_break': page.forced_break,
                 'elements': [
                     {
                         'type': e.type,
@@ -752,4 +1021,4 @@ class SmartPaginator:
                 ]
             })
 
-        return pages_info
\ No newline at end of file
+        return pages_info
@@ -0,0 +1,189 @@
+# ============================================
+# src/utils/paragraph_split.py - 段落拆分：断行位置索引与保留行内标记的片段
+# ============================================
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from html import unescape
+from typing import List, Optional, Sequence, Tuple
+
+# 中日韩文字及全角符号：相邻字符之间通常可以断行
+_CJK = (r'⺀-〾ぁ-㏿㐀-䶿一-鿿ꥠ-꥿가-힯'
+        r'豈-﫿︰-﹏＀-￯\U00020000-\U0003ffff')
+# 避头字符：不能出现在行首（闭合括号、句读点、小写假名、长音符等）
+NO_LINE_START = ('!%),.:;?]}¢°·’”‰′″℃…‥、。〃〆〉》」』】〕〗〙〛〜〞〟'
+                 'ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ゛゜ゝゞーヽヾ々〻'
+                 '！＂％＇），．：；？］｝～｠｡｣､･ｰ')
+# 避尾字符：不能出现在行尾（开括号、引号、货币符号）
+NO_LINE_END = '([{£¥$‘“〈《「『【〔〖〘〚〝（［｛｟｢￡￥＄'
+
+_NS = re.escape(NO_LINE_START)
+_OP = re.escape(NO_LINE_END)
+# 断行位置 i 表示可以在 text[i] 之前换行：
+# 1) 空白之后（拉丁文按空格断行）；2) 中日韩字符之后；3) 中日韩字符之前。均遵守避头尾规则
+_BREAK_RE = re.compile(
+    rf'(?<=\s)(?=[^\s{_NS}])'
+    rf'|(?<=[{_CJK}])(?<![{_OP}])(?=[^\s{_NS}])'
+    rf'|(?<=[^\s{_OP}])(?=[{_CJK}])(?![{_NS}])'
+)
+
+_TOKEN_RE = re.compile(r'<[^>]*>|[^<]+')
+_PLAIN_PARAGRAPH_RE = re.compile(r'(<p(?:\s[^>]*)?>)([^<&]*)</p>', re.IGNORECASE)
+_TAG_NAME_RE = re.compile(r'<\s*(/?)\s*([A-Za-z][\w:-]*)')
+_ENTITY_RE = re.compile(r'&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);?|.', re.DOTALL)
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                        'param', 'source', 'track', 'wbr'))
+
+
+def line_break_opportunities(text: str) -> List[int]:
+    """
+    可断行位置的索引（升序）：位置 i 表示可以在 text[i] 之前换行
+
+    规则是 Unicode 断行算法的简化版：拉丁文只在空白处断行，中日韩文字之间
+    以及与其他文字相邻处均可断行，避头字符不出现在行首、避尾字符不出现在行尾
+    """
+    return [match.start() for match in _BREAK_RE.finditer(text)]
+
+
+def is_break_opportunity(text: str, index: int) -> bool:
+    """能否在 text[index] 之前换行（规则同 line_break_opportunities）"""
+    return _BREAK_RE.match(text, index) is not None
+
+
+class _TextRun:
+    """HTML 中的一段文本节点"""
+    __slots__ = ('text_start', 'html_start', 'raw', 'decoded', 'stack')
+
+    def __init__(self, text_start: int, html_start: int, raw: str, decoded: str, stack: tuple):
+        self.text_start = text_start  # 在可见文本中的起始位置
+        self.html_start = html_start  # 在 HTML 中的起始位置
+        self.raw = raw  # 原始 HTML 文本（可能含字符实体）
+        self.decoded = decoded  # 解码后的可见文本
+        self.stack = stack  # 此处打开的标签：((标签名, 开始标签), ...)
+
+    def html_offset(self, offset: int) -> int:
+        """可见文本内的偏移量 -> HTML 中的位置（不切开字符实体）"""
+        if self.raw is self.decoded:
+            return self.html_start + offset
+        position = 0
+        for match in _ENTITY_RE.finditer(self.raw):
+            if position >= offset:
+                return self.html_start + match.start()
+            position += len(unescape(match.group()))
+        return self.html_start + len(self.raw)
+
+
+class ParagraphSource:
+    """
+    可拆分段落的可见文本、断行位置，以及可见文本位置与 HTML 位置的对应关系
+
+    拆分出的片段按 [start, end) 可见文本范围从原段落 HTML 中截取，
+    在片段开头重新打开截断处仍未闭合的标签（包括段落本身的 <p ...>），
+    结尾补全闭合标签，因此加粗、链接、行内代码等标记和段落属性都得以保留
+    """
+    __slots__ = ('html', 'text', '_runs', '_run_starts')
+
+    def __init__(self, html: str):
+        self.html = html
+        plain = _PLAIN_PARAGRAPH_RE.fullmatch(html)
+        if plain is not None:
+            # 常见情况：段落内没有行内标记和字符实体，整段只有一个文本节点
+            text = plain.group(2)
+            tag = plain.group(1)
+            self._runs = [_TextRun(0, len(tag), text, text, (('p', tag),))]
+            self._run_starts = [0]
+            self.text = text
+            return
+
+        runs = []
+        stack = []
+        text_length = 0
+        for match in _TOKEN_RE.finditer(html):
+            token = match.group()
+            if token[0] == '<':
+                tag = _TAG_NAME_RE.match(token)
+                if tag is None:
+                    continue  # 注释、声明等
+                closing, name = tag.group(1), tag.group(2).lower()
+                if closing:
+                    # 容错：弹出到同名标签为止
+                    for k in range(len(stack) - 1, -1, -1):
+                        if stack[k][0] == name:
+                            del stack[k:]
+                            break
+                elif name not in _VOID_TAGS and not token.endswith('/>'):
+                    stack.append((name, token))
+                continue
+            decoded = unescape(token) if '&' in token else token
+            runs.append(_TextRun(text_length, match.start(), token, decoded, tuple(stack)))
+            text_length += len(decoded)
+
+        self._runs = runs
+        self._run_starts = [run.text_start for run in runs]
+        self.text = ''.join(run.decoded for run in runs)
+
+    def content_range(self) -> Tuple[int, int]:
+        """去掉首尾空白后的可见文本范围"""
+        text = self.text
+        start, end = 0, len(text)
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    def fragment_html(self, start: int, end: int) -> str:
+        """可见文本 [start, end) 对应的 HTML 片段（标签配对完整）"""
+        runs = self._runs
+        first = runs[max(0, bisect_right(self._run_starts, start) - 1)]
+        last = runs[max(0, bisect_left(self._run_starts, end) - 1)]
+        html_start = first.html_offset(start - first.text_start)
+        html_end = last.html_offset(end - last.text_start)
+        opening = ''.join(token for _, token in first.stack)
+        closing = ''.join(f'</{name}>' for name, _ in reversed(last.stack))
+        return opening + self.html[html_start:html_end] + closing
+
+
+@lru_cache(maxsize=256)
+def paragraph_source(html: str) -> ParagraphSource:
+    """按段落 HTML 缓存解析结果（与字体无关，不同尺寸/字号的分页共用）"""
+    return ParagraphSource(html)
+
+
+def find_split(text: str, prefix: Sequence[float], start: int, end: int,
+               max_width: float) -> Optional[Tuple[int, int]]:
+    """
+    在 text[start:end] 中找出最靠后的拆分位置，使前半部分宽度小于 max_width
+
+    prefix 为从 start 开始的累计宽度数组（prefix[i] 为 text[start:start + i] 的宽度），
+    只需覆盖到宽度达到 max_width 处。先在累计宽度上二分查找放得下的最远字符，
+    再从该处向前找最近的断行位置（通常只需检查几个字符）；
+    没有任何断行位置放得下时（超长单词、网址）退回按字符拆分
+
+    Returns:
+        (前半部分结束位置, 后半部分起始位置)；无需或无法拆分时返回 None
+    """
+    if prefix[-1] < max_width:
+        return None  # 整段放得下
+
+    # 前 fit 个字符放得下；其后的空白放在行尾不占宽度
+    fit = start + bisect_left(prefix, max_width, 1) - 1
+    if fit <= start:
+        return None
+    position = fit
+    while position < end and text[position].isspace():
+        position += 1
+
+    for index in range(min(position, end - 1), start, -1):
+        if is_break_opportunity(text, index):
+            cut = index
+            while cut > start and text[cut - 1].isspace():
+                cut -= 1
+            if cut > start:
+                return cut, index
+
+    # 按字符拆分
+    resume = fit
+    while resume < end and text[resume].isspace():
+        resume += 1
+    return fit, resume
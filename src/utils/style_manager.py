@@ -1,13 +1,23 @@
 # ============================================
 # src/utils/style_manager.py
 # ============================================
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Mapping, Tuple
 from dataclasses import dataclass
+from types import MappingProxyType
 import colorsys
+from src.utils.template import CompiledTemplate
 
-@dataclass
+# 深色主题（影响强调文字、引用和代码块的配色）
+DARK_THEMES = ("dark_mode", "midnight", "douyin")
+# 主题 CSS 和页面 CSS 用到的透明度，各基础颜色的 rgba 字符串按这些值预先生成
+ALPHA_LEVELS = (0.03, 0.05, 0.08, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6)
+# 主题 CSS 模板中每次生成时才代入的部分
+_FONT_FAMILY_SLOT = '{{font_family}}'
+_FONT_SIZE_SLOT = '{{font_size}}'
+
+@dataclass(frozen=True)
 class ThemeConfig:
-    """主题配置"""
+    """主题配置（不可变，可作为编译结果的缓存键）"""
     name: str
     primary_color: str
     secondary_color: str
@@ -18,7 +28,27 @@ class ThemeConfig:
     code_font: str
     accent_color: str = ""  # 强调色
     link_color: str = ""    # 链接色
-    
+
+
+@dataclass(frozen=True)
+class ThemeTokens:
+    """
+    主题编译后的不可变取值表：基础颜色、派生颜色，以及各基础颜色在 ALPHA_LEVELS 下的 rgba 字符串
+
+    每个主题只计算一次，生成 CSS、切换主题和导出时直接查表
+    """
+    theme: ThemeConfig
+    is_dark: bool
+    colors: Mapping[str, str]  # 颜色名 -> 十六进制颜色
+    alphas: Mapping[Tuple[str, float], str]  # (基础颜色名, 透明度) -> rgba(...)
+
+    def rgba(self, color: str, alpha: float) -> str:
+        return self.alphas[(color, alpha)]
+
+
+# (主题配置, 是否深色) -> (取值表, 只剩字体和字号占位符的主题 CSS 模板)
+_compiled_themes: Dict[Tuple[ThemeConfig, bool], Tuple[ThemeTokens, CompiledTemplate]] = {}
+
 class StyleManager:
     """样式管理器 - 扩展版"""
     
@@ -253,20 +283,61 @@ class StyleManager:
         r, g, b = self.hex_to_rgb(hex_color)
         return f"rgba({r}, {g}, {b}, {alpha})"
     
+    def theme_tokens(self, theme_name: str = None) -> ThemeTokens:
+        """主题的取值表（每个主题只编译一次）"""
+        return self._compile_theme(theme_name)[0]
+    
+    def _compile_theme(self, theme_name: str = None) -> Tuple[ThemeTokens, CompiledTemplate]:
+        # 与 get_theme 相同：未指定时为当前主题，未知主题按 xiaohongshu 处理
+        if theme_name is None:
+            theme_name = self.current_theme
+        if theme_name not in self.THEMES:
+            theme_name = "xiaohongshu"
+        theme = self.THEMES[theme_name]
+        is_dark = theme_name in DARK_THEMES
+        key = (theme, is_dark)
+        compiled = _compiled_themes.get(key)
+        if compiled is None:
+            tokens = self._build_tokens(theme, is_dark)
+            compiled = _compiled_themes.setdefault(key, (tokens, CompiledTemplate(self._theme_css_source(tokens))))
+        return compiled
+    
+    def _build_tokens(self, theme: ThemeConfig, is_dark: bool) -> ThemeTokens:
+        """计算主题的全部派生颜色"""
+        colors = {
+            'primary': theme.primary_color,
+            'secondary': theme.secondary_color,
+            'text': theme.text_color,
+            'accent': theme.accent_color or theme.secondary_color,
+            'link': theme.link_color or theme.primary_color,
+            'black': '#000000',
+        }
+        alphas = {(name, alpha): self.add_alpha(color, alpha)
+                  for name, color in colors.items() for alpha in ALPHA_LEVELS}
+        colors.update(
+            primary_light=self.lighten_color(theme.primary_color, 0.9),
+            primary_dark=self.darken_color(theme.primary_color, 0.2),
+            secondary_light=self.lighten_color(theme.secondary_color, 0.9),
+            # 强调文字和引用正文：浅色主题加深，深色主题提亮
+            emphasis=(self.darken_color(theme.text_color, 0.2) if not is_dark
+                      else self.lighten_color(theme.text_color, 0.2)),
+            quote_text=(self.darken_color(theme.text_color, 0.1) if not is_dark
+                        else self.lighten_color(theme.text_color, 0.1)),
+        )
+        return ThemeTokens(theme, is_dark, MappingProxyType(colors), MappingProxyType(alphas))
+    
     def generate_css(self, theme_name: str = None, font_size: int = 18, font_family: str = None) -> str:
-        """生成主题CSS"""
-        theme = self.get_theme(theme_name)
-        
-        # 使用传入的字体或主题默认字体
-        current_font_family = font_family if font_family else theme.font_family
-        
-        # 生成派生颜色
-        primary_light = self.lighten_color(theme.primary_color, 0.9)
-        primary_dark = self.darken_color(theme.primary_color, 0.2)
-        secondary_light = self.lighten_color(theme.secondary_color, 0.9)
-        
-        # 检查是否为深色主题
-        is_dark = theme_name in ["dark_mode", "midnight", "douyin"]
+        """生成主题CSS（主题部分已编译，只代入字体和字号）"""
+        tokens, css = self._compile_theme(theme_name)
+        return css.render({
+            # 使用传入的字体或主题默认字体
+            'font_family': font_family if font_family else tokens.theme.font_family,
+            'font_size': str(font_size),
+        })
+    
+    def _theme_css_source(self, t: ThemeTokens) -> str:
+        """主题 CSS 模板：颜色已代入，字体和字号为占位符"""
+        theme = t.theme
         
         # 基础 CSS 部分
         base_css = f"""
@@ -274,16 +345,16 @@ class StyleManager:
         :root {{
             --primary-color: {theme.primary_color};
             --secondary-color: {theme.secondary_color};
-            --accent-color: {theme.accent_color or theme.secondary_color};
+            --accent-color: {t.colors['accent']};
             --text-color: {theme.text_color};
-            --link-color: {theme.link_color or theme.primary_color};
-            --font-family: {current_font_family};
+            --link-color: {t.colors['link']};
+            --font-family: {_FONT_FAMILY_SLOT};
             --heading-font: {theme.heading_font};
             --code-font: {theme.code_font};
-            --primary-light: {primary_light};
-            --primary-dark: {primary_dark};
-            --secondary-light: {secondary_light};
-            --base-font-size: {font_size}px;
+            --primary-light: {t.colors['primary_light']};
+            --primary-dark: {t.colors['primary_dark']};
+            --secondary-light: {t.colors['secondary_light']};
+            --base-font-size: {_FONT_SIZE_SLOT}px;
         }}
         
         * {{
@@ -304,28 +375,28 @@ class StyleManager:
         """
         
         # 标题 CSS
-        headings_css = self._generate_headings_css(theme, is_dark)
+        headings_css = self._generate_headings_css(t)
         
         # 段落和文本 CSS
-        text_css = self._generate_text_css(theme, is_dark)
+        text_css = self._generate_text_css(t)
         
         # 列表 CSS
-        lists_css = self._generate_lists_css(theme)
+        lists_css = self._generate_lists_css(t)
         
         # 引用 CSS
-        blockquote_css = self._generate_blockquote_css(theme, is_dark)
+        blockquote_css = self._generate_blockquote_css(t)
         
         # 代码 CSS
-        code_css = self._generate_code_css(theme, is_dark)
+        code_css = self._generate_code_css(t)
         
         # 表格 CSS
-        table_css = self._generate_table_css(theme, is_dark)
+        table_css = self._generate_table_css(t)
         
         # 分隔线 CSS
-        hr_css = self._generate_hr_css(theme)
+        hr_css = self._generate_hr_css(t)
         
         # 链接 CSS
-        link_css = self._generate_link_css(theme)
+        link_css = self._generate_link_css(t)
         
         # 动画 CSS
         animation_css = self._generate_animation_css()
@@ -336,7 +407,7 @@ class StyleManager:
         
         return full_css
     
-    def _generate_headings_css(self, theme: ThemeConfig, is_dark: bool) -> str:
+    def _generate_headings_css(self, t: ThemeTokens) -> str:
         """生成标题样式"""
         return f"""
         /* 标题样式 */
@@ -351,7 +422,7 @@ class StyleManager:
             font-size: calc(var(--base-font-size) + 16px);
             margin-bottom: 28px;
             padding-bottom: 16px;
-            border-bottom: 3px solid {self.add_alpha(theme.primary_color, 0.2)};
+            border-bottom: 3px solid {t.rgba('primary', 0.2)};
             background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
@@ -375,7 +446,7 @@ class StyleManager:
         }}
         """
     
-    def _generate_text_css(self, theme: ThemeConfig, is_dark: bool) -> str:
+    def _generate_text_css(self, t: ThemeTokens) -> str:
         """生成段落和强调文本样式"""
         return f"""
         /* 段落样式 */
@@ -391,18 +462,18 @@ class StyleManager:
         strong {{
             color: var(--primary-color);
             font-weight: 600;
-            background: linear-gradient(180deg, transparent 70%, {self.add_alpha(theme.primary_color, 0.2)} 70%);
+            background: linear-gradient(180deg, transparent 70%, {t.rgba('primary', 0.2)} 70%);
             padding: 0 4px;
             border-radius: 2px;
         }}
         
         em {{
             font-style: italic;
-            color: {self.darken_color(theme.text_color, 0.2) if not is_dark else self.lighten_color(theme.text_color, 0.2)};
+            color: {t.colors['emphasis']};
         }}
         """
     
-    def _generate_lists_css(self, theme: ThemeConfig) -> str:
+    def _generate_lists_css(self, t: ThemeTokens) -> str:
         """生成列表样式"""
         return f"""
         /* 列表样式 */
@@ -430,7 +501,7 @@ class StyleManager:
         }}
         """
     
-    def _generate_blockquote_css(self, theme: ThemeConfig, is_dark: bool) -> str:
+    def _generate_blockquote_css(self, t: ThemeTokens) -> str:
         """生成引用样式"""
         return f"""
         /* 引用样式 */
@@ -438,10 +509,10 @@ class StyleManager:
             border-left: 4px solid var(--primary-color);
             margin: 28px 0;
             padding: 20px 28px;
-            background: {self.add_alpha(theme.primary_color, 0.05) if not is_dark else self.add_alpha(theme.primary_color, 0.1)};
+            background: {t.rgba('primary', 0.05) if not t.is_dark else t.rgba('primary', 0.1)};
             border-radius: 10px;
             position: relative;
-            box-shadow: 0 4px 15px {self.add_alpha(theme.primary_color, 0.1)};
+            box-shadow: 0 4px 15px {t.rgba('primary', 0.1)};
         }}
         
         blockquote::before {{
@@ -450,45 +521,45 @@ class StyleManager:
             top: -10px;
             left: 24px;
             font-size: 48px;
-            color: {self.add_alpha(theme.primary_color, 0.3)};
+            color: {t.rgba('primary', 0.3)};
             font-family: Georgia, serif;
             font-weight: bold;
         }}
         
         blockquote p {{
-            color: {self.darken_color(theme.text_color, 0.1) if not is_dark else self.lighten_color(theme.text_color, 0.1)};
+            color: {t.colors['quote_text']};
             font-style: italic;
             margin-bottom: 0;
             font-size: calc(var(--base-font-size) - 1px);
         }}
         """
     
-    def _generate_code_css(self, theme: ThemeConfig, is_dark: bool) -> str:
+    def _generate_code_css(self, t: ThemeTokens) -> str:
         """生成代码样式"""
         return f"""
         /* 行内代码 */
         code {{
-            background: {self.add_alpha(theme.primary_color, 0.1)};
+            background: {t.rgba('primary', 0.1)};
             padding: 4px 10px;
             border-radius: 6px;
             font-family: var(--code-font);
             font-size: calc(var(--base-font-size) - 2px);
-            color: {theme.primary_color if not is_dark else theme.accent_color};
+            color: {t.colors['primary'] if not t.is_dark else t.theme.accent_color};
             font-weight: 500;
-            border: 1px solid {self.add_alpha(theme.primary_color, 0.2)};
+            border: 1px solid {t.rgba('primary', 0.2)};
         }}
         
         /* 代码块 */
         pre {{
-            background: {('#1e1e1e' if is_dark else '#0a0a0f')};
+            background: {('#1e1e1e' if t.is_dark else '#0a0a0f')};
             color: #d4d4d4;
             padding: 26px;
             border-radius: 12px;
             overflow-x: auto;
             margin: 28px 0;
-            box-shadow: 0 8px 24px {self.add_alpha('#000000', 0.15)};
+            box-shadow: 0 8px 24px {t.rgba('black', 0.15)};
             position: relative;
-            border: 1px solid {self.add_alpha(theme.primary_color, 0.2)};
+            border: 1px solid {t.rgba('primary', 0.2)};
         }}
         
         pre::before {{
@@ -497,7 +568,7 @@ class StyleManager:
             top: 12px;
             right: 16px;
             font-size: 11px;
-            color: {self.add_alpha(theme.text_color, 0.5)};
+            color: {t.rgba('text', 0.5)};
             font-weight: 600;
             letter-spacing: 1px;
             font-family: var(--font-family);
@@ -513,7 +584,7 @@ class StyleManager:
         }}
         """
     
-    def _generate_table_css(self, theme: ThemeConfig, is_dark: bool) -> str:
+    def _generate_table_css(self, t: ThemeTokens) -> str:
         """生成表格样式"""
         return f"""
         /* 表格样式 */
@@ -522,7 +593,7 @@ class StyleManager:
             border-collapse: collapse;
             margin: 28px 0;
             font-size: calc(var(--base-font-size) - 1px);
-            box-shadow: 0 4px 15px {self.add_alpha(theme.primary_color, 0.08)};
+            box-shadow: 0 4px 15px {t.rgba('primary', 0.08)};
             border-radius: 10px;
             overflow: hidden;
         }}
@@ -539,16 +610,16 @@ class StyleManager:
         
         td {{
             padding: 15px 20px;
-            border-bottom: 1px solid {self.add_alpha(theme.text_color, 0.1)};
+            border-bottom: 1px solid {t.rgba('text', 0.1)};
             color: var(--text-color);
         }}
         
         tr:nth-child(even) {{
-            background: {self.add_alpha(theme.primary_color, 0.03)};
+            background: {t.rgba('primary', 0.03)};
         }}
         
         tr:hover {{
-            background: {self.add_alpha(theme.primary_color, 0.08)};
+            background: {t.rgba('primary', 0.08)};
             transition: background 0.3s ease;
         }}
         
@@ -557,7 +628,7 @@ class StyleManager:
         }}
         """
     
-    def _generate_hr_css(self, theme: ThemeConfig) -> str:
+    def _generate_hr_css(self, t: ThemeTokens) -> str:
         """生成分隔线样式"""
         return f"""
         /* 分隔线 */
@@ -566,8 +637,8 @@ class StyleManager:
             height: 2px;
             background: linear-gradient(90deg, 
                 transparent, 
-                {self.add_alpha(theme.primary_color, 0.3)} 20%, 
-                {self.add_alpha(theme.primary_color, 0.3)} 80%, 
+                {t.rgba('primary', 0.3)} 20%, 
+                {t.rgba('primary', 0.3)} 80%, 
                 transparent);
             margin: 38px 0;
             position: relative;
@@ -579,21 +650,21 @@ class StyleManager:
             left: 50%;
             top: 50%;
             transform: translate(-50%, -50%);
-            background: {theme.background.split('(')[0] + '(180deg, #FFFFFF 0%, #FFFFFF 100%)' if 'gradient' in theme.background else '#FFFFFF'};
+            background: {t.theme.background.split('(')[0] + '(180deg, #FFFFFF 0%, #FFFFFF 100%)' if 'gradient' in t.theme.background else '#FFFFFF'};
             color: var(--primary-color);
             padding: 0 10px;
             font-size: 20px;
         }}
         """
     
-    def _generate_link_css(self, theme: ThemeConfig) -> str:
+    def _generate_link_css(self, t: ThemeTokens) -> str:
         """生成链接样式"""
         return f"""
         /* 链接样式 */
         a {{
             color: var(--link-color);
             text-decoration: none;
-            border-bottom: 2px solid {self.add_alpha(theme.link_color or theme.primary_color, 0.3)};
+            border-bottom: 2px solid {t.rgba('link', 0.3)};
             transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
             padding-bottom: 1px;
             position: relative;
@@ -602,7 +673,7 @@ class StyleManager:
         a:hover {{
             color: var(--secondary-color);
             border-bottom-color: var(--secondary-color);
-            background: {self.add_alpha(theme.primary_color, 0.08)};
+            background: {t.rgba('primary', 0.08)};
             padding: 2px 6px;
             margin: -2px -6px;
             border-radius: 4px;
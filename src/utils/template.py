@@ -0,0 +1,40 @@
+# ============================================
+# src/utils/template.py - {{占位符}} 模板
+# ============================================
+import re
+from typing import Dict, List
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+class CompiledTemplate:
+    """
+    编译后的 {{占位符}} 模板
+
+    segments 由字面量和占位符名交替组成（偶数位为字面量，奇数位为占位符名），
+    渲染只需一次 join；没有提供值的占位符原样保留
+    """
+    __slots__ = ('segments',)
+
+    def __init__(self, text: str):
+        self.segments: List[str] = _PLACEHOLDER_RE.split(text)
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = self.segments[:]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = values[name] if name in values else '{{' + name + '}}'
+        return ''.join(parts)
+
+    def bind(self, values: Dict[str, str]) -> 'CompiledTemplate':
+        """代入部分占位符，返回只剩其余占位符的模板（相邻字面量合并）"""
+        segments = [self.segments[0]]
+        for i in range(1, len(self.segments), 2):
+            name, literal = self.segments[i], self.segments[i + 1]
+            if name in values:
+                segments[-1] += values[name] + literal
+            else:
+                segments += [name, literal]
+        bound = CompiledTemplate.__new__(CompiledTemplate)
+        bound.segments = segments
+        return bound
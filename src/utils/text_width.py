@@ -0,0 +1,63 @@
+# ============================================
+# src/utils/text_width.py - 文本宽度估算
+# ============================================
+from itertools import accumulate
+from typing import List, Tuple
+
+
+# 按 UTF-32 编码的字节判断字符类别：最低字节 >= 128 或其余字节非零即为非 ASCII
+_LOW_BYTE_FLAGS = bytes([0] * 128 + [1] * 128)
+_HIGH_BYTE_FLAGS = bytes([0] + [1] * 255)
+
+
+def wide_flags(text: str) -> bytes:
+    """每个字符一个字节：非 ASCII 字符为 1，ASCII 字符为 0"""
+    if not text:
+        return b''
+    data = text.encode('utf-32-le', 'surrogatepass')
+    flags = int.from_bytes(data[0::4].translate(_LOW_BYTE_FLAGS), 'little')
+    for offset in (1, 2, 3):
+        flags |= int.from_bytes(data[offset::4].translate(_HIGH_BYTE_FLAGS), 'little')
+    return flags.to_bytes(len(text), 'little')
+
+
+class TextWidthMeter:
+    """
+    按字符类别估算文本宽度（非 ASCII 字符按中文宽度，其余按英文宽度）
+
+    整体宽度只统计两类字符的数量；前缀宽度数组先批量生成每个字符的
+    类别字节，再映射为宽度并用 accumulate 累加，逐字符循环都在 C 层完成
+    """
+
+    def __init__(self, wide_width: int, narrow_width: int):
+        self.wide_width = wide_width
+        self.narrow_width = narrow_width
+        self.key = ('estimate', wide_width, narrow_width)
+        # 宽度能用单字节表示时，类别字节可直接 translate 为宽度
+        if 0 <= wide_width < 256 and 0 <= narrow_width < 256:
+            self._width_table = bytes([narrow_width, wide_width]) + bytes(254)
+        else:
+            self._width_table = None
+
+    def count(self, text: str) -> Tuple[int, int]:
+        """返回 (宽字符数, 窄字符数)"""
+        narrow = len(text.encode('ascii', 'ignore'))
+        return len(text) - narrow, narrow
+
+    def width(self, text: str) -> int:
+        """文本总宽度（像素）"""
+        wide, narrow = self.count(text)
+        return wide * self.wide_width + narrow * self.narrow_width
+
+    def prefix_widths(self, text: str) -> List[int]:
+        """
+        累计宽度数组：result[i] 为 text[:i] 的宽度，长度为 len(text) + 1
+
+        任意子串 text[i:j] 的宽度为 result[j] - result[i]
+        """
+        flags = wide_flags(text)
+        if self._width_table is not None:
+            widths = flags.translate(self._width_table)
+        else:
+            widths = [self.wide_width if flag else self.narrow_width for flag in flags]
+        return list(accumulate(widths, initial=0))
@@ -0,0 +1,62 @@
+# ============================================
+# tests/test_cache.py - 内存 LRU、磁盘缓存淘汰与两级结果缓存
+# ============================================
+import os
+from src.utils.cache import DiskCache, LRUCache, MISSING, RenderCache, content_key
+
+
+def test_content_key_depends_on_every_part():
+    assert content_key('markdown', 1, 'text') == content_key('markdown', 1, 'text')
+    assert content_key('markdown', 1, 'text') != content_key('markdown', 2, 'text')
+    # 各部分之间有分隔符，拼接相同的不同切分不会冲突
+    assert content_key('ab', 'c') != content_key('a', 'bc')
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # a 变为最近使用
+    cache.put('c', 3)
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    # 值本身可以是 None
+    cache.put('none', None)
+    assert cache.get('none') is None
+
+
+def test_disk_cache_evicts_oldest_files(tmp_path):
+    payload = b'x' * 1000
+    cache = DiskCache(tmp_path, max_bytes=3500)
+    for index, key in enumerate(('a', 'b', 'c')):
+        cache.put(key, payload)
+        os.utime(cache._path(key), (1000 + index, 1000 + index))
+    # 读取刷新修改时间：a 变为最近使用
+    assert cache.get('a') == payload
+
+    cache.put('d', payload)  # 超过上限，淘汰到上限的 80% 以下
+    assert cache.get('b') is MISSING
+    assert cache.get('c') is MISSING
+    assert cache.get('a') == payload and cache.get('d') == payload
+
+
+def test_disk_cache_drops_corrupt_files(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache._path('bad').write_bytes(b'not a pickle')
+    assert cache.get('bad') is MISSING
+    assert not cache._path('bad').exists()
+
+
+def test_render_cache_writes_only_costly_results_to_disk(tmp_path):
+    cache = RenderCache(max_entries=4, disk_dir=tmp_path)
+    cache.put('cheap', [1], cost=0.0)
+    cache.put('costly', [2], cost=RenderCache.DISK_MIN_COST)
+    assert cache.disk.get('cheap') is MISSING
+    assert cache.disk.get('costly') == [2]
+
+    # 新实例（如重新启动后）从磁盘层读取并放入内存
+    reopened = RenderCache(max_entries=4, disk_dir=tmp_path)
+    assert reopened.get('costly') == [2]
+    assert reopened.memory.get('costly') == [2]
+    assert reopened.get('cheap') is MISSING
+    assert (reopened.hits, reopened.misses) == (1, 1)
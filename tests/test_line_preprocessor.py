@@ -0,0 +1,57 @@
+# ============================================
+# tests/test_line_preprocessor.py - 行级预处理管线与原先逐个正则替换的结果一致
+# ============================================
+import re
+import pytest
+from src.core.line_preprocessor import LinePreprocessor, LineTransform, PAGEBREAK_HTML
+
+
+def legacy_preprocess(text: str) -> str:
+    """原 MarkdownProcessor 中依次执行的三次全文正则替换"""
+    def replacer(match):
+        clean_text = re.sub(r'([^\w\s])+$', '', match.group(2).strip())
+        return f"{match.group(1)} {clean_text}"
+    for level in range(1, 7):
+        text = re.sub(rf'^({"#" * level})\s+(.+)$', replacer, text, flags=re.MULTILINE)
+    for level in range(1, 7):
+        text = re.sub(rf'^({"#" * level})\s+(.+?)(\n+)$', r'\1 \2 ', text, flags=re.MULTILINE)
+    return re.sub(r'<!--\s*pagebreak\s*-->', PAGEBREAK_HTML, text, flags=re.IGNORECASE)
+
+
+@pytest.mark.parametrize('text', [
+    '# 标题 ✨🎉\n\n正文',
+    '## A: b!\n\n\n正文\n### 中间的符号★保留\n正文',
+    '# 标题\n正文',
+    '#hashtag 不是标题\n\n####### 七级不是标题',
+    '正文\n<!-- PageBreak -->\n正文<!--pagebreak-->尾部',
+    '# 末尾标题',
+    '# 末尾标题\n\n',
+    '',
+])
+def test_matches_legacy_preprocessing(text):
+    preprocessor = LinePreprocessor.default()
+    preprocessor.deregister('tasklist')
+    assert preprocessor.run(text) == legacy_preprocess(text)
+
+
+def test_tasklist_followed_by_text_gets_blank_line():
+    assert LinePreprocessor.default().run('- [ ] a\n- [x] b\n文本') == '- [ ] a\n- [x] b\n\n文本'
+
+
+def test_custom_transforms_run_by_priority():
+    preprocessor = LinePreprocessor()
+    preprocessor.register(lambda line: None if line == 'drop' else line, 'drop', 10)
+    preprocessor.register(lambda line: line.replace('split', 'a\nb'), 'split', 20)
+    assert preprocessor.run('keep\ndrop\nsplit') == 'keep\na\nb'
+
+
+def test_signature_follows_registered_transforms():
+    class Upper(LineTransform):
+        def transform_line(self, line):
+            return line.upper()
+
+    preprocessor = LinePreprocessor.default()
+    before = preprocessor.signature()
+    preprocessor.register(Upper(), 'upper', 5)
+    assert preprocessor.signature() != before
+    assert preprocessor.run('abc') == 'ABC'
@@ -0,0 +1,139 @@
+# ============================================
+# tests/test_markdown_processor.py - 增量解析与完整解析结果一致
+# ============================================
+import struct
+import zlib
+import pytest
+from src.core.blocks import html_to_blocks
+from src.core.markdown_processor import MarkdownProcessor
+
+DOCUMENT = """title: 测试文档
+author: test
+
+# 标题
+
+第一段，含 **粗体**、*斜体*、`代码` 和 [引用链接][ref]。
+
+## 重复标题
+
+- [ ] 待办
+- [x] 已完成
+
+## 重复标题
+
+1. 第一项
+2. 第二项
+
+    缩进的延续段落
+
+> 引用
+> 第二行
+
+```python
+print("hello")
+```
+
+| 列1 | 列2 |
+|-----|-----|
+| a   | b   |
+
+HTML 缩写在这里。
+
+<div markdown="1">
+**容器内的 Markdown**
+</div>
+
+<!-- pagebreak -->
+
+最后一段 -- "引号" ...
+
+[ref]: https://example.com
+*[HTML]: Hyper Text Markup Language
+"""
+
+EDITS = [
+    lambda text: text.replace('第一段', '改动后的第一段'),
+    lambda text: text.replace('## 重复标题\n\n1.', '## 新标题\n\n1.'),
+    lambda text: text.replace('> 引用\n', '> 引用\n\n新增段落\n'),
+    lambda text: text.replace('[ref]: https://example.com', '[ref]: https://example.org'),
+    lambda text: text + '\n## 末尾标题\n\n末尾段落\n',
+    lambda text: text.replace('title: 测试文档\nauthor: test\n\n', ''),
+]
+
+
+def block_html(blocks):
+    return [(block.type, block.html) for block in blocks]
+
+
+def top_level(html):
+    """顶层元素序列：增量解析逐块拼接，块之间的空白与完整解析不同"""
+    return block_html(html_to_blocks(html))
+
+
+def test_incremental_parse_matches_full_parse():
+    assert top_level(MarkdownProcessor(incremental=True).parse(DOCUMENT)) == top_level(MarkdownProcessor().parse(DOCUMENT))
+
+
+def test_incremental_blocks_match_full_parse():
+    incremental = MarkdownProcessor(incremental=True)
+    assert block_html(incremental.parse_blocks(DOCUMENT)) == block_html(MarkdownProcessor().parse_blocks(DOCUMENT))
+    assert block_html(incremental.iter_blocks(DOCUMENT)) == block_html(MarkdownProcessor().parse_blocks(DOCUMENT))
+
+
+def test_incremental_parse_after_edits():
+    # 同一个处理器连续编辑，块缓存命中与重新转换混合
+    incremental = MarkdownProcessor(incremental=True)
+    text = DOCUMENT
+    incremental.parse(text)
+    for edit in EDITS:
+        text = edit(text)
+        assert top_level(incremental.parse(text)) == top_level(MarkdownProcessor().parse(text))
+        assert block_html(incremental.parse_blocks(text)) == block_html(MarkdownProcessor().parse_blocks(text))
+
+
+@pytest.mark.parametrize('text', [
+    DOCUMENT + '\n正文[^1]\n\n[^1]: 脚注\n',
+    '[TOC]\n\n' + DOCUMENT,
+])
+def test_full_document_syntax_falls_back(text):
+    assert MarkdownProcessor(incremental=True).parse(text) == MarkdownProcessor().parse(text)
+
+
+@pytest.mark.parametrize('text', [
+    'see [a]\n\n```\n[a]: http://x\n```\n',
+    'see [a]\n\n~~~\n[a]: http://x\n~~~\n\n[b]: http://y\n',
+    'see [a]\n\n    [a]: http://x\n',
+])
+def test_definitions_in_code_are_not_collected(text):
+    html = MarkdownProcessor(incremental=True).parse(text)
+    assert '<p>see [a]</p>' in html
+    assert top_level(html) == top_level(MarkdownProcessor().parse(text))
+
+
+def test_blocks_carry_source_lines():
+    blocks = MarkdownProcessor(incremental=True).parse_blocks('# 标题\n\n段落一\n第二行\n\n段落二\n')
+    assert [(block.type, block.line_start, block.line_end) for block in blocks] == [
+        ('heading', 1, 1), ('paragraph', 3, 4), ('paragraph', 6, 6)
+    ]
+
+
+def write_png(path, width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + b'\x00' * width * 3 for _ in range(height))
+    path.write_bytes(b'\x89PNG\r\n\x1a\n'
+                     + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+                     + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def test_cached_blocks_follow_image_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    text = '段落\n\n![图片](image.png)\n'
+    processor = MarkdownProcessor(incremental=True)
+    write_png(tmp_path / 'image.png', 10, 20)
+    assert 'data-height="20"' in processor.parse(text)
+
+    write_png(tmp_path / 'image.png', 30, 40)
+    html = processor.parse(text)
+    assert 'data-height="40"' in html and 'data-width="30"' in html
+    assert top_level(html) == top_level(MarkdownProcessor().parse(text))
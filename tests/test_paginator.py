@@ -0,0 +1,125 @@
+# ============================================
+# tests/test_paginator.py - 增量重排与重新分页结果一致
+# ============================================
+import random
+import time
+import pytest
+from src.core.blocks import MarkdownBlock
+from src.core.markdown_processor import MarkdownProcessor
+from src.utils.page_breaker import OptimalPageBreaker
+from src.utils.paginator import SmartPaginator
+
+
+def long_paragraph_document(marked: bool = False, extra: str = '') -> str:
+    """含一个跨页长段落的文档；marked 时给段落后部（拆分到下一页的部分）的一个词加粗"""
+    words = ' '.join(f'word{i}' for i in range(1500))
+    if marked:
+        words = words.replace('word1400', '**word1400**')
+    after = '\n\n'.join(f'after {i}' for i in range(40))
+    return f'# 标题\n\nintro para{extra}\n\n{words}\n\n{after}'
+
+
+def fresh_html(text: str):
+    blocks = MarkdownProcessor().parse_blocks(text)
+    return [page.html for page in SmartPaginator().paginate(blocks)]
+
+
+def relayout_html(before: str, after: str):
+    processor = MarkdownProcessor(incremental=True)
+    paginator = SmartPaginator()
+    paginator.paginate(processor.parse_blocks(before))
+    return [page.html for page in paginator.paginate(processor.parse_blocks(after))]
+
+
+@pytest.mark.parametrize('before, after', [
+    # 只改拆分段落延续部分的行内标记（可见文本不变）
+    (long_paragraph_document(), long_paragraph_document(marked=True)),
+    (long_paragraph_document(marked=True), long_paragraph_document()),
+    # 改动长段落之前的块
+    (long_paragraph_document(), long_paragraph_document(extra=' with more words')),
+    # 删除、插入块
+    (long_paragraph_document(), long_paragraph_document().replace('after 3\n\n', '')),
+    (long_paragraph_document(), long_paragraph_document().replace('after 3', 'after 3\n\n## 插入\n\n新段落')),
+])
+def test_relayout_matches_fresh_pagination(before, after):
+    assert relayout_html(before, after) == fresh_html(after)
+
+
+def test_markup_only_edit_reaches_split_fragment():
+    pages = relayout_html(long_paragraph_document(), long_paragraph_document(marked=True))
+    assert any('<strong>word1400</strong>' in page for page in pages)
+
+
+def test_streaming_matches_paginate():
+    text = long_paragraph_document(marked=True)
+    blocks = MarkdownProcessor(incremental=True).parse_blocks(text)
+    streamed = [page.html for page in SmartPaginator().iter_pages(iter(blocks))]
+    assert streamed == fresh_html(text)
+
+
+def test_optimal_engine_keeps_content_within_pages():
+    blocks = MarkdownProcessor().parse_blocks(long_paragraph_document())
+    greedy = SmartPaginator().paginate(blocks)
+    paginator = SmartPaginator(engine='optimal')
+    pages = paginator.paginate(blocks)
+    assert len(pages) <= len(greedy)
+    # 超高的页只能是单个放不下的元素（与贪心分页相同）
+    assert all(page.height <= paginator.content_height or len(page.elements) == 1 for page in pages)
+    assert sum(page.html.count('word') for page in pages) == sum(page.html.count('word') for page in greedy)
+
+
+def benchmark_blocks(count: int = 10000, seed: int = 1):
+    """与 scripts/benchmark_pagination.py 相同的长短段落和标题混排，直接生成块（跳过 Markdown 解析）"""
+    rng = random.Random(seed)
+    words = ["中文", "测试", "段落", "分页", "text", "lorem", "，", "。"]
+    blocks = []
+    for i in range(count):
+        if rng.random() < 0.1:
+            blocks.append(MarkdownBlock(type='heading', html=f'<h2>小节 {i}</h2>', text=f'小节 {i}', level=2))
+        else:
+            text = ''.join(rng.choice(words) for _ in range(rng.randint(5, 200)))
+            blocks.append(MarkdownBlock(type='paragraph', html=f'<p>{text}</p>', text=text))
+    return blocks
+
+
+def best_time(func, repeat: int = 3) -> float:
+    """多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_optimal_engine_speed_on_10k_blocks():
+    blocks = benchmark_blocks()
+    # 以同一台机器上贪心分页的耗时为基准，避免依赖机器快慢
+    greedy_cold = best_time(lambda: SmartPaginator().paginate(blocks))
+    optimal_cold = best_time(lambda: SmartPaginator(engine='optimal').paginate(blocks))
+    assert optimal_cold < 3 * greedy_cold
+
+    paginator = SmartPaginator(engine='optimal')
+    pages = paginator.paginate(blocks)
+    # 块序列不变的重复调用沿用上次的布局
+    assert best_time(lambda: paginator.paginate(blocks)) < greedy_cold / 10
+    assert [page.html for page in paginator.paginate(blocks)] == [page.html for page in pages]
+    assert len(pages) <= len(SmartPaginator().paginate(blocks))
+
+
+@pytest.mark.parametrize('refinements', [1, 3])
+def test_optimal_engine_corrects_estimated_splits(monkeypatch, refinements):
+    # 很长的不可断单词使按行数估算的拆分与实际拆分不符，须重新求解或全部实际拆分
+    monkeypatch.setattr(OptimalPageBreaker, 'MAX_REFINEMENTS', refinements)
+    rng = random.Random(3)
+    blocks = []
+    for _ in range(300):
+        text = ' '.join('x' * rng.randint(1, 160) if rng.random() < 0.3 else 'ab'
+                        for _ in range(rng.randint(3, 60)))
+        blocks.append(MarkdownBlock(type='paragraph', html=f'<p>{text}</p>', text=text))
+    greedy = SmartPaginator().paginate(blocks)
+    paginator = SmartPaginator(engine='optimal')
+    pages = paginator.paginate(blocks)
+    assert all(page.height <= paginator.content_height or len(page.elements) == 1 for page in pages)
+    assert sum(page.html.count('x') for page in pages) == sum(page.html.count('x') for page in greedy)
+    assert sum(page.html.count('ab') for page in pages) == sum(page.html.count('ab') for page in greedy)
@@ -0,0 +1,53 @@
+# ============================================
+# tests/test_style_manager.py - 主题取值表与编译后的主题 CSS
+# ============================================
+import pytest
+from src.core.html_generator import HTMLGenerator
+from src.utils.style_manager import ALPHA_LEVELS, DARK_THEMES, StyleManager
+
+THEME_NAMES = list(StyleManager.THEMES)
+DARK_CARD = 'rgba(20, 20, 35, 0.98)'
+
+
+@pytest.mark.parametrize('name', THEME_NAMES)
+def test_tokens_match_theme(name):
+    manager = StyleManager()
+    tokens = manager.theme_tokens(name)
+    theme = manager.get_theme(name)
+    assert tokens.theme == theme
+    assert tokens.is_dark == (name in DARK_THEMES)
+    for color, value in (('primary', theme.primary_color), ('text', theme.text_color), ('black', '#000000')):
+        for alpha in ALPHA_LEVELS:
+            assert tokens.rgba(color, alpha) == manager.add_alpha(value, alpha)
+    # 强调文字：浅色主题加深，深色主题提亮
+    expected = (manager.lighten_color(theme.text_color, 0.2) if tokens.is_dark
+                else manager.darken_color(theme.text_color, 0.2))
+    assert tokens.colors['emphasis'] == expected
+
+
+@pytest.mark.parametrize('name', DARK_THEMES)
+def test_default_name_resolves_to_current_theme(name):
+    manager = StyleManager(name)
+    assert manager.theme_tokens() is manager.theme_tokens(name)
+    assert manager.theme_tokens().is_dark
+    assert manager.generate_css() == manager.generate_css(name)
+
+
+def test_unknown_theme_falls_back_to_default():
+    manager = StyleManager()
+    assert manager.theme_tokens('no-such-theme') is manager.theme_tokens('xiaohongshu')
+
+
+def test_generate_css_fills_font_slots():
+    manager = StyleManager()
+    css = manager.generate_css('wechat', 22, '"Test Font"')
+    assert '{{' not in css
+    assert '"Test Font"' in css and '22px' in css
+    assert manager.theme_tokens('wechat').theme.font_family in manager.generate_css('wechat', 22)
+
+
+@pytest.mark.parametrize('name', THEME_NAMES)
+def test_page_card_background_follows_dark_mode(name):
+    generator = HTMLGenerator(theme='xiaohongshu')
+    generator.set_theme(name)
+    assert (DARK_CARD in generator.generate('')) == (name in DARK_THEMES)
@@ -0,0 +1,74 @@
+# ============================================
+# tests/test_template.py - 编译模板、模板文件缓存与页面骨架缓存
+# ============================================
+import os
+import pytest
+from src.core.html_generator import HTMLGenerator, TemplateStore
+from src.utils.template import CompiledTemplate
+
+CSS = 'width: {{page_width}}px; color: {{text}}; {{unknown}} {{page_width}}'
+
+
+def legacy_render(text, values):
+    """原先逐个 str.replace 的渲染方式"""
+    for name, value in values.items():
+        text = text.replace('{{' + name + '}}', value)
+    return text
+
+
+@pytest.mark.parametrize('values', [
+    {},
+    {'page_width': '1080'},
+    {'page_width': '1080', 'text': '#333', 'unused': 'x'},
+])
+def test_render_matches_str_replace(values):
+    assert CompiledTemplate(CSS).render(values) == legacy_render(CSS, values)
+
+
+def test_bind_then_render_matches_single_render():
+    template = CompiledTemplate(CSS)
+    bound = template.bind({'page_width': '1080'})
+    assert bound.segments[1::2] == ['text', 'unknown']
+    assert bound.render({'text': '#333'}) == template.render({'page_width': '1080', 'text': '#333'})
+
+
+def test_values_are_not_substituted_again():
+    assert CompiledTemplate('{{a}}{{b}}').render({'a': '{{b}}', 'b': 'x'}) == '{{b}}x'
+
+
+def test_template_store_reloads_changed_files(tmp_path):
+    path = tmp_path / 'page.css'
+    path.write_text('a {{x}}', encoding='utf-8')
+    store = TemplateStore(tmp_path)
+    first, version = store.get('page.css')
+    assert store.get('page.css')[0] is first
+
+    path.write_text('b {{x}} changed', encoding='utf-8')
+    os.utime(path, ns=(version[0] + 10**9, version[0] + 10**9))
+    template, new_version = store.get('page.css')
+    assert new_version != version
+    assert template.render({'x': '1'}) == 'b 1 changed'
+
+    with pytest.raises(FileNotFoundError):
+        store.get('missing.css')
+
+
+def test_generate_fills_content_and_page_info():
+    generator = HTMLGenerator(font_size=18, page_size='small')
+    html = generator.generate('<p>正文</p>', 2, 5)
+    assert '<p>正文</p>' in html
+    assert '<span class="page-number">2</span>' in html and '<span class="page-total">5</span>' in html
+    assert '{{' not in html.split('<script>')[0]
+    # 骨架已缓存：换一页只有正文和页码不同
+    assert generator.generate('<p>正文</p>', 2, 5) == html
+    assert 'class="page-number"' not in generator.generate('<p>正文</p>')
+
+
+def test_skeleton_follows_settings():
+    generator = HTMLGenerator(font_size=18, page_size='small')
+    small = generator.generate('')
+    generator.set_page_size('large')
+    large = generator.generate('')
+    assert small != large and '1440' in large
+    generator.set_page_size('small')
+    assert generator.generate('') == small